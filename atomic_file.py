@@ -0,0 +1,77 @@
+import os
+import tempfile
+#
+# ------------------------------------------------------------------
+#  原子写入：先写入同一目录下的临时文件，全部写完后再改名替换目标文件，
+#  出错、取消或程序中途退出时目标文件保持原样（不会留下写了一半的导出文件、项目文件）
+# ------------------------------------------------------------------
+#
+
+# 新建文件的权限与 open() 相同（临时文件默认只有所有者可读写）；umask 只能通过设置来读取，在导入时读取一次
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+NEW_FILE_MODE = 0o666 & ~_UMASK
+
+
+class AtomicWriter:
+    """
+    with AtomicWriter(file_name, "wb") as f: ... 正常结束时用写好的临时文件替换 file_name，
+    出现异常或调用了 discard() 时删除临时文件。替换前刷新到磁盘；已有的目标文件的权限保持不变。
+    """
+    def __init__(self, file_name, mode="w", encoding=None, newline=None):
+        self.file_name = file_name
+        self.mode = mode
+        self.encoding = encoding
+        self.newline = newline
+        self.temp_file_name = None
+        self.file = None
+        self.discarded = False
+
+    def __enter__(self):
+        directory, base_name = os.path.split(os.path.abspath(self.file_name))
+        fd, self.temp_file_name = tempfile.mkstemp(prefix=f".{base_name}.", suffix=".tmp", dir=directory)
+        try:
+            self.file = os.fdopen(fd, self.mode, encoding=self.encoding, newline=self.newline)
+        except BaseException:
+            os.close(fd)
+            self._remove_temp_file()
+            raise
+        return self.file
+
+    def discard(self):
+        """放弃写入的内容（例如已取消），退出 with 时不替换目标文件。"""
+        self.discarded = True
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        try:
+            if exc_type is None and not self.discarded:
+                self.file.flush()
+                os.fsync(self.file.fileno())
+        except BaseException:
+            self.file.close()
+            self._remove_temp_file()
+            raise
+        self.file.close()
+        if exc_type is not None or self.discarded:
+            self._remove_temp_file()
+            return False
+        try:
+            self._copy_mode()
+            os.replace(self.temp_file_name, self.file_name)
+        except BaseException:
+            self._remove_temp_file()
+            raise
+        return False
+
+    def _copy_mode(self):
+        try:
+            mode = os.stat(self.file_name).st_mode & 0o7777
+        except OSError:
+            mode = NEW_FILE_MODE
+        os.chmod(self.temp_file_name, mode)
+
+    def _remove_temp_file(self):
+        try:
+            os.remove(self.temp_file_name)
+        except OSError:
+            pass
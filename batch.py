@@ -0,0 +1,147 @@
+import glob
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from erb_export import latest_export_file_name
+from erb_import import load_map_file
+from export_cache import export_with_cache
+from validation import EXPORT_CHECKS
+#
+# ------------------------------------------------------------------
+#  批量导出：多进程并行处理整个目录的地图文本和 erb 文件
+# ------------------------------------------------------------------
+#
+
+INPUT_EXTENSIONS = (".txt", ".erb", ".tkmap")
+
+
+class BatchResult:
+    """单个输入文件的处理结果，用于汇总报告。"""
+    def __init__(self, input_file, output_file, mapid):
+        self.input_file = input_file
+        self.output_file = output_file
+        self.mapid = mapid
+        self.node_count = 0
+        self.warning_count = 0  # 导出前警告（与图形界面导出前的检查相同）
+        self.seconds = 0.0
+        self.error = None
+        self.skipped = False
+        self.unchanged = False
+
+    def to_dict(self) -> dict:
+        return dict(self.__dict__)
+
+
+def collect_inputs(patterns) -> list[str]:
+    """目录取其中（不递归）的 .txt/.erb 文件，其余按通配符展开，结果去重并排序。"""
+    files = set()
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            for name in os.listdir(pattern):
+                if name.lower().endswith(INPUT_EXTENSIONS):
+                    files.add(os.path.join(pattern, name))
+        else:
+            files.update(path for path in glob.glob(pattern) if os.path.isfile(path))
+    return sorted(files)
+
+
+def format_mapid(template, input_file, index) -> str:
+    """MAPID 模板可使用 {stem}（不含扩展名的文件名）和 {index}（从 1 开始的序号）。"""
+    stem = os.path.splitext(os.path.basename(input_file))[0]
+    return template.format(stem=stem, index=index)
+
+
+def reserve_output_files(mapids, output_dir, overwrite=False) -> list[tuple[str, str]]:
+    """
+    与 next_export_file_name 相同的 MAP_{mapid}_{n}.erb 命名，返回 [(输出文件, 上次导出的文件或 None), ...]。
+    在分派任务前统一分配，避免多个进程同时使用同一个 MAPID 时抢到同一个文件名。
+    overwrite 时输出到上次导出的文件；同一个 MAPID 只有第一个覆盖，其余仍使用新的编号。
+    """
+    reserved = set()
+    output_files = []
+    for mapid in mapids:
+        previous = latest_export_file_name(mapid, output_dir)
+        if overwrite and previous is not None and previous not in reserved:
+            file_name = previous
+        else:
+            file_index = 1
+            while True:
+                file_name = os.path.join(output_dir, f"MAP_{mapid}_{file_index}.erb")
+                if file_name not in reserved and not os.path.exists(file_name):
+                    break
+                file_index += 1
+        reserved.add(file_name)
+        output_files.append((file_name, previous))
+    return output_files
+
+
+def convert_file(input_file, output_file, mapid, strict=False, previous=None) -> BatchResult:
+    """
+    在工作进程中执行：读取一个地图并导出，异常记录在结果中而不是抛出。
+    与上次导出的文件 previous 相比没有变化时不写文件，输出文件记为 previous。
+    """
+    result = BatchResult(input_file, output_file, mapid)
+    start = time.perf_counter()
+    try:
+        model = load_map_file(input_file)
+        result.node_count = len(model.all_nodes)
+        result.warning_count = len(model.validator.messages(EXPORT_CHECKS))
+        if strict and result.warning_count:
+            result.skipped = True
+        else:
+            result.output_file, regenerated = export_with_cache(model, mapid, output_file, previous)
+            result.unchanged = not regenerated
+    except Exception as e:
+        result.error = f"{type(e).__name__}: {e}"
+    result.seconds = time.perf_counter() - start
+    return result
+
+
+def run_batch(patterns, mapid_template="{stem}", output_dir=".", jobs=None, strict=False,
+              overwrite=False) -> list[BatchResult]:
+    input_files = collect_inputs(patterns)
+    os.makedirs(output_dir, exist_ok=True)
+    mapids = [format_mapid(mapid_template, input_file, index)
+              for index, input_file in enumerate(input_files, start=1)]
+    output_files = reserve_output_files(mapids, output_dir, overwrite)
+
+    if jobs == 1 or len(input_files) <= 1:
+        return [convert_file(input_file, output_file, mapid, strict, previous)
+                for input_file, (output_file, previous), mapid in zip(input_files, output_files, mapids)]
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = [executor.submit(convert_file, input_file, output_file, mapid, strict, previous)
+                   for input_file, (output_file, previous), mapid in zip(input_files, output_files, mapids)]
+        return [future.result() for future in futures]
+
+
+def format_report(results, elapsed) -> str:
+    lines = []
+    for result in results:
+        if result.error:
+            status = f"失败 {result.error}"
+        elif result.skipped:
+            status = f"跳过（{result.warning_count} 个导出前警告）"
+        else:
+            status = f"-> {result.output_file}"
+            notes = []
+            if result.unchanged:
+                notes.append("未变化，没有重新导出")
+            if result.warning_count:
+                notes.append(f"{result.warning_count} 个导出前警告")
+            if notes:
+                status += f"（{'，'.join(notes)}）"
+        lines.append(f"{result.input_file}: {status}")
+    failed = sum(1 for result in results if result.error)
+    skipped = sum(1 for result in results if result.skipped)
+    node_count = sum(result.node_count for result in results)
+    lines.append(f"共 {len(results)} 个文件，成功 {len(results) - failed - skipped}，"
+                 f"失败 {failed}，跳过 {skipped}，{node_count} 个节点，用时 {elapsed:.2f} 秒")
+    return "\n".join(lines)
+
+
+def write_report_json(results, elapsed, file_name):
+    with open(file_name, "w", encoding="utf-8") as f:
+        json.dump({"elapsed": elapsed, "results": [result.to_dict() for result in results]},
+                  f, ensure_ascii=False, indent=2)
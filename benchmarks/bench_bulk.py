@@ -0,0 +1,92 @@
+"""
+批量修改：把一片区域中全部城市的经济改为同一个值。
+逐个修改（点击选中、输入经济、再点击取消选中，每个节点都渲染）与一次事务（框选后批量修改，只渲染一次）对比，
+另测属性表（CSV）导出、导入的耗时。
+
+    python -m benchmarks.bench_bulk --lines 400 --first-line 1 --last-line 60
+"""
+import argparse
+import os
+import tempfile
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PySide6.QtWidgets import QApplication
+
+from benchmarks.synthetic import make_model
+from bulk_edit import Transaction, read_attribute_csv, select_nodes, write_attribute_csv
+from map import MainWindow
+from profiling import profiler
+
+
+def _renders() -> int:
+    return profiler.counters.get("renders", 0)
+
+
+def edit_one_by_one(window, app, nodes, economy):
+    for node in nodes:
+        window.on_map_anchor_clicked(node)
+        app.processEvents()
+        window.economy_edit.textEdited.emit(str(economy))
+        app.processEvents()
+        window.on_map_anchor_clicked(node)
+        app.processEvents()
+
+
+def edit_in_transaction(window, app, nodes, economy):
+    window.on_nodes_box_selected(nodes, False)
+    transaction = Transaction(window.model)
+    transaction.set_attribute(nodes, "economy", economy)
+    window._commit_transaction(transaction)
+    app.processEvents()
+
+
+def _measure(name, func, window, app, nodes, economy):
+    renders = _renders()
+    undo_count = len(window.undo_stack.undo_commands)
+    start = time.perf_counter()
+    func(window, app, nodes, economy)
+    window.wait_until_idle()
+    elapsed = time.perf_counter() - start
+    assert all(node.economy == economy for node in nodes)
+    print(f"  {name:8s} {elapsed * 1000:9.1f} ms  渲染 {_renders() - renders:5d} 次  "
+          f"撤销记录 {len(window.undo_stack.undo_commands) - undo_count:4d} 条")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--lines", type=int, default=400)
+    parser.add_argument("--nodes-per-line", type=int, default=8)
+    parser.add_argument("--first-line", type=int, default=1)
+    parser.add_argument("--last-line", type=int, default=60)
+    args = parser.parse_args()
+
+    app = QApplication([])
+    window = MainWindow()
+    window.show()
+    window.open_map(make_model(args.lines, args.nodes_per_line), "bench")
+    window.wait_until_idle()
+    nodes = select_nodes(window.model, args.first_line, args.last_line, kind="city")
+    print(f"{len(window.model.all_nodes)} 个节点，修改第 {args.first_line}-{args.last_line} 行的 {len(nodes)} 个城市")
+    _measure("逐个修改", edit_one_by_one, window, app, nodes, 1)
+    _measure("一次事务", edit_in_transaction, window, app, nodes, 2)
+    window.close()
+    app.quit()
+
+    model = make_model(args.lines, args.nodes_per_line)
+    with tempfile.TemporaryDirectory() as temp_dir:
+        file_name = os.path.join(temp_dir, "attributes.csv")
+        start = time.perf_counter()
+        write_attribute_csv(model, file_name)
+        written = time.perf_counter()
+        transaction, problems = read_attribute_csv(model, file_name)
+        command = transaction.commit()
+        read = time.perf_counter()
+    assert command is None and not problems
+    print(f"属性表 {len(model.all_nodes)} 行：导出 {(written - start) * 1000:.1f} ms，"
+          f"导入（没有变化） {(read - written) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
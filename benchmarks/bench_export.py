@@ -0,0 +1,134 @@
+"""
+导出耗时与峰值内存：流式导出（export_to_file）与原来先生成全部行再逐行写入的做法对比。
+
+    python -m benchmarks.bench_export --lines 1250 --nodes-per-line 8
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.synthetic import make_model
+from erb_export import export_to_file
+from node import CityNode, RelayNode
+
+
+def legacy_export_lines(model, mapid) -> list[str]:
+    """改为流式导出之前的实现：先生成全部行的列表，再逐行写入。"""
+    output_lines = []
+    output_lines.append(";==== Export Start ====")
+    output_lines.append(f"@DRAWMAP_{mapid}(ARG:0 = 0, ARG:1 = 0)")
+    output_lines.append("""CALL DRAWMAP_INIT(ARG:0, 0)
+    ;MAP_SHOW_TYPE
+    IF DRAWMAP_MENUBARTYPE != 0
+        CALL DRAWMAP_PRINT_MENU(DRAWMAP_MENUBARTYPE, DRAWMAP_LINECOUNT)
+        DRAWMAP_LINECOUNT++
+        CALL DRAW_MAP_SHOW_CONFIG_BUTTON()
+    ELSE
+        MAP_SHOW_CONFIG = 0
+    ENDIF""")
+    for i, line_text in enumerate(model.lines):
+        line_entries = model.nodes_by_line[i]
+        ids_in_line = [str(entry[1].node_id) for entry in line_entries if entry[0] in ('city', 'relay')]
+        joined_ids = ",".join(ids_in_line)
+        safe_line_text = line_text.replace('"', '\\"')
+        output_lines.append(f'CALL DRAWMAP_LINE("{safe_line_text}", {joined_ids})')
+    output_lines.append("CALL DRAWMAP_END()")
+    output_lines.append("")
+    output_lines.append(f"@SET_CITY_NUM_{mapid}()")
+    output_lines.append(f"CITY_NUM = {model.max_city_id}")
+    output_lines.append("")
+    output_lines.append(f"@SET_SHORTCITYNAME_{mapid}()")
+    for node in model.all_nodes:
+        if isinstance(node, CityNode):
+            output_lines.append(f"CITY_NAME_SHORT:{node.node_id} = {node.name}")
+    output_lines.append("""FOR LOCAL:0, 0, MAX_CITY
+        SIF CITY_TYPE:(LOCAL:0) == 1
+            CITY_NAME_SHORT:(LOCAL:0) = ●
+    NEXT
+    """)
+    output_lines.append("")
+    output_lines.append(f"@SET_CITYNAME_{mapid}()")
+    output_lines.append("VARSET CITY_NAME,\"無名\"")
+    for node in model.all_nodes:
+        if isinstance(node, CityNode):
+            output_lines.append(f"CITY_NAME:{node.node_id} = {node.full_name}")
+    for node in model.all_nodes:
+        if isinstance(node, RelayNode):
+            output_lines.append(f"CITY_NAME:{node.node_id} = {node.full_name}")
+
+    output_lines.append(f"@SET_CITY_TYPE_{mapid}")
+    output_lines.append("""
+    FOR LOCAL:0, GET_CITY_NUM() + 1, MAX_CITY
+        CITY_TYPE:(LOCAL:0) = 1
+    NEXT
+    """)
+    output_lines.append("")
+    output_lines.append(f"@SET_MAP_ROUTE_{mapid}")
+    for node in model.all_nodes:
+        sorted_conns = sorted(node.connections, key=lambda x: x.node_id)
+        if sorted_conns:
+            names = [c.full_name for c in sorted_conns]
+            all_args = '", "'.join(names)
+            output_lines.append(f'CALL REGISTER_ROUTE_S("{node.full_name}", "{all_args}")')
+        else:
+            output_lines.append(f'CALL REGISTER_ROUTE_S("{node.full_name}")')
+    output_lines.append("")
+    output_lines.append(f"@MAP_INIT_{mapid}")
+    for node in model.all_nodes:
+        if isinstance(node, CityNode):
+            output_lines.append(f'CITY_ECONOMY:GET_CITYNUMBER("{node.full_name}") = {node.economy}')
+    output_lines.append("""
+    FOR LOCAL:0, 1, MAX_CITY
+        CITY_ECONOMY_LIMIT:(LOCAL:0) = MIN(CITY_ECONOMY:(LOCAL:0) * 2, 300000)
+    NEXT
+    """)
+    for node in model.all_nodes:
+        if isinstance(node, CityNode):
+            output_lines.append(f'CITY_GUARD:GET_CITYNUMBER("{node.full_name}") = {node.guard}')
+    output_lines.append(";==== Export End ====")
+    return output_lines
+
+
+def legacy_export_to_file(model, mapid, file_name):
+    output_lines = legacy_export_lines(model, mapid)
+    with open(file_name, "w", encoding="utf-8") as f:
+        for line in output_lines:
+            f.write(line + "\n")
+
+
+def measure(export, model, file_name):
+    """返回 (耗时秒数, 峰值内存字节数)；耗时单独测量，不受 tracemalloc 影响。"""
+    start = time.perf_counter()
+    export(model, "BENCH", file_name)
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    export(model, "BENCH", file_name)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--lines", type=int, default=1250)
+    parser.add_argument("--nodes-per-line", type=int, default=8)
+    args = parser.parse_args()
+
+    model = make_model(args.lines, args.nodes_per_line)
+    print(f"{len(model.lines)} 行 {len(model.all_nodes)} 节点")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        legacy_file = os.path.join(tmp_dir, "legacy.erb")
+        stream_file = os.path.join(tmp_dir, "stream.erb")
+        for label, export, file_name in (("原实现", legacy_export_to_file, legacy_file),
+                                         ("流式导出", export_to_file, stream_file)):
+            elapsed, peak = measure(export, model, file_name)
+            print(f"{label}: {elapsed * 1000:8.1f} ms  峰值内存 {peak / 1024:8.1f} KiB")
+        with open(legacy_file, "rb") as a, open(stream_file, "rb") as b:
+            print("输出一致" if a.read() == b.read() else "输出不一致！")
+        print(f"文件大小 {os.path.getsize(stream_file) / 1024:.1f} KiB")
+
+
+if __name__ == "__main__":
+    main()
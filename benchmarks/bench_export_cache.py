@@ -0,0 +1,59 @@
+"""
+导出缓存：完整导出（export_to_file）与重新导出未变化的地图、只改了一个城市的经济、只改了一条连接时的耗时对比。
+每次都覆盖同一个文件，并检查结果与完整导出逐字节相同。
+
+    python -m benchmarks.bench_export_cache --lines 8000 --nodes-per-line 8
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from benchmarks.synthetic import make_model
+from erb_export import export_to_file
+from export_cache import export_with_cache
+from node import CityNode
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--lines", type=int, default=8000)
+    parser.add_argument("--nodes-per-line", type=int, default=8)
+    args = parser.parse_args()
+
+    model = make_model(args.lines, args.nodes_per_line)
+    nodes = list(model.all_nodes)
+    city = next(node for node in nodes if isinstance(node, CityNode))
+    print(f"{len(model.lines)} 行 {len(model.all_nodes)} 节点")
+
+    def change_economy():
+        city.economy += 1
+
+    def toggle_connection():
+        model.toggle_connection(nodes[0], nodes[-1])
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        file_name = os.path.join(tmp_dir, "MAP_BENCH_1.erb")
+        reference_name = os.path.join(tmp_dir, "reference.erb")
+
+        start = time.perf_counter()
+        export_to_file(model, "BENCH", reference_name)
+        print(f"完整导出          : {(time.perf_counter() - start) * 1000:8.1f} ms")
+        export_with_cache(model, "BENCH", file_name)
+
+        for label, change in (("未变化", None), ("改一个城市的经济", change_economy),
+                              ("切换一条连接", toggle_connection)):
+            if change is not None:
+                change()
+            start = time.perf_counter()
+            _, regenerated = export_with_cache(model, "BENCH", file_name, file_name)
+            elapsed = time.perf_counter() - start
+            export_to_file(model, "BENCH", reference_name)
+            with open(file_name, "rb") as a, open(reference_name, "rb") as b:
+                same = a.read() == b.read()
+            print(f"{label:<10}: {elapsed * 1000:8.1f} ms  重新生成 {', '.join(regenerated) or '无'}"
+                  f"{'' if same else '  输出不一致！'}")
+
+
+if __name__ == "__main__":
+    main()
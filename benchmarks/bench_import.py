@@ -0,0 +1,46 @@
+"""
+导入耗时随地图规模的变化：规模翻倍时耗时应大致翻倍（线性）。
+
+    python -m benchmarks.bench_import --sizes 100 200 400 800
+"""
+import argparse
+import os
+import tempfile
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PySide6.QtWidgets import QApplication
+
+from benchmarks.synthetic import make_model
+from erb_export import export_to_file
+from erb_import import load_erb
+from map import MainWindow
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 200, 400, 800])
+    parser.add_argument("--nodes-per-line", type=int, default=8)
+    args = parser.parse_args()
+
+    app = QApplication.instance() or QApplication([])
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for line_count in args.sizes:
+            file_name = os.path.join(tmp_dir, f"MAP_BENCH_{line_count}.erb")
+            export_to_file(make_model(line_count, args.nodes_per_line), "BENCH", file_name)
+
+            window = MainWindow()
+            start = time.perf_counter()
+            window.set_model(load_erb(file_name))
+            window.wait_until_idle()
+            elapsed = time.perf_counter() - start
+            node_count = len(window.model.all_nodes)
+            print(f"{line_count:6d} 行 {node_count:7d} 节点: {elapsed * 1000:9.1f} ms"
+                  f"  ({elapsed / node_count * 1e6:.1f} us/节点)")
+            window.deleteLater()
+            app.processEvents()
+
+
+if __name__ == "__main__":
+    main()
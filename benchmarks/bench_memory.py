@@ -0,0 +1,85 @@
+"""
+节点占用的内存与完整 GC 的耗时：原来带 __dict__ 的节点类、加了 __slots__ 的节点类、列式存储 NodeStore 对比。
+
+    python -m benchmarks.bench_memory --lines 5000 --nodes-per-line 8
+"""
+import argparse
+import gc
+import time
+import tracemalloc
+
+from benchmarks.synthetic import make_model
+from node import CityNode
+from node_store import NodeStore
+
+
+class LegacyNode:
+    """加 __slots__ 之前的节点类（属性存放在 __dict__ 中）。"""
+    def __init__(self, name, position=None):
+        self.name = name
+        self.full_name = name
+        self.economy = 10000
+        self.guard = 100
+        self.node_id = 0
+        self.connections = set()
+        self.position = position
+
+
+def copy_nodes(nodes, node_class):
+    """按 nodes 复制一组节点（含连接关系）。名称字符串与原节点共用，不计入。"""
+    copies = {}
+    for node in nodes:
+        copy = node_class(node.name, node.position)
+        copy.full_name = node.full_name
+        copy.node_id = node.node_id
+        copies[node] = copy
+    for node, copy in copies.items():
+        copy.connections.update(copies[c] for c in node.connections)
+    return list(copies.values())
+
+
+def measure(args, build):
+    """
+    返回 (占用内存字节数, 完整 GC 耗时秒数)。
+    GC 计时前先释放用于复制的模型，只有被测的结构存活。
+    """
+    model = make_model(args.lines, args.nodes_per_line, degree=args.degree)
+    gc.collect()
+    tracemalloc.start()
+    result = build(model.all_nodes)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del model
+    gc.collect()
+    start = time.perf_counter()
+    gc.collect()
+    gc_seconds = time.perf_counter() - start
+    del result
+    return size, gc_seconds
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--lines", type=int, default=5000)
+    parser.add_argument("--nodes-per-line", type=int, default=8)
+    parser.add_argument("--degree", type=int, default=2)
+    args = parser.parse_args()
+
+    print(f"{args.lines} 行, 每行 {args.nodes_per_line} 个节点, 平均相邻节点数 {args.degree}")
+    node_count = args.lines * args.nodes_per_line
+    cases = (
+        ("无", lambda nodes: None),
+        ("__dict__ 节点", lambda nodes: copy_nodes(nodes, LegacyNode)),
+        ("__slots__ 节点", lambda nodes: copy_nodes(nodes, CityNode)),
+        ("NodeStore", NodeStore.from_nodes),
+        # 压缩后的模型中每个节点还有一个常驻的视图对象
+        ("NodeStore + 视图", lambda nodes: list(NodeStore.from_nodes(nodes))),
+    )
+    for label, build in cases:
+        size, gc_seconds = measure(args, build)
+        print(f"{label:16s} {size / 1024 / 1024:8.2f} MiB  {size / node_count:7.1f} B/节点"
+              f"  gc.collect {gc_seconds * 1000:7.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
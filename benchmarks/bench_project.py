@@ -0,0 +1,56 @@
+"""
+项目文件（.tkmap）与 erb 的打开、保存耗时及文件大小：同一张地图分别保存为两种格式后打开。
+打开 erb 需要重新分词、按全名恢复连接；项目文件直接读取各列，映射打开（lazy）时只解码被读取的名称。
+
+    python -m benchmarks.bench_project --sizes 500 2000 8000
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from benchmarks.synthetic import make_model
+from erb_export import export_to_file
+from erb_import import load_erb
+from project_file import load_project, save_project
+
+
+def _best_ms(func, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[500, 2000, 8000])
+    parser.add_argument("--nodes-per-line", type=int, default=8)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for line_count in args.sizes:
+            model = make_model(line_count, args.nodes_per_line)
+            erb_file = os.path.join(tmp_dir, f"MAP_BENCH_{line_count}.erb")
+            project_file = os.path.join(tmp_dir, f"bench_{line_count}.tkmap")
+
+            erb_save = _best_ms(lambda: export_to_file(model, "BENCH", erb_file), args.repeat)
+            project_save = _best_ms(lambda: save_project(model, project_file), args.repeat)
+            erb_open = _best_ms(lambda: load_erb(erb_file), args.repeat)
+            project_open = _best_ms(lambda: load_project(project_file), args.repeat)
+            # 映射打开后读取一个节点（命令行统计、导出的典型开头）
+            lazy_open = _best_ms(lambda: load_project(project_file, lazy=True).all_nodes[0].full_name, args.repeat)
+
+            print(f"{line_count:6d} 行 {len(model.all_nodes):7d} 节点")
+            print(f"  erb     : 保存 {erb_save:8.1f} ms, 打开 {erb_open:8.1f} ms, "
+                  f"{os.path.getsize(erb_file) / 1024:8.1f} KiB")
+            print(f"  .tkmap  : 保存 {project_save:8.1f} ms, 打开 {project_open:8.1f} ms, "
+                  f"{os.path.getsize(project_file) / 1024:8.1f} KiB")
+            print(f"  映射打开: {lazy_open:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+比较文本模式（ClickableMapBrowser）、场景模式（MapSceneView）与虚拟模式（VirtualMapView）下
+首次渲染、单次点击、单次按键的耗时，以及同一轮事件循环中连续修改时请求渲染与实际渲染的次数。
+
+    python -m benchmarks.bench_render --lines 400 --nodes-per-line 8
+"""
+import argparse
+import os
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PySide6.QtWidgets import QApplication
+
+from benchmarks.synthetic import make_map_text
+from map import MainWindow
+
+
+def _timed(app, func, repeat):
+    start = time.perf_counter()
+    for i in range(repeat):
+        func(i)
+        app.processEvents()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def _type_text(window, text):
+    # 逐字输入 text，期间不回到事件循环
+    for end in range(1, len(text) + 1):
+        window.on_economy_changed(text[:end])
+
+
+def bench_mode(app, text, mode_action, repeat):
+    window = MainWindow()
+    if mode_action:
+        getattr(window, mode_action).setChecked(True)
+    window.show()
+    window.input_area.setPlainText(text)
+    start = time.perf_counter()
+    window.on_update_pressed()
+    window.wait_until_idle()
+    app.processEvents()
+    first_render_ms = (time.perf_counter() - start) * 1000
+
+    nodes = window.model.all_nodes
+    # 点击：选中一个节点后连接/断开另一个节点
+    window.on_map_anchor_clicked(nodes[0])
+    click_ms = _timed(app, lambda i: window.on_map_anchor_clicked(nodes[1 + i % 5]), repeat)
+    # 按键：逐字输入经济值
+    keystroke_ms = _timed(app, lambda i: window.on_economy_changed(str(10000 + i)), repeat)
+    # 连续修改：一轮事件循环中输入 "150000" 的6个字符
+    scheduler = window.render_scheduler
+    scheduler.reset_counters()
+    burst_ms = _timed(app, lambda i: _type_text(window, "150000"), repeat)
+    render_counts = (scheduler.requested, scheduler.performed)
+    window.close()
+    window.deleteLater()
+    app.processEvents()
+    return first_render_ms, click_ms, keystroke_ms, burst_ms, render_counts
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--lines", type=int, default=400)
+    parser.add_argument("--nodes-per-line", type=int, default=8)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    app = QApplication.instance() or QApplication([])
+    text = make_map_text(args.lines, args.nodes_per_line)
+    print(f"地图: {args.lines} 行, 每行 {args.nodes_per_line} 个节点")
+    for label, mode_action in (("文本模式", None), ("场景模式", "scene_mode_action"),
+                               ("虚拟模式", "virtual_mode_action")):
+        first_render_ms, click_ms, keystroke_ms, burst_ms, (requested, performed) = bench_mode(
+            app, text, mode_action, args.repeat)
+        print(f"{label}: 首次渲染 {first_render_ms:.1f} ms, 点击 {click_ms:.2f} ms, 按键 {keystroke_ms:.2f} ms, "
+              f"连续输入6个字符 {burst_ms:.2f} ms（请求渲染 {requested} 次，实际渲染 {performed} 次）")
+
+
+if __name__ == "__main__":
+    main()
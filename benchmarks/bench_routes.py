@@ -0,0 +1,44 @@
+"""
+路线推断耗时随地图规模的变化：规模翻倍时耗时应大致翻倍（线性）。
+合成地图中同一行相邻节点之间都画有 ─，另在每两行之间按列画出 │ 竖线。
+
+    python -m benchmarks.bench_routes --sizes 500 1000 2000 4000
+"""
+import argparse
+import time
+
+from benchmarks.synthetic import make_map_text
+from model import MapModel
+from route_inference import infer_routes
+
+
+def make_routed_text(line_count, nodes_per_line, seed=0) -> str:
+    """在地图行之间插入竖线行，使竖线把上下两行中对齐的节点相连。"""
+    map_lines = make_map_text(line_count, nodes_per_line, seed=seed).split("\n")
+    width = max(map(len, map_lines))
+    lines = []
+    for map_line in map_lines:
+        lines.append(map_line)
+        lines.append("│" + "　" * 3 + "│" * (width // 8))
+    return "\n".join(lines[:-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[500, 1000, 2000, 4000])
+    parser.add_argument("--nodes-per-line", type=int, default=8)
+    args = parser.parse_args()
+
+    for line_count in args.sizes:
+        model = MapModel()
+        model.parse_text(make_routed_text(line_count, args.nodes_per_line))
+        char_count = sum(map(len, model.lines))
+        start = time.perf_counter()
+        inference = infer_routes(model.lines, model.nodes_by_line, model.tokenizer)
+        elapsed = time.perf_counter() - start
+        print(f"{line_count:6d} 行 {len(model.all_nodes):7d} 节点 {char_count:8d} 字符: {elapsed * 1000:8.1f} ms"
+              f"  ({elapsed / char_count * 1e6:.2f} us/字符)  推断 {len(inference.pairs)} 条连接")
+
+
+if __name__ == "__main__":
+    main()
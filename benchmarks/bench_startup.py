@@ -0,0 +1,103 @@
+"""
+冷启动耗时：在新进程中从解释器启动到主窗口第一次绘制的时间，以及 -X importtime 统计的各模块导入耗时。
+超过 --budget-ms 时以返回值 1 退出，可用于检查启动变慢。
+
+    python -m benchmarks.bench_startup --repeat 5 --budget-ms 1000
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIRST_PAINT_MARKER = "FIRST_PAINT"
+
+# 子进程：导入主窗口模块、创建窗口，第一次绘制主窗口时输出标记并退出
+CHILD_SCRIPT = f"""
+import time
+start = time.perf_counter()
+import map
+from PySide6.QtCore import QEvent, QObject
+from PySide6.QtWidgets import QApplication
+app = QApplication([])
+window = map.MainWindow()
+
+class FirstPaint(QObject):
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Paint:
+            print("{FIRST_PAINT_MARKER}", (time.perf_counter() - start) * 1000, flush=True)
+            app.exit(0)
+        return False
+
+first_paint = FirstPaint()
+window.installEventFilter(first_paint)
+window.show()
+app.exec()
+"""
+
+
+def _project_modules() -> set[str]:
+    return {name[:-3] for name in os.listdir(PROJECT_DIR) if name.endswith(".py")}
+
+
+def parse_importtime(stderr) -> dict[str, tuple[int, int]]:
+    """-X importtime 的输出 -> {模块: (自身耗时, 累计耗时)}，单位微秒。"""
+    result = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        result[name.strip()] = (int(self_us), int(cumulative_us))
+    return result
+
+
+def run_once():
+    """返回 (进程启动到第一次绘制的毫秒数, 进程内导入到第一次绘制的毫秒数, 导入耗时)。"""
+    env = dict(os.environ)
+    env.setdefault("QT_QPA_PLATFORM", "offscreen")
+    start = time.perf_counter()
+    process = subprocess.Popen([sys.executable, "-X", "importtime", "-c", CHILD_SCRIPT], cwd=PROJECT_DIR, env=env,
+                               stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    wall_ms = None
+    in_process_ms = None
+    for line in process.stdout:
+        if line.startswith(FIRST_PAINT_MARKER):
+            wall_ms = (time.perf_counter() - start) * 1000
+            in_process_ms = float(line.split()[1])
+    _, stderr = process.communicate()
+    if wall_ms is None:
+        raise RuntimeError(f"子进程没有绘制窗口（返回值 {process.returncode}）:\n{stderr[-2000:]}")
+    return wall_ms, in_process_ms, parse_importtime(stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=5, help="运行次数，报告中位数")
+    parser.add_argument("--top", type=int, default=10, help="列出自身导入耗时最多的几个项目模块")
+    parser.add_argument("--budget-ms", type=float, help="第一次绘制的中位耗时超过该值时返回 1")
+    args = parser.parse_args()
+
+    runs = [run_once() for _ in range(args.repeat)]
+    wall_ms = statistics.median(run[0] for run in runs)
+    in_process_ms = statistics.median(run[1] for run in runs)
+    imports = runs[-1][2]
+    total_import_ms = sum(self_us for self_us, _ in imports.values()) / 1000
+    print(f"启动到第一次绘制: {wall_ms:8.1f} ms（其中从导入 map 开始 {in_process_ms:.1f} ms，中位数，{args.repeat} 次）")
+    print(f"导入模块共 {len(imports)} 个，耗时 {total_import_ms:.1f} ms；map 累计 {imports['map'][1] / 1000:.1f} ms")
+
+    project_modules = _project_modules()
+    own = sorted(((self_us, name) for name, (self_us, _) in imports.items() if name in project_modules),
+                 reverse=True)
+    print("项目模块（自身耗时）:")
+    for self_us, name in own[:args.top]:
+        print(f"  {name:20s} {self_us / 1000:7.1f} ms")
+
+    if args.budget_ms is not None and wall_ms > args.budget_ms:
+        print(f"超出预算 {args.budget_ms:.0f} ms")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+文本模式HTML的大小与生成、渲染耗时：悬浮提示改为鼠标停留时才生成，
+与原来为每个节点预先写入 title 属性的做法对比。
+
+    python -m benchmarks.bench_tooltip --lines 1000 --nodes-per-line 8
+"""
+import argparse
+import os
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PySide6.QtWidgets import QApplication
+
+from benchmarks.synthetic import make_model
+from map import MainWindow
+from node import CityNode
+
+
+def legacy_build_html(window) -> str:
+    """改为按需生成悬浮提示之前的实现：每个节点的提示文本都写进 title 属性。"""
+    lines_html = []
+    for line_entries in window.model.nodes_by_line:
+        line_parts = []
+        for entry in line_entries:
+            if entry[0] == 'text':
+                processed_text = entry[1].replace(' ', '&nbsp;')
+                line_parts.append(f'<span style="white-space: pre;">{processed_text}</span>')
+            elif entry[0] in ('city', 'relay'):
+                node = entry[1]
+                display_text = node.name if isinstance(node, CityNode) else '◇'
+                tooltip = node.tooltip_text()
+                anchor = f'<a name="node_{node.node_id}"></a>'
+                style = [
+                    "color: black",
+                    "font-family: 'MS Gothic'",
+                    "text-decoration: none",
+                    "padding: 0",
+                    "margin: 0"
+                ]
+                if node == window.selected_node:
+                    style.append("background: lightgreen")
+                elif node in window.highlighted_nodes:
+                    style.append("background: pink")
+                link = f'<a title="{tooltip}" href="node_{node.node_id}" style="{";".join(style)}">{display_text}</a>'
+                line_parts.append(anchor + link)
+        lines_html.append(f'<div style="white-space: pre-wrap;">{"".join(line_parts)}</div>')
+    return f'<html><body>{"".join(lines_html)}</body></html>'
+
+
+def measure(window, build_html, repeat):
+    build_ms = render_ms = 0.0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        html = build_html(window)
+        build_ms += time.perf_counter() - start
+        start = time.perf_counter()
+        window.display_area.render_html(html)
+        render_ms += time.perf_counter() - start
+    return len(html.encode("utf-8")), build_ms / repeat * 1000, render_ms / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--lines", type=int, default=1000)
+    parser.add_argument("--nodes-per-line", type=int, default=8)
+    parser.add_argument("--degree", type=int, default=2)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    app = QApplication.instance() or QApplication([])
+    window = MainWindow()
+    window.show()
+    window.set_model(make_model(args.lines, args.nodes_per_line, degree=args.degree))
+    window.wait_until_idle()
+    print(f"地图: {args.lines} 行, 每行 {args.nodes_per_line} 个节点")
+    for label, build_html in (("预先生成提示", legacy_build_html),
+                              ("按需生成提示", MainWindow._build_html)):
+        size, build_ms, render_ms = measure(window, build_html, args.repeat)
+        print(f"{label}: HTML {size / 1024:8.1f} KiB, 生成 {build_ms:7.1f} ms, 渲染 {render_ms:7.1f} ms")
+    window.close()
+
+
+if __name__ == "__main__":
+    main()
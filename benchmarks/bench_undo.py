@@ -0,0 +1,88 @@
+"""
+撤销记录的内存与撤销、重做的耗时：每步保存整张地图的快照，与只记录差异（UndoStack）对比。
+差异记录的耗时应与地图大小无关（修改最后几行时），可以用不同的 --lines 运行对比。
+
+    python -m benchmarks.bench_undo --lines 2000 --nodes-per-line 8
+"""
+import argparse
+import random
+import time
+import tracemalloc
+
+from benchmarks.bench_memory import copy_nodes
+from benchmarks.synthetic import make_model
+from node import CityNode
+from undo import AttributeCommand, ParseCommand, UndoStack, connection_command
+
+
+def _measure_memory(func):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = func()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, after - before
+
+
+def _undo_redo_ms(model, stack):
+    steps = len(stack.undo_commands)
+    start = time.perf_counter()
+    while stack.undo(model):
+        pass
+    undo_ms = (time.perf_counter() - start) / steps * 1000
+    start = time.perf_counter()
+    while stack.redo(model):
+        pass
+    redo_ms = (time.perf_counter() - start) / steps * 1000
+    return undo_ms, redo_ms
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--lines", type=int, default=2000)
+    parser.add_argument("--nodes-per-line", type=int, default=8)
+    parser.add_argument("--steps", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    model = make_model(args.lines, args.nodes_per_line, seed=args.seed)
+    print(f"地图: {args.lines} 行, 每行 {args.nodes_per_line} 个节点, 共 {len(model.all_nodes)} 个节点")
+
+    # 快照：每步复制全部节点及其连接
+    _, snapshot_bytes = _measure_memory(lambda: copy_nodes(model.all_nodes, CityNode))
+    print(f"快照: 每步 {snapshot_bytes / 1024:9.1f} KiB")
+
+    # 差异：连接、属性、修改最后一行（换掉其中一个城市）后更新；各用一个不限内存的 UndoStack
+    rng = random.Random(args.seed)
+    nodes = list(model.all_nodes)
+    last_city = next(node.name for node in reversed(nodes) if isinstance(node, CityNode))
+
+    def toggles(stack):
+        for _ in range(args.steps):
+            node, other = rng.sample(nodes, 2)
+            stack.push(connection_command(model, node, other))
+
+    def attributes(stack):
+        for index in range(args.steps):
+            node = nodes[index]
+            stack.push(AttributeCommand(node, 'economy', node.economy, index))
+            node.economy = index
+
+    def line_edits(stack):
+        for index in range(args.steps):
+            lines = list(model.lines)
+            lines[-1] = lines[-1].replace(last_city if index == 0 else f"城e{index - 1}", f"城e{index}")
+            stack.push(ParseCommand(model.parse_lines(lines, len(lines) - 1, 0)))
+
+    for label, record in (("连接", toggles), ("属性", attributes), ("更新一行", line_edits)):
+        stack = UndoStack(memory_limit=float("inf"))
+        _, memory = _measure_memory(lambda: record(stack))
+        undo_ms, redo_ms = _undo_redo_ms(model, stack)
+        print(f"差异（{label}）: 每步 {memory / args.steps / 1024:7.2f} KiB（估算 {stack.memory / args.steps / 1024:7.2f} KiB）, "
+              f"撤销 {undo_ms:7.3f} ms, 重做 {redo_ms:7.3f} ms")
+        while stack.undo(model):
+            pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+点击“更新”后界面线程的最长停顿：在界面线程中同步解析、生成HTML，与在后台线程中进行对比。
+停顿由一个每 5 ms 触发一次的定时器测量（相邻两次触发的最大间隔）。
+
+    python -m benchmarks.bench_update --lines 1600 --nodes-per-line 8
+"""
+import argparse
+import os
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PySide6.QtCore import QTimer
+from PySide6.QtWidgets import QApplication
+
+from benchmarks.synthetic import make_map_text
+from map import MainWindow
+
+TICK_MS = 5
+
+
+def _sync_update(window):
+    # 改为后台解析之前的做法
+    window._parse_input()
+    window.display_area.render_html(window._build_html())
+
+
+def measure(app, text, background):
+    window = MainWindow()
+    window.show()
+    window.input_area.setPlainText(text)
+    app.processEvents()
+
+    ticks = []
+    timer = QTimer()
+    timer.setInterval(TICK_MS)
+    timer.timeout.connect(lambda: ticks.append(time.perf_counter()))
+    timer.start()
+    start = time.perf_counter()
+    ticks.append(start)
+    if background:
+        window.on_update_pressed()
+        while window.is_busy():
+            app.processEvents()
+    else:
+        QTimer.singleShot(0, lambda: _sync_update(window))
+        app.processEvents()
+    elapsed = time.perf_counter() - start
+    timer.stop()
+    ticks.append(time.perf_counter())
+
+    max_gap = max(b - a for a, b in zip(ticks, ticks[1:]))
+    window.close()
+    window.deleteLater()
+    app.processEvents()
+    return elapsed, max_gap
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--lines", type=int, default=1600)
+    parser.add_argument("--nodes-per-line", type=int, default=8)
+    args = parser.parse_args()
+
+    app = QApplication.instance() or QApplication([])
+    text = make_map_text(args.lines, args.nodes_per_line)
+    print(f"地图: {args.lines} 行, 每行 {args.nodes_per_line} 个节点")
+    for label, background in (("界面线程", False), ("后台线程", True)):
+        elapsed, max_gap = measure(app, text, background)
+        print(f"{label}: 总耗时 {elapsed * 1000:8.1f} ms, 界面最长停顿 {max_gap * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
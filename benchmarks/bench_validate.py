@@ -0,0 +1,56 @@
+"""
+导出前检查的耗时：每次导出时全量检查（遍历全部节点、计算连通部分），
+与连接、全名变化时增量维护、导出时直接读取结果对比。
+
+    python -m benchmarks.bench_validate --lines 2000 --nodes-per-line 8
+"""
+import argparse
+import random
+import time
+
+from benchmarks.synthetic import make_model
+from validation import EXPORT_CHECKS, MapValidator
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--lines", type=int, default=2000)
+    parser.add_argument("--nodes-per-line", type=int, default=8)
+    parser.add_argument("--degree", type=int, default=2)
+    parser.add_argument("--toggles", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    model = make_model(args.lines, args.nodes_per_line, degree=args.degree, seed=args.seed)
+    print(f"地图: {args.lines} 行, 每行 {args.nodes_per_line} 个节点, 共 {len(model.all_nodes)} 个节点")
+
+    start = time.perf_counter()
+    validator = MapValidator(model)
+    validator.rebuild()
+    validator.messages(EXPORT_CHECKS)
+    print(f"全量检查: {(time.perf_counter() - start) * 1000:8.1f} ms")
+
+    # 在相近的节点之间随机建立、取消连接，模拟在地图上点击
+    rng = random.Random(args.seed)
+    nodes = list(model.all_nodes)
+    pairs = []
+    for _ in range(args.toggles):
+        index = rng.randrange(len(nodes) - 1)
+        pairs.append((nodes[index], nodes[min(len(nodes) - 1, index + rng.randint(1, args.nodes_per_line))]))
+    for label, ready in (("不维护检查结果", False), ("增量维护", True)):
+        model.validator.invalidate()
+        if ready:
+            model.validator.rebuild()
+        start = time.perf_counter()
+        for node, other in pairs:
+            model.toggle_connection(node, other)
+        elapsed = time.perf_counter() - start
+        print(f"{label}: 每次连接 {elapsed / len(pairs) * 1e6:8.1f} µs")
+
+    start = time.perf_counter()
+    messages = model.validator.messages(EXPORT_CHECKS)
+    print(f"导出时读取结果: {(time.perf_counter() - start) * 1000:8.1f} ms（{len(messages)} 条提示）")
+
+
+if __name__ == "__main__":
+    main()
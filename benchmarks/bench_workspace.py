@@ -0,0 +1,72 @@
+"""
+多张地图（标签页）之间切换的耗时，直到显示完成：切换到保留渲染结果的地图、只保留模型的地图、已换出到文件的地图。
+--memory-mib 为工作区的内存上限，较小时大部分地图会被换出。
+
+    python -m benchmarks.bench_workspace --maps 24 --lines 400 --memory-mib 32
+"""
+import argparse
+import os
+import statistics
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PySide6.QtWidgets import QApplication
+
+from benchmarks.synthetic import make_model
+from map import MainWindow
+
+
+def _switch(window, index) -> float:
+    start = time.perf_counter()
+    window.tab_bar.setCurrentIndex(index)
+    window.wait_until_idle()
+    return (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--maps", type=int, default=24)
+    parser.add_argument("--lines", type=int, default=400)
+    parser.add_argument("--nodes-per-line", type=int, default=8)
+    parser.add_argument("--memory-mib", type=float, default=32)
+    args = parser.parse_args()
+
+    app = QApplication([])
+    window = MainWindow()
+    window.workspace.memory_limit = int(args.memory_mib * 1024 * 1024)
+    window.show()
+    for i in range(args.maps):
+        window.open_map(make_model(args.lines, args.nodes_per_line, seed=i), f"MAP_{i}")
+        window.wait_until_idle()
+    workspace = window.workspace
+    loaded = sum(document.is_loaded() for document in workspace.documents)
+    print(f"{args.maps} 张地图（每张 {args.lines} 行），已加载 {loaded} 张，"
+          f"估算内存 {workspace.loaded_memory() / 1024 / 1024:.1f} MiB，换出 {workspace.swapped_out} 次")
+
+    results = {"保留渲染结果": [], "只保留模型": [], "从文件读回": []}
+    last = args.maps - 1
+    for i in range(args.maps):
+        if i == last:
+            continue
+        document = workspace.documents[i]
+        if document.rendered is not None:
+            kind = "保留渲染结果"
+        elif document.is_loaded():
+            kind = "只保留模型"
+        else:
+            kind = "从文件读回"
+        results[kind].append(_switch(window, i))
+        # 来回切换：刚离开的地图保留了渲染结果
+        results["保留渲染结果"].append(_switch(window, last))
+        last = i
+
+    for kind, times in results.items():
+        if times:
+            print(f"{kind:8s} {statistics.median(times):8.1f} ms（中位数，{len(times)} 次）")
+    window.close()
+    app.quit()
+
+
+if __name__ == "__main__":
+    main()
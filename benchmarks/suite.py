@@ -0,0 +1,221 @@
+"""
+基准测试套件：在 offscreen 平台下对合成地图计时解析、渲染、点击、导入、导出，结果输出为 JSON，
+可与其他版本的结果对比。
+
+    python -m benchmarks.suite --lines 100 400 1600 --output result.json
+    python -m benchmarks.suite --lines 100 400 1600 --compare result.json
+
+地图文本和 erb 文件生成在 --fixtures-dir 中（默认 benchmarks/fixtures），已存在时直接复用。
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from unittest import mock
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import PySide6
+from PySide6.QtGui import QTextCursor
+from PySide6.QtWidgets import QApplication, QFileDialog, QInputDialog, QMessageBox
+
+from benchmarks.synthetic import write_fixture
+from map import MainWindow
+from model import MapModel
+
+DEFAULT_FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+#
+# 各个场景：setup(window) 在计时前执行，run(window, i) 为计时部分
+#
+def _time_runs(app, window, setup, run, repeat) -> list[float]:
+    timings = []
+    for i in range(repeat + 1):
+        if setup:
+            setup(window, i)
+        app.processEvents()
+        start = time.perf_counter()
+        run(window, i)
+        app.processEvents()
+        elapsed = (time.perf_counter() - start) * 1000
+        if i:  # 第一次为预热，不计入
+            timings.append(elapsed)
+    return timings
+
+
+def _reset_text(text):
+    def setup(window, i):
+        window.model = MapModel()
+        window.input_area.setPlainText(text)
+    return setup
+
+
+def _edit_middle_line(window, i):
+    # 在中间一行的开头交替插入、删除一个城市，只有这一行需要重新分词
+    doc = window.input_area.document()
+    cursor = QTextCursor(doc.findBlockByNumber(doc.blockCount() // 2))
+    if i % 2 == 0:
+        cursor.insertText("新城─")
+    else:
+        cursor.movePosition(QTextCursor.NextCharacter, QTextCursor.KeepAnchor, 3)
+        cursor.removeSelectedText()
+
+
+def _render(window, i):
+    window.display_area.render_html(window._build_html())
+
+
+def _import(window, i):
+    window.import_data()
+    window.wait_until_idle()
+
+
+def _export(window, i):
+    window.export_data()
+    window.wait_until_idle()
+
+
+def _remove_exported(window, i):
+    for file_name in os.listdir("."):
+        os.remove(file_name)
+
+
+def _click(window, i):
+    # 选中第一个节点后，轮流连接/断开其后的几个节点
+    nodes = window.model.all_nodes
+    if window.selected_node is None:
+        window.on_map_anchor_clicked(nodes[0])
+    window.on_map_anchor_clicked(nodes[1 + i % min(5, len(nodes) - 1)])
+
+
+def run_scenarios(app, text, erb_file, repeat) -> dict[str, list[float]]:
+    window = MainWindow()
+    window.show()
+    timings = {}
+
+    timings["parse_full"] = _time_runs(app, window, _reset_text(text), lambda w, i: w._parse_input(), repeat)
+    window.on_update_pressed()
+    window.wait_until_idle()
+    timings["parse_edit_line"] = _time_runs(
+        app, window, _edit_middle_line, lambda w, i: w._parse_input(), repeat)
+    window.on_update_pressed()
+    window.wait_until_idle()
+    timings["render"] = _time_runs(app, window, None, _render, repeat)
+    timings["click"] = _time_runs(app, window, None, _click, repeat)
+
+    with mock.patch.object(QFileDialog, "getOpenFileName", return_value=(erb_file, "")), \
+            mock.patch.object(QMessageBox, "information"):
+        timings["import_data"] = _time_runs(app, window, None, _import, repeat)
+
+    old_cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp_dir, \
+            mock.patch.object(QInputDialog, "getText", return_value=("BENCH", True)), \
+            mock.patch.object(QMessageBox, "question", return_value=QMessageBox.Yes), \
+            mock.patch.object(QMessageBox, "information"):
+        # 导出到当前目录，每次导出后删除，使文件名保持为 MAP_BENCH_1.erb
+        os.chdir(tmp_dir)
+        try:
+            timings["export_data"] = _time_runs(
+                app, window, _remove_exported, _export, repeat)
+        finally:
+            os.chdir(old_cwd)
+
+    window.close()
+    window.deleteLater()
+    app.processEvents()
+    return timings
+
+
+#
+# 结果汇总与对比
+#
+def summarize(timings: list[float]) -> dict:
+    return {
+        "min_ms": min(timings),
+        "median_ms": statistics.median(timings),
+        "mean_ms": statistics.fmean(timings),
+        "repeat": len(timings),
+    }
+
+
+def _git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def format_comparison(results, baseline) -> str:
+    """按相同的地图规模和场景对比中位数，比值大于 1 表示比基准慢。"""
+    baseline_by_key = {(r["fixture"], r["scenario"]): r for r in baseline["results"]}
+    lines = [f"对比基准 {baseline['meta'].get('revision')}（{baseline['meta'].get('time')}）"]
+    for result in results:
+        old = baseline_by_key.get((result["fixture"], result["scenario"]))
+        if old is None:
+            continue
+        ratio = result["median_ms"] / old["median_ms"] if old["median_ms"] else float("inf")
+        lines.append(f"  {result['fixture']:28s} {result['scenario']:16s} "
+                     f"{old['median_ms']:9.2f} -> {result['median_ms']:9.2f} ms  x{ratio:.2f}")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--lines", type=int, nargs="+", default=[100, 400])
+    parser.add_argument("--nodes-per-line", type=int, default=8, help="每行节点数（城市与中继的总密度）")
+    parser.add_argument("--relay-ratio", type=float, default=0.3, help="节点中中继所占比例")
+    parser.add_argument("--degree", type=int, default=2, help="平均相邻节点数")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--fixtures-dir", default=DEFAULT_FIXTURES_DIR)
+    parser.add_argument("--output", help="结果写入 JSON 文件，默认输出到标准输出")
+    parser.add_argument("--compare", help="与之前保存的 JSON 结果对比")
+    args = parser.parse_args()
+
+    app = QApplication.instance() or QApplication([])
+    results = []
+    for line_count in args.lines:
+        txt_file, erb_file = write_fixture(args.fixtures_dir, line_count, args.nodes_per_line,
+                                           args.relay_ratio, args.degree, args.seed)
+        with open(txt_file, "r", encoding="utf-8") as f:
+            text = f.read().rstrip("\n")
+        fixture = os.path.splitext(os.path.basename(txt_file))[0]
+        timings = run_scenarios(app, text, erb_file, args.repeat)
+        for scenario, scenario_timings in timings.items():
+            result = {"fixture": fixture, "lines": line_count, "scenario": scenario}
+            result.update(summarize(scenario_timings))
+            results.append(result)
+            print(f"{fixture:28s} {scenario:16s} {result['median_ms']:9.2f} ms", file=sys.stderr)
+
+    report = {
+        "meta": {
+            "revision": _git_revision(),
+            "time": datetime.datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "pyside6": PySide6.__version__,
+            "platform": platform.platform(),
+            "args": vars(args),
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    else:
+        json.dump(report, sys.stdout, ensure_ascii=False, indent=2)
+        sys.stdout.write("\n")
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            print(format_comparison(results, json.load(f)), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+import os
+import random
+
+from erb_export import export_to_file
+from model import MapModel
+#
+# ------------------------------------------------------------------
+#  合成地图：用于基准测试的随机 ASCII 地图
+#  城市密度、中继密度由每行节点数和中继比例决定，连接度为每个节点的平均相邻节点数
+# ------------------------------------------------------------------
+#
+
+def make_map_text(line_count=400, nodes_per_line=8, relay_ratio=0.3, seed=0) -> str:
+    """生成 line_count 行、每行约 nodes_per_line 个节点的地图文本，城市名互不相同。"""
+    rng = random.Random(seed)
+    city_index = 0
+    lines = []
+    for _ in range(line_count):
+        parts = []
+        for _ in range(nodes_per_line):
+            parts.append("─" * rng.randint(1, 3))
+            if rng.random() < relay_ratio:
+                parts.append("◇")
+            else:
+                city_index += 1
+                parts.append(f"城{city_index}")
+        lines.append("".join(parts))
+    return "\n".join(lines)
+
+
+def connect_nodes(model: MapModel, degree=2, seed=0):
+    """
+    按从上到下、从左到右的顺序，把每个节点与其后最近的几个节点相连，
+    使平均相邻节点数约为 degree；中继点的默认名称随之自动变化。
+    """
+    rng = random.Random(seed)
+    ordered = [entry[1] for line_entries in model.nodes_by_line
+               for entry in line_entries if entry[0] != 'text']
+    for index, node in enumerate(ordered):
+        for other in ordered[index + 1:index + 1 + degree]:
+            # 每个节点只向后连接，随机取一半左右，平均相邻节点数约为 degree
+            if rng.random() < 0.5 and other not in node.connections:
+                model.toggle_connection(node, other)
+
+
+def make_model(line_count=400, nodes_per_line=8, relay_ratio=0.3, degree=2, seed=0) -> MapModel:
+    model = MapModel()
+    model.parse_text(make_map_text(line_count, nodes_per_line, relay_ratio, seed))
+    connect_nodes(model, degree, seed)
+    return model
+
+
+def fixture_name(line_count, nodes_per_line, relay_ratio, degree, seed) -> str:
+    return f"map_{line_count}x{nodes_per_line}_r{round(relay_ratio * 100)}_d{degree}_s{seed}"
+
+
+def write_fixture(directory, line_count=400, nodes_per_line=8, relay_ratio=0.3, degree=2, seed=0):
+    """
+    在 directory 中生成同名的地图文本（.txt）和导出结果（.erb），已存在时直接复用，
+    使不同版本的基准测试使用同一份输入。返回 (txt 路径, erb 路径)。
+    """
+    name = fixture_name(line_count, nodes_per_line, relay_ratio, degree, seed)
+    txt_file = os.path.join(directory, name + ".txt")
+    erb_file = os.path.join(directory, name + ".erb")
+    if not (os.path.exists(txt_file) and os.path.exists(erb_file)):
+        os.makedirs(directory, exist_ok=True)
+        model = make_model(line_count, nodes_per_line, relay_ratio, degree, seed)
+        with open(txt_file, "w", encoding="utf-8") as f:
+            f.write("\n".join(model.lines) + "\n")
+        export_to_file(model, name, erb_file)
+    return txt_file, erb_file
@@ -1,12 +1,36 @@
-from PySide6.QtCore import QUrl, Qt
-from PySide6.QtGui import QMouseEvent
-from PySide6.QtWidgets import QTextBrowser
+from PySide6.QtCore import QEvent, QUrl, Qt
+from PySide6.QtGui import QBrush, QColor, QMouseEvent, QTextCharFormat, QTextCursor, QTextDocument
+from PySide6.QtWidgets import QTextBrowser, QToolTip
+
+from profiling import profiler
+from rubber_band import RubberBandSelector, find_window
 #
 # ------------------------------------------------------------------
 #  可点击地图浏览器：带锚点检测的只读文本区域
 # ------------------------------------------------------------------
 #
 
+SELECTED_BRUSH = QBrush(QColor("lightgreen"))
+HIGHLIGHTED_BRUSH = QBrush(QColor("pink"))
+MARKED_BRUSH = QBrush(QColor("lightskyblue"))
+NO_BRUSH = QBrush()
+
+
+class RenderedMap:
+    """从浏览器中取下的渲染结果：排版好的文档、锚点范围、节点背景和滚动位置。"""
+    __slots__ = ('document', 'anchor_ranges', 'node_styles', 'scroll')
+
+    def __init__(self, document, anchor_ranges, node_styles, scroll):
+        self.document = document
+        self.anchor_ranges = anchor_ranges
+        self.node_styles = node_styles
+        self.scroll = scroll
+
+    def release(self):
+        self.document.deleteLater()
+        self.document = None
+
+
 class ClickableMapBrowser(QTextBrowser):
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -15,22 +39,202 @@ class ClickableMapBrowser(QTextBrowser):
         self.setOpenExternalLinks(False)
         # 连接 anchorClicked 信号，不做默认处理
         self.anchorClicked.connect(lambda url: None)
+        # 每个节点锚点在文档中的范围 {node_id: (起始位置, 结束位置)}
+        self.anchor_ranges = {}
+        # 每个节点最近一次写入的背景 {node_id: 背景}
+        self.node_styles = {}
+        # 悬浮提示在鼠标停留时才生成：hover_info_provider(node_id) 返回提示文本或 None，
+        # 结果缓存到该节点发生变化（restyle_nodes 收到该节点）或整体重新渲染为止
+        self.hover_info_provider = None
+        self.tooltip_cache = {}
+        # 框选：node_lookup(node_id) 返回节点
+        self.node_lookup = None
+        # document_is_current() 为 False 时（重新解析后尚未换上新的HTML），文档中的锚点编号可能已指向其他节点，
+        # 不响应节点的点击和框选，也不显示悬浮提示
+        self.document_is_current = None
+        self.rubber_band = RubberBandSelector(self)
+
+    #
+    # 整体渲染：设置HTML并记录每个节点锚点的文档范围，保持滚动位置
+    #
+    def render_html(self, html: str):
+        h_value = self.horizontalScrollBar().value()
+        v_value = self.verticalScrollBar().value()
+        with profiler.stage("set_html"):
+            self.setHtml(html)
+        self.document().setUndoRedoEnabled(False)
+        self.horizontalScrollBar().setValue(h_value)
+        self.verticalScrollBar().setValue(v_value)
+
+        self.anchor_ranges = {}
+        self.node_styles = {}
+        self.tooltip_cache = {}
+        block = self.document().begin()
+        while block.isValid():
+            it = block.begin()
+            while not it.atEnd():
+                fragment = it.fragment()
+                href = fragment.charFormat().anchorHref()
+                if href.startswith("node_"):
+                    node_id = int(href[5:])
+                    start = fragment.position()
+                    end = start + fragment.length()
+                    if node_id in self.anchor_ranges:
+                        old_start, old_end = self.anchor_ranges[node_id]
+                        start, end = min(start, old_start), max(end, old_end)
+                    self.anchor_ranges[node_id] = (start, end)
+                it += 1
+            block = block.next()
+
+    #
+    # 切换地图：取下当前的渲染结果（换上空文档），或者换回之前取下的结果，都不需要重新排版
+    #
+    def take_rendered(self) -> RenderedMap:
+        # 文本控件换文档时会删除它自己创建的文档，先改为浏览器所有
+        self.document().setParent(self)
+        rendered = RenderedMap(self.document(), self.anchor_ranges, self.node_styles,
+                               (self.horizontalScrollBar().value(), self.verticalScrollBar().value()))
+        document = QTextDocument(self)
+        document.setUndoRedoEnabled(False)
+        self.setDocument(document)
+        self.anchor_ranges = {}
+        self.node_styles = {}
+        self.tooltip_cache = {}
+        return rendered
+
+    def restore_rendered(self, rendered: RenderedMap):
+        """换回 rendered 的文档；当前文档被释放。"""
+        current = self.document()
+        self.setDocument(rendered.document)
+        current.deleteLater()
+        self.anchor_ranges = rendered.anchor_ranges
+        self.node_styles = rendered.node_styles
+        self.tooltip_cache = {}
+        self.horizontalScrollBar().setValue(rendered.scroll[0])
+        self.verticalScrollBar().setValue(rendered.scroll[1])
+
+    #
+    # 局部渲染：只改写样式实际发生变化的节点的字符格式
+    #
+    def restyle_nodes(self, nodes, selected_node, highlighted_nodes, marked_nodes=frozenset()):
+        cursor = None
+        for node in nodes:
+            self.tooltip_cache.pop(node.node_id, None)
+            node_range = self.anchor_ranges.get(node.node_id)
+            if node_range is None:
+                continue
+            if node == selected_node:
+                brush = SELECTED_BRUSH
+            elif node in marked_nodes:
+                brush = MARKED_BRUSH
+            elif node in highlighted_nodes:
+                brush = HIGHLIGHTED_BRUSH
+            else:
+                brush = NO_BRUSH
+            if self.node_styles.get(node.node_id) == brush:
+                continue
+            self.node_styles[node.node_id] = brush
+
+            if cursor is None:
+                cursor = QTextCursor(self.document())
+                cursor.beginEditBlock()
+            char_format = QTextCharFormat()
+            char_format.setBackground(brush)
+            cursor.setPosition(node_range[0])
+            cursor.setPosition(node_range[1], QTextCursor.KeepAnchor)
+            cursor.mergeCharFormat(char_format)
+        if cursor is not None:
+            cursor.endEditBlock()
+
+    #
+    # 悬浮提示：根据鼠标下的锚点找到节点，按需生成提示文本
+    #
+    def node_id_at(self, pos) -> int | None:
+        """视口坐标 pos 处节点锚点的编号，没有时返回 None。"""
+        href = self.anchorAt(pos)
+        if href.startswith("node_"):
+            try:
+                return int(href[5:])
+            except ValueError:
+                return None
+        return None
+
+    def nodes_in_rect(self, rect) -> list:
+        """视口矩形 rect 内（与之相交）的节点（框选）：只检查矩形上下边所在行之间的锚点。"""
+        if self.node_lookup is None:
+            return []
+        document = self.document()
+        top = document.findBlock(self.cursorForPosition(rect.topLeft()).position()).position()
+        bottom_block = document.findBlock(self.cursorForPosition(rect.bottomRight()).position())
+        bottom = bottom_block.position() + bottom_block.length()
+        cursor = QTextCursor(document)
+        nodes = []
+        for node_id, (start, end) in self.anchor_ranges.items():
+            if not top <= start < bottom:
+                continue
+            cursor.setPosition(start)
+            start_rect = self.cursorRect(cursor)
+            cursor.setPosition(end)
+            node_rect = start_rect.united(self.cursorRect(cursor))
+            if node_rect.intersects(rect):
+                node = self.node_lookup(node_id)
+                if node is not None:
+                    nodes.append(node)
+        return nodes
+
+    def hover_info(self, node_id) -> str | None:
+        if not self.is_document_current():
+            return None
+        if node_id in self.tooltip_cache:
+            return self.tooltip_cache[node_id]
+        if self.hover_info_provider is None:
+            return None
+        text = self.hover_info_provider(node_id)
+        if text is not None:
+            self.tooltip_cache[node_id] = text
+        return text
+
+    def viewportEvent(self, event):
+        if event.type() == QEvent.ToolTip:
+            node_id = self.node_id_at(event.pos())
+            text = self.hover_info(node_id) if node_id is not None else None
+            if text:
+                QToolTip.showText(event.globalPos(), text, self.viewport())
+            else:
+                QToolTip.hideText()
+                event.ignore()
+            return True
+        return super().viewportEvent(event)
 
     def mouseDoubleClickEvent(self, ev):
         ev.accept()
 
+    def mouseMoveEvent(self, event):
+        if not self.rubber_band.move(event):
+            super().mouseMoveEvent(event)
+
     def mouseReleaseEvent(self, ev):
+        if not self.is_document_current():
+            self.rubber_band.cancel()
+        self.rubber_band.release(ev)
         ev.accept()
 
+    def is_document_current(self) -> bool:
+        return self.document_is_current is None or self.document_is_current()
+
     def mousePressEvent(self, event: QMouseEvent):
         if event.button() == Qt.RightButton:
-            parent_window = self.parent()
-            while parent_window and not hasattr(parent_window, 'on_right_click'):
-                parent_window = parent_window.parent()
+            parent_window = find_window(self, 'on_right_click')
             if parent_window:
                 parent_window.on_right_click()
             event.accept()
             return
+        if not self.is_document_current():
+            event.accept()
+            return
+        if self.rubber_band.press(event):
+            event.accept()
+            return
 
         pos = event.position().toPoint()
         cursor = self.cursorForPosition(pos)
@@ -42,14 +246,14 @@ class ClickableMapBrowser(QTextBrowser):
             except Exception:
                 node_id = None
 
-            parent_window = self.parent()
-            while parent_window and not hasattr(parent_window, 'on_map_anchor_clicked'):
-                parent_window = parent_window.parent()
+            # ctrl+点击：加入或移出批量选择
+            handler = 'on_map_anchor_marked' if event.modifiers() & Qt.ControlModifier else 'on_map_anchor_clicked'
+            parent_window = find_window(self, handler)
 
             if parent_window and node_id is not None:
-                clicked_node = next((n for n in parent_window.all_nodes if n.node_id == node_id), None)
+                clicked_node = parent_window.model.node_index.get_by_id(node_id)
                 if clicked_node:
-                    parent_window.on_map_anchor_clicked(clicked_node)
+                    getattr(parent_window, handler)(clicked_node)
             event.accept()
         else:
             super().mousePressEvent(event)
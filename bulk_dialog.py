@@ -0,0 +1,111 @@
+from PySide6.QtWidgets import (
+    QCheckBox, QComboBox, QDialog, QDialogButtonBox, QFormLayout, QLabel, QLineEdit, QMessageBox, QSpinBox,
+    QVBoxLayout
+)
+
+from bulk_edit import full_name_template
+#
+# ------------------------------------------------------------------
+#  批量编辑对话框：按行范围、名称选择节点；一次修改多个节点的经济、防御、全名
+# ------------------------------------------------------------------
+#
+
+MAX_ATTRIBUTE_VALUE = 2 ** 31 - 1
+
+
+class NodeSelectionDialog(QDialog):
+    """确定后由 criteria() 取得 select_nodes 的参数，add_to_selection() 为是否加入已有的选择。"""
+    KINDS = (("全部", None), ("城市", "city"), ("中继点", "relay"))
+
+    def __init__(self, line_count, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("选择节点")
+        self.first_line_spin = QSpinBox()
+        self.first_line_spin.setRange(1, max(1, line_count))
+        self.last_line_spin = QSpinBox()
+        self.last_line_spin.setRange(1, max(1, line_count))
+        self.last_line_spin.setValue(line_count)
+        self.pattern_edit = QLineEdit()
+        self.pattern_edit.setPlaceholderText("例如 *城、北*（匹配名称或全名，留空为不限）")
+        self.kind_combo = QComboBox()
+        for label, _ in self.KINDS:
+            self.kind_combo.addItem(label)
+        self.add_check = QCheckBox("加入已有的选择")
+
+        form = QFormLayout()
+        form.addRow("从第几行:", self.first_line_spin)
+        form.addRow("到第几行:", self.last_line_spin)
+        form.addRow("名称:", self.pattern_edit)
+        form.addRow("类型:", self.kind_combo)
+        button_box = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
+        button_box.accepted.connect(self.accept)
+        button_box.rejected.connect(self.reject)
+        layout = QVBoxLayout(self)
+        layout.addLayout(form)
+        layout.addWidget(self.add_check)
+        layout.addWidget(button_box)
+
+    def criteria(self) -> dict:
+        first, last = sorted((self.first_line_spin.value(), self.last_line_spin.value()))
+        return {
+            "first_line": first,
+            "last_line": last,
+            "pattern": self.pattern_edit.text().strip() or None,
+            "kind": self.KINDS[self.kind_combo.currentIndex()][1],
+        }
+
+    def add_to_selection(self) -> bool:
+        return self.add_check.isChecked()
+
+
+class BulkEditDialog(QDialog):
+    """确定后由 changes() 取得 [(属性, 值或函数), ...]，只包含勾选的项。"""
+    def __init__(self, node_count, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("批量修改属性")
+        self.economy_check = QCheckBox("经济:")
+        self.economy_spin = QSpinBox()
+        self.economy_spin.setRange(0, MAX_ATTRIBUTE_VALUE)
+        self.economy_spin.setValue(10000)
+        self.guard_check = QCheckBox("防御:")
+        self.guard_spin = QSpinBox()
+        self.guard_spin.setRange(0, MAX_ATTRIBUTE_VALUE)
+        self.guard_spin.setValue(100)
+        self.full_name_check = QCheckBox("全名:")
+        self.full_name_edit = QLineEdit("{name}")
+        self.full_name_edit.setToolTip("可以使用 {name} 名称、{full_name} 原来的全名、{id} ID、{line} 行号")
+        # 修改数值时自动勾选对应的项
+        self.economy_spin.valueChanged.connect(lambda: self.economy_check.setChecked(True))
+        self.guard_spin.valueChanged.connect(lambda: self.guard_check.setChecked(True))
+        self.full_name_edit.textEdited.connect(lambda: self.full_name_check.setChecked(True))
+
+        form = QFormLayout()
+        form.addRow(self.economy_check, self.economy_spin)
+        form.addRow(self.guard_check, self.guard_spin)
+        form.addRow(self.full_name_check, self.full_name_edit)
+        button_box = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
+        button_box.accepted.connect(self.accept)
+        button_box.rejected.connect(self.reject)
+        layout = QVBoxLayout(self)
+        layout.addWidget(QLabel(f"修改选中的 {node_count} 个节点（作为一次修改，可以整体撤销）"))
+        layout.addLayout(form)
+        layout.addWidget(button_box)
+
+    def accept(self):
+        if self.full_name_check.isChecked():
+            try:
+                full_name_template(self.full_name_edit.text())
+            except ValueError as e:
+                QMessageBox.warning(self, "错误", str(e))
+                return
+        super().accept()
+
+    def changes(self) -> list:
+        changes = []
+        if self.economy_check.isChecked():
+            changes.append(("economy", self.economy_spin.value()))
+        if self.guard_check.isChecked():
+            changes.append(("guard", self.guard_spin.value()))
+        if self.full_name_check.isChecked():
+            changes.append(("full_name", full_name_template(self.full_name_edit.text())))
+        return changes
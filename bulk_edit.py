@@ -0,0 +1,183 @@
+import csv
+import fnmatch
+import re
+
+from model import MapModel
+from node import CityNode, MapNode
+from undo import AttributeCommand, CompoundCommand, connection_command
+#
+# ------------------------------------------------------------------
+#  批量编辑：按行范围、名称选择节点，对多个节点的属性和连接的修改作为一个事务一次应用，
+#  产生一条撤销记录；节点属性表与 CSV 文件之间的导出、导入
+# ------------------------------------------------------------------
+#
+
+ATTRIBUTES = ("full_name", "economy", "guard")
+
+CSV_COLUMNS = ("id", "kind", "name", "full_name", "economy", "guard", "line", "column", "connections")
+CSV_ENCODING = "utf-8-sig"  # 带 BOM，Excel 可以直接打开
+
+
+def select_nodes(model: MapModel, first_line=None, last_line=None, pattern=None, kind=None) -> list[MapNode]:
+    """
+    按条件筛选节点，按ID排列。first_line、last_line 为行号（从 1 开始，含两端），
+    pattern 为通配符（* ?），与名称或全名匹配即可，kind 为 "city" / "relay"；省略的条件不限制。
+    """
+    if kind not in (None, 'city', 'relay'):
+        raise ValueError(f"未知的节点类型: {kind}")
+    matcher = re.compile(fnmatch.translate(pattern)).match if pattern else None
+    first = first_line - 1 if first_line else 0
+    last = last_line if last_line else len(model.nodes_by_line)
+    result = [entry[1] for line_entries in model.nodes_by_line[first:last]
+              for entry in line_entries
+              if entry[0] != 'text' and (kind is None or entry[0] == kind)]
+    if matcher is not None:
+        result = [node for node in result if matcher(node.name) or matcher(node.full_name)]
+    result.sort(key=lambda node: node.node_id)
+    return result
+
+
+def full_name_template(template: str):
+    """
+    全名模板 -> 函数(节点) -> 全名。模板中可以使用 {name}、{full_name}、{id}、{line}（行号，从 1 开始），
+    例如 "{name}城"；模板有误时抛出 ValueError。
+    """
+    def apply(node):
+        line = node.position[0] + 1 if node.position is not None else ""
+        return template.format(name=node.name, full_name=node.full_name, id=node.node_id, line=line)
+
+    try:
+        template.format(name="", full_name="", id=0, line=0)
+    except (KeyError, IndexError, ValueError, AttributeError, TypeError) as e:
+        raise ValueError(f"全名模板有误: {template}（{e}）") from None
+    return apply
+
+
+class Transaction:
+    """
+    收集对多个节点的修改，commit() 时一次应用，返回一条撤销记录（CompoundCommand）；
+    没有实际变化的修改被忽略，全部没有变化时返回 None。同一节点同一属性以最后一次设置为准。
+    """
+    def __init__(self, model: MapModel):
+        self.model = model
+        self._attributes = {}   # (节点, 属性) -> 新值
+        self._connections = {}  # (节点, 节点) -> 是否相连
+
+    def set_attribute(self, nodes, attribute, value):
+        """value 可以是函数(节点) -> 值，例如 full_name_template 的结果。"""
+        if attribute not in ATTRIBUTES:
+            raise ValueError(f"未知的属性: {attribute}")
+        for node in nodes:
+            self._attributes[(node, attribute)] = value(node) if callable(value) else value
+
+    def connect(self, node, other):
+        self._set_connection(node, other, True)
+
+    def disconnect(self, node, other):
+        self._set_connection(node, other, False)
+
+    def _set_connection(self, node, other, connected):
+        if node is other:
+            return
+        if node.node_id > other.node_id:
+            node, other = other, node
+        self._connections[(node, other)] = connected
+
+    def __len__(self):
+        return len(self._attributes) + len(self._connections)
+
+    def commit(self) -> CompoundCommand | None:
+        commands = []
+        # 先改属性：之后的连接变化可能按新的全名更新中继的默认名称
+        for (node, attribute), value in self._attributes.items():
+            old_value = getattr(node, attribute)
+            if old_value == value:
+                continue
+            if attribute == 'full_name':
+                self.model.set_full_name(node, value)
+            else:
+                setattr(node, attribute, value)
+            commands.append(AttributeCommand(node, attribute, old_value, value))
+        for (node, other), connected in self._connections.items():
+            if (other in node.connections) != connected:
+                commands.append(connection_command(self.model, node, other))
+        self._attributes = {}
+        self._connections = {}
+        return CompoundCommand(commands) if commands else None
+
+
+#
+# ------------------------------------------------------------------
+#  属性表（CSV）：每个节点一行，相邻节点以空格分隔的ID表示
+# ------------------------------------------------------------------
+#
+
+def write_attribute_csv(model: MapModel, file_name):
+    with open(file_name, "w", encoding=CSV_ENCODING, newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(CSV_COLUMNS)
+        for node in model.all_nodes:
+            line, column = node.position if node.position is not None else ("", "")
+            writer.writerow((node.node_id, "city" if isinstance(node, CityNode) else "relay", node.name,
+                             node.full_name, node.economy, node.guard,
+                             line + 1 if line != "" else "", column + 1 if column != "" else "",
+                             " ".join(str(node_id) for node_id in sorted(other.node_id for other in node.connections))))
+
+
+def read_attribute_csv(model: MapModel, file_name) -> tuple[Transaction, list[str]]:
+    """
+    读取属性表，返回 (事务, 问题列表)：按ID找到节点，名称与地图上的不一致（地图已改动）的行跳过；
+    全名、经济、防御与当前不同时修改，连接按各行与当前相比增加、删除的相邻节点修改。事务尚未提交。
+    """
+    transaction = Transaction(model)
+    problems = []
+    with open(file_name, "r", encoding=CSV_ENCODING, newline="") as f:
+        reader = csv.DictReader(f)
+        missing = [column for column in ("id", "name") if column not in (reader.fieldnames or ())]
+        if missing:
+            raise ValueError(f"属性表缺少列: {', '.join(missing)}")
+        for row in reader:
+            row_number = reader.line_num
+            try:
+                node_id = int(row["id"])
+            except (TypeError, ValueError):
+                problems.append(f"第 {row_number} 行: ID 无效（{row['id']}）")
+                continue
+            node = model.node_index.get_by_id(node_id)
+            if node is None or node.name != (row["name"] or "").strip():
+                problems.append(f"第 {row_number} 行: 地图上没有ID为 {node_id}、名称为 {row['name']} 的节点，已跳过")
+                continue
+            if row.get("full_name"):
+                transaction.set_attribute((node,), "full_name", row["full_name"].strip())
+            for attribute in ("economy", "guard"):
+                value = (row.get(attribute) or "").strip()
+                if not value:
+                    continue
+                try:
+                    number = int(value)
+                except ValueError:
+                    number = -1
+                if number < 0:
+                    problems.append(f"第 {row_number} 行: {attribute} 不是非负整数（{value}）")
+                    continue
+                transaction.set_attribute((node,), attribute, number)
+            if row.get("connections") is not None:
+                _read_connections(model, transaction, node, row["connections"], row_number, problems)
+    return transaction, problems
+
+
+def _read_connections(model, transaction, node, text, row_number, problems):
+    wanted = set()
+    for item in text.split():
+        try:
+            other = model.node_index.get_by_id(int(item))
+        except ValueError:
+            other = None
+        if other is None:
+            problems.append(f"第 {row_number} 行: 相邻节点ID {item} 不存在")
+            continue
+        wanted.add(other)
+    for other in wanted - node.connections:
+        transaction.connect(node, other)
+    for other in node.connections - wanted:
+        transaction.disconnect(node, other)
@@ -0,0 +1,119 @@
+"""
+命令行工具：不启动图形界面（不导入 PySide6）批量解析、导入、导出地图。
+
+    python cli.py parse 地图.txt ...                   解析地图文本，输出节点统计和导出前警告
+    python cli.py import MAP_X_1.erb -o 地图.txt        导入 erb，输出地图文本
+    python cli.py export 地图.txt MAP_X_1.erb ... --mapid X [--output-dir 目录]
+                                                     导出为 MAP_{mapid}_{n}.erb（输入为 .erb 时先导入）
+                                                     与上次导出相比没有变化时不写文件，--overwrite 覆盖上次导出
+    python cli.py batch 目录 "maps/*.erb" --mapid "{stem}" --output-dir out [--jobs N]
+                                                     多进程批量导出，最后输出汇总报告
+"""
+import argparse
+import os
+import sys
+import time
+
+from batch import format_report, run_batch, write_report_json
+from erb_import import load_erb, load_map_file
+from export_cache import export_map
+from profiling import profiler
+from validation import EXPORT_CHECKS
+
+
+def cmd_parse(args):
+    for file_name in args.inputs:
+        model = load_map_file(file_name)
+        relay_count = len(model.all_nodes) - model.max_city_id
+        print(f"{file_name}: {len(model.lines)} 行, {model.max_city_id} 个城市, {relay_count} 个中继点")
+        for warning in model.validator.messages(EXPORT_CHECKS):
+            print(f"  警告: {warning}")
+    return 0
+
+
+def cmd_import(args):
+    model = load_erb(args.input)
+    text = "\n".join(model.lines)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        sys.stdout.write(text + "\n")
+    return 0
+
+
+def cmd_export(args):
+    os.makedirs(args.output_dir, exist_ok=True)
+    for file_name in args.inputs:
+        model = load_map_file(file_name)
+        # 与图形界面导出前相同的检查：中继仍为默认名称、全名重复、单向连接
+        warnings = model.validator.messages(EXPORT_CHECKS)
+        if warnings:
+            print(f"{file_name}: {len(warnings)} 个导出前警告", file=sys.stderr)
+            for warning in warnings:
+                print(f"  警告: {warning}", file=sys.stderr)
+            if args.strict:
+                return 1
+        output_file, regenerated = export_map(model, args.mapid, args.output_dir, args.overwrite)
+        if regenerated:
+            print(f"{file_name} -> {output_file}")
+        else:
+            print(f"{file_name}: 与 {output_file} 相同，未重新导出")
+    return 0
+
+
+def cmd_batch(args):
+    start = time.perf_counter()
+    results = run_batch(args.inputs, args.mapid, args.output_dir, args.jobs, args.strict, args.overwrite)
+    elapsed = time.perf_counter() - start
+    print(format_report(results, elapsed))
+    if args.report:
+        write_report_json(results, elapsed, args.report)
+    return 1 if any(result.error for result in results) else 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="tk地图制作器命令行工具")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    parse_parser = subparsers.add_parser("parse", help="解析地图并输出统计信息")
+    parse_parser.add_argument("inputs", nargs="+")
+    parse_parser.set_defaults(func=cmd_parse)
+
+    import_parser = subparsers.add_parser("import", help="导入 erb 文件，输出地图文本")
+    import_parser.add_argument("input")
+    import_parser.add_argument("-o", "--output", help="输出文件，默认输出到标准输出")
+    import_parser.set_defaults(func=cmd_import)
+
+    export_parser = subparsers.add_parser("export", help="导出为 erb 文件")
+    export_parser.add_argument("inputs", nargs="+")
+    export_parser.add_argument("--mapid", default="NEWMAP")
+    export_parser.add_argument("--output-dir", default=".")
+    export_parser.add_argument("--strict", action="store_true", help="有导出前警告（中继点仍为默认名称、全名重复、单向连接）时停止导出")
+    export_parser.add_argument("--overwrite", action="store_true", help="覆盖上次导出的文件，而不是使用下一个编号")
+    export_parser.set_defaults(func=cmd_export)
+
+    batch_parser = subparsers.add_parser("batch", help="多进程批量导出目录或通配符匹配的文件")
+    batch_parser.add_argument("inputs", nargs="+", help="目录（取其中的 .txt/.erb/.tkmap）或通配符")
+    batch_parser.add_argument("--mapid", default="{stem}", help="MAPID 模板，可用 {stem} 和 {index}")
+    batch_parser.add_argument("--output-dir", default=".")
+    batch_parser.add_argument("--jobs", type=int, default=None, help="进程数，默认为CPU核数")
+    batch_parser.add_argument("--strict", action="store_true", help="跳过有导出前警告的地图")
+    batch_parser.add_argument("--overwrite", action="store_true", help="覆盖上次导出的文件，而不是使用下一个编号")
+    batch_parser.add_argument("--report", help="同时将汇总报告写入 JSON 文件")
+    batch_parser.set_defaults(func=cmd_batch)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    # 设置了 TK_MAP_PROFILE 时记录整个命令的执行过程（见 profiling.py）
+    profiler.start_session_from_env()
+    try:
+        return args.func(args)
+    finally:
+        profiler.stop_session()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,76 @@
+from PySide6.QtCore import QAbstractListModel, QModelIndex, Qt, QTimer, Signal
+from PySide6.QtWidgets import QDockWidget, QListView
+#
+# ------------------------------------------------------------------
+#  检查面板：列出 MapValidator 的检查结果，列表只为可见的行生成显示内容
+# ------------------------------------------------------------------
+#
+
+REFRESH_DELAY_MS = 200  # 连续编辑时合并刷新
+
+
+class DiagnosticsListModel(QAbstractListModel):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.diagnostics = []  # [(类别, 相关节点, 说明), ...]
+
+    def set_diagnostics(self, diagnostics):
+        self.beginResetModel()
+        self.diagnostics = diagnostics
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.diagnostics)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        if role == Qt.DisplayRole:
+            return self.diagnostics[index.row()][2]
+        if role == Qt.UserRole:
+            return self.diagnostics[index.row()][1]
+        return None
+
+
+class DiagnosticsDock(QDockWidget):
+    """
+    schedule_refresh(validator) 在编辑停顿后读取检查结果，面板隐藏时不读取。
+    点击一项时发出 node_activated(相关节点)。
+    """
+    node_activated = Signal(object)
+
+    def __init__(self, parent=None):
+        super().__init__("检查", parent)
+        self.list_model = DiagnosticsListModel(self)
+        self.list_view = QListView()
+        self.list_view.setUniformItemSizes(True)
+        self.list_view.setModel(self.list_model)
+        self.list_view.clicked.connect(lambda index: self.node_activated.emit(index.data(Qt.UserRole)))
+        self.setWidget(self.list_view)
+
+        self.validator = None
+        self._shown_revision = None  # (validator, revision)
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(REFRESH_DELAY_MS)
+        self._timer.timeout.connect(self.refresh)
+        self.visibilityChanged.connect(lambda visible: self.refresh())
+
+    def schedule_refresh(self, validator):
+        self.validator = validator
+        if self.isVisible() and not self._timer.isActive():
+            self._timer.start()
+
+    def refresh(self):
+        """面板可见且检查结果有变化时立即刷新。"""
+        self._timer.stop()
+        if self.validator is None or not self.isVisible():
+            return
+        self.validator.ensure()
+        revision = (self.validator, self.validator.revision)
+        if revision == self._shown_revision:
+            return
+        self._shown_revision = revision
+        diagnostics = self.validator.diagnostics()
+        self.list_model.set_diagnostics(diagnostics)
+        self.setWindowTitle(f"检查 ({len(diagnostics)})" if diagnostics else "检查")
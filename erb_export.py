@@ -0,0 +1,173 @@
+import os
+from operator import attrgetter
+
+from atomic_file import AtomicWriter
+from model import MapModel
+from node import CityNode
+#
+# ------------------------------------------------------------------
+#  erb 导出：不依赖 Qt，图形界面与命令行共用
+#  每一段（DRAWMAP_LINE、SET_CITYNAME、SET_MAP_ROUTE、MAP_INIT 等）由一个生成器逐行产生，
+#  经同一个缓冲写入器输出，不在内存中保存整个文件
+# ------------------------------------------------------------------
+#
+
+WRITE_CHUNK_LINES = 1024  # 每攒够这么多行写入一次
+
+node_id_key = attrgetter('node_id')
+
+
+def split_nodes(model: MapModel):
+    """只遍历一次 all_nodes，按类型分成城市和中继两组（保持原有顺序）。"""
+    cities = []
+    relays = []
+    for node in model.all_nodes:
+        if isinstance(node, CityNode):
+            cities.append(node)
+        else:
+            relays.append(node)
+    return cities, relays
+
+
+#
+# 各段生成器：参数相同，产生的每个元素对应输出中的一行（部分模板含多行）
+#
+def drawmap_section(model, mapid, cities, relays):
+    yield ";==== Export Start ===="
+    yield f"@DRAWMAP_{mapid}(ARG:0 = 0, ARG:1 = 0)"
+    yield """CALL DRAWMAP_INIT(ARG:0, 0)
+    ;MAP_SHOW_TYPE
+    IF DRAWMAP_MENUBARTYPE != 0
+        CALL DRAWMAP_PRINT_MENU(DRAWMAP_MENUBARTYPE, DRAWMAP_LINECOUNT)
+        DRAWMAP_LINECOUNT++
+        CALL DRAW_MAP_SHOW_CONFIG_BUTTON()
+    ELSE
+        MAP_SHOW_CONFIG = 0
+    ENDIF"""
+    for line_text, line_entries in zip(model.lines, model.nodes_by_line):
+        joined_ids = ",".join(str(entry[1].node_id) for entry in line_entries if entry[0] != 'text')
+        safe_line_text = line_text.replace('"', '\\"')
+        yield f'CALL DRAWMAP_LINE("{safe_line_text}", {joined_ids})'
+    yield "CALL DRAWMAP_END()"
+    yield ""
+
+
+def city_num_section(model, mapid, cities, relays):
+    yield f"@SET_CITY_NUM_{mapid}()"
+    yield f"CITY_NUM = {model.max_city_id}"
+    yield ""
+
+
+def short_city_name_section(model, mapid, cities, relays):
+    yield f"@SET_SHORTCITYNAME_{mapid}()"
+    for node in cities:
+        yield f"CITY_NAME_SHORT:{node.node_id} = {node.name}"
+    yield """FOR LOCAL:0, 0, MAX_CITY
+        SIF CITY_TYPE:(LOCAL:0) == 1
+            CITY_NAME_SHORT:(LOCAL:0) = ●
+    NEXT
+    """
+    yield ""
+
+
+def city_name_section(model, mapid, cities, relays):
+    yield f"@SET_CITYNAME_{mapid}()"
+    yield "VARSET CITY_NAME,\"無名\""
+    for node in cities:
+        yield f"CITY_NAME:{node.node_id} = {node.full_name}"
+    for node in relays:
+        yield f"CITY_NAME:{node.node_id} = {node.full_name}"
+
+
+def city_type_section(model, mapid, cities, relays):
+    yield f"@SET_CITY_TYPE_{mapid}"
+    yield """
+    FOR LOCAL:0, GET_CITY_NUM() + 1, MAX_CITY
+        CITY_TYPE:(LOCAL:0) = 1
+    NEXT
+    """
+    yield ""
+
+
+def map_route_section(model, mapid, cities, relays):
+    yield f"@SET_MAP_ROUTE_{mapid}"
+    for node in model.all_nodes:
+        if node.connections:
+            all_args = '", "'.join(c.full_name for c in sorted(node.connections, key=node_id_key))
+            yield f'CALL REGISTER_ROUTE_S("{node.full_name}", "{all_args}")'
+        else:
+            yield f'CALL REGISTER_ROUTE_S("{node.full_name}")'
+    yield ""
+
+
+def map_init_section(model, mapid, cities, relays):
+    yield f"@MAP_INIT_{mapid}"
+    for node in cities:
+        yield f'CITY_ECONOMY:GET_CITYNUMBER("{node.full_name}") = {node.economy}'
+    yield """
+    FOR LOCAL:0, 1, MAX_CITY
+        CITY_ECONOMY_LIMIT:(LOCAL:0) = MIN(CITY_ECONOMY:(LOCAL:0) * 2, 300000)
+    NEXT
+    """
+    for node in cities:
+        yield f'CITY_GUARD:GET_CITYNUMBER("{node.full_name}") = {node.guard}'
+    yield ";==== Export End ===="
+
+
+EXPORT_SECTIONS = (
+    ("DRAWMAP", drawmap_section),
+    ("SET_CITY_NUM", city_num_section),
+    ("SET_SHORTCITYNAME", short_city_name_section),
+    ("SET_CITYNAME", city_name_section),
+    ("SET_CITY_TYPE", city_type_section),
+    ("SET_MAP_ROUTE", map_route_section),
+    ("MAP_INIT", map_init_section),
+)
+
+
+def iter_export_lines(model: MapModel, mapid):
+    """按顺序逐行产生导出到 erb 文件的全部内容。"""
+    cities, relays = split_nodes(model)
+    for _, section in EXPORT_SECTIONS:
+        yield from section(model, mapid, cities, relays)
+
+
+def write_export(model: MapModel, mapid, file):
+    """把导出内容写入已打开的文本文件，每攒够 WRITE_CHUNK_LINES 行写入一次。"""
+    chunk = []
+    for line in iter_export_lines(model, mapid):
+        chunk.append(line)
+        if len(chunk) >= WRITE_CHUNK_LINES:
+            chunk.append("")
+            file.write("\n".join(chunk))
+            chunk.clear()
+    if chunk:
+        chunk.append("")
+        file.write("\n".join(chunk))
+
+
+def next_export_file_name(mapid, directory="") -> str:
+    """查找可用的文件名 MAP_{mapid}_{n}.erb，n 从 1 开始。"""
+    file_index = 1
+    while True:
+        file_name = os.path.join(directory, f"MAP_{mapid}_{file_index}.erb")
+        if not os.path.exists(file_name):
+            return file_name
+        file_index += 1
+
+
+def latest_export_file_name(mapid, directory=""):
+    """最近一次导出的文件，即 next_export_file_name 的前一个；还没有导出过时返回 None。"""
+    file_name = None
+    file_index = 1
+    while True:
+        candidate = os.path.join(directory, f"MAP_{mapid}_{file_index}.erb")
+        if not os.path.exists(candidate):
+            return file_name
+        file_name = candidate
+        file_index += 1
+
+
+def export_to_file(model: MapModel, mapid, file_name):
+    with AtomicWriter(file_name, "w", encoding="utf-8") as f:
+        write_export(model, mapid, f)
@@ -0,0 +1,245 @@
+import os
+import re
+from collections import deque
+from itertools import islice
+
+from model import MapModel
+from node import CityNode, RelayNode
+from tokenizer import DEFAULT_TOKENIZER, Tokenizer
+#
+# ------------------------------------------------------------------
+#  erb 导入：逐行读取文件，按行首前缀分派给预编译的正则，一次扫描完成解析
+# ------------------------------------------------------------------
+#
+
+PREFIX_PATTERN = re.compile(
+    r'CALL DRAWMAP_LINE|CITY_NAME_SHORT:|CITY_NAME:|CITY_ECONOMY:|CITY_GUARD:|CALL REGISTER_ROUTE_S')
+DRAWMAP_LINE_PATTERN = re.compile(r'CALL DRAWMAP_LINE\("(.+?)",\s*(.*?)\)')
+CITY_NAME_SHORT_PATTERN = re.compile(r'CITY_NAME_SHORT:(\d+)\s*=\s*(.+)')
+CITY_NAME_PATTERN = re.compile(r'CITY_NAME:(\d+)\s*=\s*(.+)')
+CITY_ECONOMY_PATTERN = re.compile(r'CITY_ECONOMY:GET_CITYNUMBER\("(.+?)"\)\s*=\s*(\d+)')
+CITY_GUARD_PATTERN = re.compile(r'CITY_GUARD:GET_CITYNUMBER\("(.+?)"\)\s*=\s*(\d+)')
+QUOTED_PATTERN = re.compile(r'"([^"]+)"')
+
+IMPORT_CHECK_LINES = 4096  # 读取时每隔这么多行检查一次是否已被取消、报告一次进度
+
+
+class ErbImporter:
+    """
+    逐行接收 erb 文件内容（feed），最后一次性构建节点（finish）。
+    只保存与地图规模相关的数据，内存占用不随文件大小增长。
+    """
+    def __init__(self, tokenizer: Tokenizer = DEFAULT_TOKENIZER):
+        self.tokenizer = tokenizer
+        self.map_lines = []        # 地图文本行
+        self.line_tokens = []      # 每行中节点的起止列（见 Tokenizer.tokenize_line）
+        self.node_positions = {}   # {node_id: (行号, 列起始位置)}，同一ID出现多次时以最后一次为准
+        self.city_names = {}       # 从 CITY_NAME_SHORT: 行中解析到的数据 {node_id: short_name}
+        self.city_full_names = {}  # 从 CITY_NAME: 行中解析到的数据 {node_id: full_name}
+        self.city_economy = {}     # 从 CITY_ECONOMY: 行中解析到的数据 {full_name: economy}
+        self.city_guard = {}       # 从 CITY_GUARD: 行中解析到的数据 {full_name: guard}
+        self.connections = {}      # 从 CALL REGISTER_ROUTE_S 行中解析到的数据 {full_name: [connected_full_name, ...]}
+        self._handlers = {
+            'CALL DRAWMAP_LINE': self._on_drawmap_line,
+            'CITY_NAME_SHORT:': self._on_city_name_short,
+            'CITY_NAME:': self._on_city_name,
+            'CITY_ECONOMY:': self._on_city_economy,
+            'CITY_GUARD:': self._on_city_guard,
+            'CALL REGISTER_ROUTE_S': self._on_register_route,
+        }
+
+    def feed(self, line: str):
+        line = line.strip()
+        prefix = PREFIX_PATTERN.match(line)
+        if prefix:
+            self._handlers[prefix.group(0)](line)
+
+    #
+    # 各类行的处理
+    #
+    def _on_drawmap_line(self, line):
+        # 解析地图行，提取文本和节点 ID 列表，并立即分词记录每个节点的坐标
+        match = DRAWMAP_LINE_PATTERN.match(line)
+        if not match:
+            return
+        text, ids = match.groups()
+        text = text.replace('\\"', '"')  # 恢复转义的引号
+        id_list = [int(id_) for id_ in ids.split(',') if id_]
+        line_index = len(self.map_lines)
+        tokens = self.tokenizer.tokenize_line(text)
+        for node_id, start in zip(id_list, tokens[::2]):
+            self.node_positions[node_id] = (line_index, start)
+        self.map_lines.append(text)
+        self.line_tokens.append(tokens)
+
+    def _on_city_name_short(self, line):
+        match = CITY_NAME_SHORT_PATTERN.match(line)
+        if match:
+            node_id, name = match.groups()
+            self.city_names[int(node_id)] = name.strip()
+
+    def _on_city_name(self, line):
+        match = CITY_NAME_PATTERN.match(line)
+        if match:
+            node_id, full_name = match.groups()
+            self.city_full_names[int(node_id)] = full_name.strip()
+
+    def _on_city_economy(self, line):
+        match = CITY_ECONOMY_PATTERN.match(line)
+        if match:
+            full_name, economy = match.groups()
+            self.city_economy[full_name] = int(economy)
+
+    def _on_city_guard(self, line):
+        match = CITY_GUARD_PATTERN.match(line)
+        if match:
+            full_name, guard = match.groups()
+            self.city_guard[full_name] = int(guard)
+
+    def _on_register_route(self, line):
+        # 提取所有双引号内的内容：第一个为当前节点的全名，后续为相连节点的全名
+        names = QUOTED_PATTERN.findall(line)
+        if names:
+            self.connections[names[0]] = names[1:]
+
+    #
+    # 构建节点
+    #
+    def finish(self) -> MapModel:
+        """
+        按与“更新”相同的规则把导入的节点放到地图上：
+          - 城市按短名称复用（同名按ID顺序依次使用）
+          - 中继按坐标复用
+          - 地图上没有出现的节点被丢弃，其连接一并丢弃
+        """
+        # 根据 full_name 和短名称构建节点对象
+        imported_nodes = []
+        all_node_ids = set(self.city_full_names.keys()).union(set(self.city_names.keys()))
+        for node_id in sorted(all_node_ids):
+            short_name = self.city_names.get(node_id)   # 可能为 None
+            # 优先从 CITY_NAME 中获取 full_name，若不存在则使用 short_name
+            full_name = self.city_full_names.get(node_id, short_name)
+            # 以 full_name 为基础，如果 short_name 不存在或为默认中继符号 "◇"，则认为该节点为中继节点
+            if not short_name or short_name == "◇":
+                node = RelayNode("◇", position=None)
+            else:
+                node = CityNode(short_name)
+            node.node_id = node_id
+            node.full_name = full_name
+            node.economy = self.city_economy.get(full_name, 0)
+            node.guard = self.city_guard.get(full_name, 0)
+            node.position = self.node_positions.get(node_id)
+            imported_nodes.append(node)
+
+        city_mapping = {}
+        relay_mapping = {}
+        nodes_by_full_name = {}
+        for node in imported_nodes:
+            if isinstance(node, CityNode):
+                city_mapping.setdefault(node.name, deque()).append(node)
+            elif node.position is not None:
+                relay_mapping[node.position] = node
+            nodes_by_full_name[node.full_name] = node
+
+        nodes_by_line = []
+        line_city_counts = []
+        line_relay_counts = []
+        cities = []
+        relays = []
+        for line_index, (line, tokens) in enumerate(zip(self.map_lines, self.line_tokens)):
+            line_entries = []
+            city_count = len(cities)
+            last_end = 0
+            for is_city, start_index, end_index in self.tokenizer.iter_tokens(line, tokens):
+                if start_index > last_end:
+                    line_entries.append(('text', line[last_end:start_index]))
+                token = line[start_index:end_index]
+                if is_city:
+                    same_name = city_mapping.get(token)
+                    node_obj = same_name.popleft() if same_name else CityNode(token)
+                    if not node_obj.full_name:
+                        node_obj.full_name = node_obj.name
+                    node_obj.position = (line_index, start_index)
+                    line_entries.append(('city', node_obj))
+                    cities.append(node_obj)
+                else:
+                    pos_key = (line_index, start_index)
+                    node_obj = relay_mapping.get(pos_key) or RelayNode("◇", position=pos_key)
+                    line_entries.append(('relay', node_obj))
+                    relays.append(node_obj)
+                last_end = end_index
+            if last_end < len(line):
+                line_entries.append(('text', line[last_end:]))
+            nodes_by_line.append(line_entries)
+            line_city_counts.append(len(cities) - city_count)
+            line_relay_counts.append(len(tokens) // 2 - (len(cities) - city_count))
+
+        # 没有地图行时保持空模型（与空输入框一致：一个空行）
+        result = MapModel(self.tokenizer)
+        if self.map_lines:
+            result.lines = self.map_lines
+            result.nodes_by_line = nodes_by_line
+            result.line_city_counts = line_city_counts
+            result.line_relay_counts = line_relay_counts
+
+        # 城市在前、中继在后，按从上到下的顺序编号
+        result.all_nodes = cities + relays
+        for index, node in enumerate(result.all_nodes):
+            node.node_id = index + 1
+        result.max_city_id = len(cities)
+
+        # 恢复连接关系（使用 full_name 作为标识，要求导出时 full_name 唯一），只保留地图上的节点之间的连接
+        kept = set(result.all_nodes)
+        for node_full_name, conn_full_names in self.connections.items():
+            node = nodes_by_full_name.get(node_full_name)
+            if node not in kept:
+                continue
+            for conn_full_name in conn_full_names:
+                conn_node = nodes_by_full_name.get(conn_full_name)
+                if conn_node in kept:
+                    node.connections.add(conn_node)
+                    conn_node.connections.add(node)
+        result.node_index.rebuild(result.all_nodes)
+        return result
+
+
+def load_erb(file_name, tokenizer: Tokenizer = DEFAULT_TOKENIZER,
+             is_cancelled=None, report=None) -> MapModel | None:
+    """
+    逐行读取 erb 文件并导入。is_cancelled() 返回 True 时中止并返回 None；
+    report(已读取字节数, 文件大小) 报告进度（按读取缓冲的位置，是近似值）。
+    """
+    importer = ErbImporter(tokenizer)
+    with open(file_name, "r", encoding="utf-8") as file:
+        size = os.fstat(file.fileno()).st_size
+        while True:
+            if is_cancelled is not None and is_cancelled():
+                return None
+            if report is not None:
+                report(file.buffer.tell(), size)
+            chunk = list(islice(file, IMPORT_CHECK_LINES))
+            for line in chunk:
+                importer.feed(line)
+            if len(chunk) < IMPORT_CHECK_LINES:
+                break
+    if report is not None:
+        report(size, size)
+    if is_cancelled is not None and is_cancelled():
+        return None
+    return importer.finish()
+
+
+def load_map_file(file_name) -> MapModel:
+    """.erb 文件按导入处理，.tkmap 项目文件映射后按需读取，其他文件视为地图原始文本。"""
+    # 主窗口启动时只用到 load_erb，项目文件的读取在这里才导入
+    from project_file import PROJECT_SUFFIX, load_project
+
+    if file_name.lower().endswith(".erb"):
+        return load_erb(file_name)
+    if file_name.lower().endswith(PROJECT_SUFFIX):
+        return load_project(file_name, lazy=True)
+    with open(file_name, "r", encoding="utf-8") as f:
+        text = f.read()
+    model = MapModel()
+    model.parse_text(text.replace("\r\n", "\n").rstrip("\n"))
+    return model
@@ -0,0 +1,161 @@
+import hashlib
+import json
+import os
+from array import array
+
+from atomic_file import AtomicWriter
+from erb_export import (EXPORT_SECTIONS, WRITE_CHUNK_LINES, latest_export_file_name, next_export_file_name,
+                        node_id_key, split_nodes)
+from model import MapModel
+#
+# ------------------------------------------------------------------
+#  导出缓存：按段记录导出内容所依赖数据的哈希，重新导出时只生成变化的段，
+#  其余段从上次导出的文件中原样复制；地图完全没有变化时不写文件
+# ------------------------------------------------------------------
+#
+#  缓存与导出文件放在一起（MAP_X_1.erb.cache.json），记录各段的哈希和在文件中的字节范围，
+#  以及写入时文件的大小和修改时间；文件被其他程序改动过时缓存作废，整个文件重新生成。
+#
+
+EXPORT_CACHE_SUFFIX = ".cache.json"
+EXPORT_FORMAT_VERSION = 1  # 导出模板变化时递增，使已有缓存作废
+
+# 各段依赖的数据（均另外依赖 MAPID）；节点ID由地图文本决定（城市在前、中继在后，按位置排列）
+SECTION_INPUTS = {
+    "DRAWMAP": ("text",),
+    "SET_CITY_NUM": ("text",),
+    "SET_SHORTCITYNAME": ("text",),
+    "SET_CITYNAME": ("text", "full_names"),
+    "SET_CITY_TYPE": (),
+    "SET_MAP_ROUTE": ("text", "full_names", "edges"),
+    "MAP_INIT": ("text", "full_names", "attributes"),
+}
+
+
+def _digest(*parts: bytes) -> str:
+    hasher = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        hasher.update(len(part).to_bytes(8, "little"))
+        hasher.update(part)
+    return hasher.hexdigest()
+
+
+def model_fingerprints(model: MapModel) -> dict[str, str]:
+    """地图文本、全名、连接、经济和防御各自的哈希。"""
+    nodes = model.all_nodes
+    # 每个节点：相邻节点数，以及按ID排列的相邻节点（集合的遍历顺序不固定）
+    edges = []
+    for node in nodes:
+        connection_ids = sorted(map(node_id_key, node.connections))
+        edges.append(len(connection_ids))
+        edges += connection_ids
+    attributes = [value for node in nodes for value in (node.economy, node.guard)]
+    return {
+        "text": _digest("\n".join(model.lines).encode("utf-8")),
+        # 全名不会包含 \0（输入框、erb 中都无法输入）
+        "full_names": _digest("\0".join([node.full_name for node in nodes]).encode("utf-8")),
+        "edges": _digest(array('q', edges).tobytes()),
+        "attributes": _digest(array('q', attributes).tobytes()),
+    }
+
+
+def section_keys(model: MapModel, mapid) -> dict[str, str]:
+    """段名 -> 该段内容所依赖数据的哈希，哈希相同的段导出内容相同。"""
+    fingerprints = model_fingerprints(model)
+    return {name: _digest(str(EXPORT_FORMAT_VERSION).encode(), str(mapid).encode("utf-8"),
+                          *(fingerprints[input_name].encode() for input_name in SECTION_INPUTS[name]))
+            for name, _ in EXPORT_SECTIONS}
+
+
+def cache_file_name(file_name) -> str:
+    return file_name + EXPORT_CACHE_SUFFIX
+
+
+def read_cache(file_name):
+    """导出文件的缓存 {段名: (哈希, 偏移, 长度)}；没有缓存或文件已被改动时返回 None。"""
+    try:
+        with open(cache_file_name(file_name), "r", encoding="utf-8") as f:
+            cache = json.load(f)
+        stat = os.stat(file_name)
+    except (OSError, ValueError):
+        return None
+    if cache.get("size") != stat.st_size or cache.get("mtime_ns") != stat.st_mtime_ns:
+        return None
+    return {name: (key, offset, length) for name, key, offset, length in cache["sections"]}
+
+
+def _write_cache(file_name, sections):
+    stat = os.stat(file_name)
+    with AtomicWriter(cache_file_name(file_name), "w", encoding="utf-8") as f:
+        json.dump({"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sections": sections}, f)
+
+
+def _encode(text) -> bytes:
+    # 与 export_to_file 以文本模式写入的内容逐字节相同
+    if os.linesep != "\n":
+        text = text.replace("\n", os.linesep)
+    return text.encode("utf-8")
+
+
+def export_with_cache(model: MapModel, mapid, file_name, previous=None,
+                      is_cancelled=None, report=None) -> tuple[str, list[str]] | None:
+    """
+    把模型导出到 file_name，内容与 export_to_file 相同。previous 为之前导出的文件（可以就是 file_name），
+    其中哈希未变的段直接复制。返回 (导出文件, 重新生成的段名)：
+    与 previous 完全相同时不写入任何文件，返回 (previous, [])。
+    先写入临时文件，完成后才替换 file_name；is_cancelled() 返回 True 时中止并返回 None，file_name 保持原样。
+    report(已完成, 总数) 按段报告进度。
+    """
+    keys = section_keys(model, mapid)
+    cached = read_cache(previous) if previous else None
+    if cached is not None and all(cached.get(name, (None,))[0] == key for name, key in keys.items()):
+        return previous, []
+
+    cities, relays = split_nodes(model)
+    regenerated = []
+    sections = []
+    # 先写入临时文件，previous 与 file_name 相同时仍可从中复制
+    writer = AtomicWriter(file_name, "wb")
+    with writer as out, open(previous if cached else os.devnull, "rb") as old:
+        for index, (name, section) in enumerate(EXPORT_SECTIONS):
+            if report is not None:
+                report(index, len(EXPORT_SECTIONS))
+            offset = out.tell()
+            entry = cached.get(name) if cached else None
+            if entry is not None and entry[0] == keys[name]:
+                old.seek(entry[1])
+                out.write(old.read(entry[2]))
+            else:
+                regenerated.append(name)
+                chunk = []
+                for line in section(model, mapid, cities, relays):
+                    chunk.append(line)
+                    if len(chunk) >= WRITE_CHUNK_LINES:
+                        if is_cancelled is not None and is_cancelled():
+                            writer.discard()
+                            return None
+                        chunk.append("")
+                        out.write(_encode("\n".join(chunk)))
+                        chunk.clear()
+                if chunk:
+                    chunk.append("")
+                    out.write(_encode("\n".join(chunk)))
+            sections.append((name, keys[name], offset, out.tell() - offset))
+        if is_cancelled is not None and is_cancelled():
+            writer.discard()
+            return None
+    _write_cache(file_name, sections)
+    if report is not None:
+        report(len(EXPORT_SECTIONS), len(EXPORT_SECTIONS))
+    return file_name, regenerated
+
+
+def export_map(model: MapModel, mapid, directory="", overwrite=False,
+               is_cancelled=None, report=None) -> tuple[str, list[str]] | None:
+    """
+    导出为 MAP_{mapid}_{n}.erb：overwrite 时覆盖最近一次导出的文件，否则使用下一个可用的 n。
+    地图与最近一次导出相比没有变化时不写文件，返回值、取消和进度见 export_with_cache。
+    """
+    previous = latest_export_file_name(mapid, directory)
+    file_name = previous if overwrite and previous else next_export_file_name(mapid, directory)
+    return export_with_cache(model, mapid, file_name, previous, is_cancelled, report)
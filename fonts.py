@@ -0,0 +1,28 @@
+from PySide6.QtGui import QFont, QFontInfo
+#
+# ------------------------------------------------------------------
+#  地图字体：按优先顺序取第一个已安装的等宽字体，进程内只查询一次
+#  直接使用未安装的字体名（例如 Linux 上的 MS Gothic）时，每个控件、每段HTML都会重新进行一次回退匹配
+# ------------------------------------------------------------------
+#
+
+MAP_FONT_FAMILIES = ("MS Gothic", "Noto Sans Mono CJK JP", "Noto Sans Mono CJK SC", "WenQuanYi Zen Hei Mono",
+                     "Monospace")
+MAP_FONT_SIZE = 10
+
+_family = None
+
+
+def map_font_family() -> str:
+    """实际使用的地图字体名。需要在 QApplication 创建之后、在界面线程中第一次调用。"""
+    global _family
+    if _family is None:
+        font = QFont()
+        font.setFamilies(list(MAP_FONT_FAMILIES))
+        font.setStyleHint(QFont.TypeWriter)
+        _family = QFontInfo(font).family()
+    return _family
+
+
+def map_font(point_size=MAP_FONT_SIZE) -> QFont:
+    return QFont(map_font_family(), point_size)
@@ -1,35 +1,93 @@
 import os
 import sys
-import re
 
 from PySide6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QTextEdit,
     QMenuBar, QMenu, QLabel, QLineEdit, QPushButton, QHBoxLayout,
-    QMessageBox, QInputDialog, QFileDialog
+    QMessageBox, QInputDialog, QFileDialog, QDialog, QTabBar, QProgressDialog
 )
-from PySide6.QtGui import QAction, QFont
-from node import MapNode, CityNode, RelayNode
+from PySide6.QtCore import QTimer, Qt
+from PySide6.QtGui import QAction, QActionGroup, QKeySequence, QTextCursor
+from node import MapNode, CityNode
+from model import MapModel
 from browser import ClickableMapBrowser
+from render_scheduler import RenderScheduler
+from parse_worker import BackgroundWorker
+from fonts import map_font, map_font_family
+from validation import EXPORT_CHECKS
+from profiling import profiler
+from undo import AttributeCommand, CompoundCommand, ParseCommand, connection_command
+from workspace import MapDocument, Workspace
+
 #
 # ------------------------------------------------------------------
 #  主窗口
 # ------------------------------------------------------------------
 #
 
+LIVE_PREVIEW_DELAY_MS = 300  # 实时预览：停止输入多久后开始解析
+PROFILE_STATUS_INTERVAL_MS = 500  # 状态栏耗时的刷新间隔
+
 class MainWindow(QMainWindow):
     def __init__(self):
         super().__init__()
         self.setWindowTitle("tk地图制作器 v1.2")
 
-        # 数据结构
-        self.lines = []             # 原始文本行
-        self.nodes_by_line = []     # 每行中的节点（城市或中继）
-        self.all_nodes = []         # 当前使用的所有节点
-        self.max_city_id = 0
+        # 同时打开的多张地图，每张一个标签页；下面的模型、撤销记录等始终是当前地图的
+        self.workspace = Workspace()
+        self._untitled_count = 0
+        document = self.workspace.add(MapDocument(self._next_untitled_title()))
+        self.workspace.activate(document)
+
+        # 数据结构：行、节点、ID等均由地图模型维护
+        self.model = document.model
+
+        # 自上次解析请求以来输入文本的变动范围：开头、末尾未变动的行数（None 表示没有变动）
+        self._dirty_head = None
+        self._dirty_tail = None
+        # 已提交给后台、尚未应用到模型的变动范围（相对于当前模型）
+        self._pending_head = None
+        self._pending_tail = None
+
+        # 后台分词、生成HTML；_parse_request 为最近一次解析请求 (代号, 文本行, head, tail)
+        self.worker = BackgroundWorker(self)
+        self.worker.finished.connect(self._on_worker_finished)
+        self.worker.failed.connect(self._on_worker_failed)
+        self._parse_request = None
+        self._html_pending = False
+
+        # 导入、导出文件在另一个后台线程中进行，不阻塞解析、生成HTML；期间显示可以取消的进度对话框
+        # _file_job 为进行中的文件任务 (种类, 代号, 进度对话框, 完成后的处理, 出错时的提示)
+        self.file_worker = BackgroundWorker(self)
+        self.file_worker.finished.connect(self._on_file_job_finished)
+        self.file_worker.failed.connect(self._on_file_job_failed)
+        self.file_worker.progress.connect(self._on_file_job_progress)
+        self._file_job = None
+
+        # 撤销、重做记录（只记录每次修改的差异）
+        self.undo_stack = document.undo_stack
 
-        # 当前选中的节点及其高亮的相邻节点
+        # 当前选中的节点及其高亮的相邻节点；批量选择的节点（框选、ctrl+点击、按条件选择）
         self.selected_node = None
         self.highlighted_nodes = set()
+        self.marked_nodes = set()
+
+        # 渲染状态：地图结构是否需要整体重建，自上次渲染以来样式可能变化的节点，
+        # 以及选中节点变化后下方输入框是否需要重新填写
+        self._structure_dirty = True
+        self._dirty_nodes = set()
+        self._fields_dirty = True
+        # 同一轮事件循环中的多次修改只渲染一次
+        self.render_scheduler = RenderScheduler(self._render, self)
+
+        # 实时预览：停止输入一段时间后自动在后台解析
+        self.live_preview_timer = QTimer(self)
+        self.live_preview_timer.setSingleShot(True)
+        self.live_preview_timer.setInterval(LIVE_PREVIEW_DELAY_MS)
+        self.live_preview_timer.timeout.connect(self._start_parse)
+
+        # 检查面板：列出导出前检查的结果，点击后选中相关节点；第一次打开（视图-检查）时才创建
+        self.diagnostics_dock = None
 
         # 构建UI
         self._setupMenuBar()
@@ -37,10 +95,25 @@ class MainWindow(QMainWindow):
         self.setCentralWidget(central)
         main_layout = QVBoxLayout(central)
         central.setLayout(main_layout)
+        self.main_layout = main_layout
+
+        # 地图字体只解析一次；生成HTML在后台线程中进行，使用这里记下的字体名
+        self.map_font_family = map_font_family()
+
+        # 0) 标签页：每张打开的地图一个
+        self.tab_bar = QTabBar()
+        self.tab_bar.setDocumentMode(True)
+        self.tab_bar.setExpanding(False)
+        self.tab_bar.setTabsClosable(True)
+        self.tab_bar.addTab(document.title)
+        self.tab_bar.currentChanged.connect(self.on_tab_changed)
+        self.tab_bar.tabCloseRequested.connect(self.on_tab_close_requested)
+        main_layout.addWidget(self.tab_bar)
 
         # 1) 文本输入（ASCII地图）
         self.input_area = QTextEdit()
-        self.input_area.setFont(QFont("MS Gothic", 10))
+        self.input_area.setFont(map_font())
+        self.input_area.document().contentsChange.connect(self._on_input_contents_change)
         main_layout.addWidget(self.input_area)
 
         # 2) 更新按钮（只有点击后才将输入转换为显示）
@@ -55,9 +128,17 @@ class MainWindow(QMainWindow):
 
         # 4) 显示区域（只读HTML地图），内容居中
         self.display_area = ClickableMapBrowser(self)
-        self.display_area.setStyleSheet("QTextBrowser { font-family: 'MS Gothic'; }")
+        self.display_area.setStyleSheet(f"QTextBrowser {{ font-family: '{self.map_font_family}'; }}")
+        self.display_area.hover_info_provider = self._hover_info
+        self.display_area.node_lookup = lambda node_id: self.model.node_index.get_by_id(node_id)
+        # 重新解析后节点重新编号，旧文档中的锚点在换上新的HTML之前不再可靠
+        self.display_area.document_is_current = lambda: not (self._structure_dirty or self._html_pending)
         main_layout.addWidget(self.display_area)
 
+        # 场景模式、虚拟模式的显示区域在第一次切换到该模式时才创建（见 _ensure_view）
+        self.map_view = None
+        self.virtual_view = None
+
         # 5) 行：全名、经济、防御
         row2 = QHBoxLayout()
         row2.addWidget(QLabel("全名:"))
@@ -79,8 +160,24 @@ class MainWindow(QMainWindow):
         self.economy_edit.textEdited.connect(self.on_economy_changed)
         self.guard_edit.textEdited.connect(self.on_guard_changed)
 
+        # 状态栏：批量选择的节点数；各阶段最近一次的耗时和计数（后台线程也会记录，定时读取）
+        self.marked_label = QLabel()
+        self.statusBar().addPermanentWidget(self.marked_label)
+        self.profile_label = QLabel()
+        self.statusBar().addPermanentWidget(self.profile_label)
+        self._profile_revision = None
+        self.profile_timer = QTimer(self)
+        self.profile_timer.setInterval(PROFILE_STATUS_INTERVAL_MS)
+        self.profile_timer.timeout.connect(self._update_profile_status)
+        self.profile_timer.start()
+
         self.resize(1100, 800)
 
+    def _update_profile_status(self):
+        if profiler.revision != self._profile_revision:
+            self._profile_revision = profiler.revision
+            self.profile_label.setText(profiler.summary())
+
     #
     # 菜单栏：导出
     #
@@ -89,23 +186,218 @@ class MainWindow(QMainWindow):
         file_menu = QMenu("文件", self)
         menubar.addMenu(file_menu)
 
+        new_map_action = QAction("新建地图", self)
+        new_map_action.setShortcut(QKeySequence.New)
+        new_map_action.triggered.connect(self.new_map)
+        file_menu.addAction(new_map_action)
+
+        close_map_action = QAction("关闭地图", self)
+        close_map_action.setShortcut(QKeySequence.Close)
+        close_map_action.triggered.connect(lambda: self.on_tab_close_requested(self.tab_bar.currentIndex()))
+        file_menu.addAction(close_map_action)
+        file_menu.addSeparator()
+
+        open_project_action = QAction("打开项目", self)
+        open_project_action.setShortcut(QKeySequence.Open)
+        open_project_action.triggered.connect(self.open_project)
+        file_menu.addAction(open_project_action)
+
+        save_project_action = QAction("保存项目", self)
+        save_project_action.setShortcut(QKeySequence.Save)
+        save_project_action.triggered.connect(self.save_project)
+        file_menu.addAction(save_project_action)
+        file_menu.addSeparator()
+
         export_action = QAction("导出", self)
         export_action.triggered.connect(self.export_data)
         file_menu.addAction(export_action)
 
+        self.overwrite_export_action = QAction("覆盖上次导出", self)
+        self.overwrite_export_action.setCheckable(True)
+        file_menu.addAction(self.overwrite_export_action)
+
         import_action = QAction("导入", self)
         import_action.triggered.connect(self.import_data)
         file_menu.addAction(import_action)
+        file_menu.addSeparator()
+
+        export_table_action = QAction("导出属性表(CSV)...", self)
+        export_table_action.triggered.connect(self.export_attribute_table)
+        file_menu.addAction(export_table_action)
+
+        import_table_action = QAction("导入属性表(CSV)...", self)
+        import_table_action.triggered.connect(self.import_attribute_table)
+        file_menu.addAction(import_table_action)
+
+        edit_menu = QMenu("编辑", self)
+        menubar.addMenu(edit_menu)
+
+        # 输入框有焦点时 ctrl+z 由输入框自己处理（撤销文字输入），否则撤销地图上的修改
+        self.undo_action = QAction("撤销", self)
+        self.undo_action.setShortcut(QKeySequence.Undo)
+        self.undo_action.triggered.connect(self.on_undo)
+        edit_menu.addAction(self.undo_action)
+
+        self.redo_action = QAction("重做", self)
+        self.redo_action.setShortcut(QKeySequence.Redo)
+        self.redo_action.triggered.connect(self.on_redo)
+        edit_menu.addAction(self.redo_action)
+        self._update_undo_actions()
+        edit_menu.addSeparator()
+
+        infer_routes_action = QAction("从路线推断连接...", self)
+        infer_routes_action.triggered.connect(self.on_infer_routes)
+        edit_menu.addAction(infer_routes_action)
+        edit_menu.addSeparator()
+
+        # 批量选择、批量修改：每次修改作为一条撤销记录，只渲染一次
+        select_nodes_action = QAction("选择节点...", self)
+        select_nodes_action.triggered.connect(self.on_select_nodes)
+        edit_menu.addAction(select_nodes_action)
+
+        mark_all_action = QAction("选择全部节点", self)
+        mark_all_action.triggered.connect(lambda: self.on_nodes_box_selected(self.model.all_nodes, False))
+        edit_menu.addAction(mark_all_action)
+
+        clear_marked_action = QAction("取消选择", self)
+        clear_marked_action.triggered.connect(lambda: self._set_marked_nodes(set()))
+        edit_menu.addAction(clear_marked_action)
+
+        bulk_edit_action = QAction("批量修改属性...", self)
+        bulk_edit_action.triggered.connect(self.on_bulk_edit)
+        edit_menu.addAction(bulk_edit_action)
+
+        connect_marked_action = QAction("连接到选中的节点", self)
+        connect_marked_action.triggered.connect(lambda: self.on_connect_marked(True))
+        edit_menu.addAction(connect_marked_action)
+
+        disconnect_marked_action = QAction("断开与选中节点的连接", self)
+        disconnect_marked_action.triggered.connect(lambda: self.on_connect_marked(False))
+        edit_menu.addAction(disconnect_marked_action)
+
+        disconnect_between_action = QAction("断开所选节点之间的连接", self)
+        disconnect_between_action.triggered.connect(self.on_disconnect_marked_between)
+        edit_menu.addAction(disconnect_between_action)
+
+        view_menu = QMenu("视图", self)
+        menubar.addMenu(view_menu)
+
+        # 场景模式、虚拟模式最多选中一个，都不选中时为文本模式
+        display_mode_group = QActionGroup(self)
+        display_mode_group.setExclusionPolicy(QActionGroup.ExclusionPolicy.ExclusiveOptional)
+        self.scene_mode_action = QAction("场景模式", self)
+        self.virtual_mode_action = QAction("虚拟模式", self)
+        for action in (self.scene_mode_action, self.virtual_mode_action):
+            action.setCheckable(True)
+            action.toggled.connect(self.on_display_mode_toggled)
+            display_mode_group.addAction(action)
+            view_menu.addAction(action)
+
+        self.live_preview_action = QAction("实时预览", self)
+        self.live_preview_action.setCheckable(True)
+        self.live_preview_action.toggled.connect(self.on_live_preview_toggled)
+        view_menu.addAction(self.live_preview_action)
+
+        self.diagnostics_action = QAction("检查", self)
+        self.diagnostics_action.setCheckable(True)
+        self.diagnostics_action.toggled.connect(self.on_diagnostics_toggled)
+        view_menu.addAction(self.diagnostics_action)
         self.setMenuBar(menubar)
 
     #
-    # 点击“更新”按钮后调用
+    # 显示/隐藏检查面板，第一次显示时才创建
+    #
+    def on_diagnostics_toggled(self, checked):
+        if self.diagnostics_dock is None:
+            if not checked:
+                return
+            from diagnostics_panel import DiagnosticsDock
+            self.diagnostics_dock = DiagnosticsDock(self)
+            self.diagnostics_dock.node_activated.connect(self.on_diagnostic_activated)
+            self.addDockWidget(Qt.RightDockWidgetArea, self.diagnostics_dock)
+            # 面板自带的关闭按钮与菜单项保持一致
+            self.diagnostics_dock.visibilityChanged.connect(self._on_diagnostics_visibility_changed)
+        if checked:
+            self.diagnostics_dock.schedule_refresh(self.model.validator)
+        self.diagnostics_dock.setVisible(checked)
+
+    def _on_diagnostics_visibility_changed(self, visible):
+        if not visible and not self.isMinimized():
+            self.diagnostics_action.setChecked(False)
+
+    #
+    # 点击检查面板中的一项：选中相关节点
+    #
+    def on_diagnostic_activated(self, node):
+        if node is None or self.model.node_index.get_by_id(node.node_id) is not node:
+            return
+        self._dirty_nodes |= self.highlighted_nodes
+        self.selected_node = node
+        self.highlighted_nodes = node.connections.copy()
+        self.highlighted_nodes.add(node)
+        self._dirty_nodes |= self.highlighted_nodes
+        self._fields_dirty = True
+        self._request_render()
+
+    #
+    # 点击“更新”按钮后调用：在后台解析，完成后再渲染
     #
     def on_update_pressed(self):
+        self._dirty_nodes |= self.highlighted_nodes
         self.selected_node = None
         self.highlighted_nodes = set()
-        self._parse_input()
-        self._update_display_and_fields()
+        self._fields_dirty = True
+        if not self._start_parse():
+            # 文本没有变动时直接整体重新渲染
+            self._structure_dirty = True
+        self._request_render()
+
+    #
+    # 实时预览：打开后不需要点击“更新”
+    #
+    def on_live_preview_toggled(self, checked):
+        self.update_button.setVisible(not checked)
+        if checked:
+            self._start_parse()
+        else:
+            self.live_preview_timer.stop()
+
+    #
+    # 切换显示模式：文本模式（ClickableMapBrowser）/ 场景模式 / 虚拟模式
+    #
+    def _display_mode(self) -> str:
+        if self.scene_mode_action.isChecked():
+            return 'scene'
+        if self.virtual_mode_action.isChecked():
+            return 'virtual'
+        return 'text'
+
+    def on_display_mode_toggled(self, checked):
+        mode = self._display_mode()
+        self._ensure_view(mode)
+        self.display_area.setVisible(mode == 'text')
+        for view, view_mode in ((self.map_view, 'scene'), (self.virtual_view, 'virtual')):
+            if view is not None:
+                view.setVisible(view_mode == mode)
+        self._structure_dirty = True
+        self._request_render()
+
+    def _ensure_view(self, mode):
+        """创建该显示模式的显示区域（尚未创建时），放在文本模式显示区域之后。"""
+        if mode == 'scene' and self.map_view is None:
+            from scene_view import MapSceneView
+            # 场景模式：每个节点一个常驻图元
+            self.map_view = MapSceneView(self)
+            view = self.map_view
+        elif mode == 'virtual' and self.virtual_view is None:
+            from virtual_view import VirtualMapView
+            # 虚拟模式：只绘制可见的行
+            self.virtual_view = VirtualMapView(self)
+            view = self.virtual_view
+        else:
+            return
+        view.setVisible(False)
+        self.main_layout.insertWidget(self.main_layout.indexOf(self.display_area) + 1, view)
 
     #
     # 点击“折叠输入”按钮后调用
@@ -115,102 +407,208 @@ class MainWindow(QMainWindow):
         self.input_area.setVisible(not visible)
         self.toggle_input_button.setText("展开输入" if visible else "折叠输入")
 
+    #
+    # 记录输入文本中发生变动的行范围（contentsChange 信号）
+    #
+    def _on_input_contents_change(self, position, chars_removed, chars_added):
+        """
+        只记录自上次解析以来文档开头、末尾各有多少行保持不变：
+          - 开头不变的行数取各次变动首行号的最小值
+          - 末尾不变的行数取各次变动末行之后行数的最小值
+        两者都不受其他位置的编辑影响，因此多次编辑可以直接合并。
+        """
+        doc = self.input_area.document()
+        first_block = doc.findBlock(position)
+        last_block = doc.findBlock(position + chars_added)
+        if not last_block.isValid():
+            last_block = doc.lastBlock()
+        head = first_block.blockNumber() if first_block.isValid() else 0
+        tail = doc.blockCount() - 1 - last_block.blockNumber()
+        self._dirty_head = head if self._dirty_head is None else min(self._dirty_head, head)
+        self._dirty_tail = tail if self._dirty_tail is None else min(self._dirty_tail, tail)
+        if self.live_preview_action.isChecked():
+            self.live_preview_timer.start()
+
     #
     # 解析输入文本，构建节点数据结构
     #
-    def _parse_input(self):
+    def _take_dirty_range(self):
         """
-        解析输入文本，并重用已有节点（城市按名称，中继按位置）。
-        同时严格按规则分配ID：
-          - 城市从左到右、从上到下依次编号（1,2,3...）
-          - 中继从城市最大ID+1开始编号
+        把自上次请求以来的变动并入尚未应用的范围（合并规则与多次编辑相同），
+        返回相对于当前模型的 (head, tail)，没有变动时返回 None。
         """
-        text = self.input_area.toPlainText()
-        new_lines = text.split('\n')
-        new_nodes_by_line = []
-        new_all_nodes: list[MapNode] = []
-
-        # 构造旧节点映射以便复用
-        old_city_mapping = {}
-        old_relay_mapping = {}
-        for node in self.all_nodes:
-            if isinstance(node, CityNode):
-                old_city_mapping.setdefault(node.name, []).append(node)
-            elif isinstance(node, RelayNode) and getattr(node, 'position', None) is not None:
-                old_relay_mapping[node.position] = node
-
-        # 匹配城市和中继节点,只读取◇或者连续的文字
-        node_pattern = re.compile(r'([a-zA-Z0-9\u4e00-\u9fa5]+)|(◇)')
-
-        city_id = 1
-        relay_nodes_temp = []  # 临时保存中继节点，稍后分配ID
-        for line_index, line in enumerate(new_lines):
-            line_entries = []
-            last_end = 0
-            for match in node_pattern.finditer(line):
-                start_index = match.start()
-                if start_index > last_end:
-                    # 文本部分
-                    text_part = line[last_end:start_index]
-                    line_entries.append(('text', text_part))
-                token = match.group(0)
-                if match.group(1):  # 城市
-                    # 尝试复用同名城市节点
-                    if token in old_city_mapping and old_city_mapping[token]:
-                        node_obj = old_city_mapping[token].pop(0)
-                    else:
-                        node_obj = CityNode(token)
-                    node_obj.name = token.strip()
-                    if not node_obj.full_name:
-                        node_obj.full_name = node_obj.name
-                    node_obj.node_id = city_id
-                    city_id += 1
-                    line_entries.append(('city', node_obj))
-                    new_all_nodes.append(node_obj)
-                elif match.group(2):  # 中继
-                    pos_key = (line_index, start_index)
-                    if pos_key in old_relay_mapping:
-                        node_obj = old_relay_mapping[pos_key]
-                    else:
-                        node_obj = RelayNode(token, position=pos_key)
-                    line_entries.append(('relay', node_obj))
-                    relay_nodes_temp.append(node_obj)
-                last_end = match.end()
-            if last_end < len(line):
-                line_entries.append(('text', line[last_end:]))
-            new_nodes_by_line.append(line_entries)
-
-        # 分配中继节点ID：从城市ID结束后开始
-        relay_id = city_id
-        for line_entries in new_nodes_by_line:
-            for entry in line_entries:
-                if entry[0] == 'relay':
-                    entry[1].node_id = relay_id
-                    relay_id += 1
+        if self._dirty_head is not None:
+            if self._pending_head is None:
+                self._pending_head, self._pending_tail = self._dirty_head, self._dirty_tail
+            else:
+                self._pending_head = min(self._pending_head, self._dirty_head)
+                self._pending_tail = min(self._pending_tail, self._dirty_tail)
+            self._dirty_head = None
+            self._dirty_tail = None
+        if self._pending_head is None:
+            return None
+        return self._pending_head, self._pending_tail
 
-        self.max_city_id = city_id - 1 if city_id > 1 else 0
+    def _parse_input(self) -> bool:
+        """
+        在界面线程中立即解析变动过的行，规则见 MapModel.parse_lines；进行中的后台解析被取消。
+        文本没有变动时返回 False。
+        """
+        dirty_range = self._take_dirty_range()
+        if dirty_range is None:
+            # 自上次解析以来文本没有变动
+            return False
+        self.worker.cancel('parse')
+        self._parse_request = None
+        new_lines = self.input_area.toPlainText().split('\n')
+        with profiler.stage("parse"):
+            self._push_undo(ParseCommand(self.model.parse_lines(new_lines, *dirty_range)))
+        self._pending_head = None
+        self._pending_tail = None
+        return True
 
-        # 合并中继节点（避免重复添加）
-        for relay_node in relay_nodes_temp:
-            if relay_node not in new_all_nodes:
-                new_all_nodes.append(relay_node)
+    def _start_parse(self) -> bool:
+        """
+        对当前文本的快照在后台分词，完成后在界面线程中应用（复用节点、分配ID），
+        新的请求使进行中的请求失效。文本没有变动时返回 False。
+        """
+        dirty_range = self._take_dirty_range()
+        if dirty_range is None:
+            return False
+        new_lines = self.input_area.toPlainText().split('\n')
+        first, _, new_end = self.model.dirty_span(new_lines, *dirty_range)
+        span_lines = new_lines[first:new_end]
+        tokenize_lines = self.model.tokenizer.tokenize_lines
+        generation = self.worker.submit('parse', lambda is_cancelled: tokenize_lines(span_lines, is_cancelled))
+        self._parse_request = (generation, new_lines, *dirty_range)
+        return True
 
-        # 更新每个节点的 connections：只保留出现在新_all_nodes中的连接
-        new_set = set(new_all_nodes)
-        for node in new_all_nodes:
-            node.connections = {conn for conn in node.connections if conn in new_set}
+    def _apply_parse_result(self, span_tokens):
+        _, new_lines, dirty_head, dirty_tail = self._parse_request
+        self._parse_request = None
+        with profiler.stage("parse"):
+            self._push_undo(ParseCommand(self.model.parse_lines(new_lines, dirty_head, dirty_tail, span_tokens)))
+        self._pending_head = None
+        self._pending_tail = None
+        self._on_structure_changed()
 
-        # 更新数据结构
-        self.lines = new_lines
-        self.nodes_by_line = new_nodes_by_line
-        self.all_nodes = new_all_nodes
+    def _on_structure_changed(self):
+        # 选中的节点已被删除时取消选中，否则相邻节点可能有变化
+        if self.selected_node is not None:
+            if self.model.node_index.get_by_id(self.selected_node.node_id) is not self.selected_node:
+                self.selected_node = None
+                self.highlighted_nodes = set()
+            else:
+                self.highlighted_nodes = self.selected_node.connections | {self.selected_node}
+            self._fields_dirty = True
+        if self.marked_nodes:
+            self._set_marked_nodes({node for node in self.marked_nodes
+                                    if self.model.node_index.get_by_id(node.node_id) is node})
+        self._structure_dirty = True
+        self._request_render()
+
+    #
+    # 后台任务完成：丢弃过期的结果
+    #
+    def _on_worker_finished(self, kind, generation, result):
+        if not self.worker.is_current(kind, generation):
+            return
+        if kind == 'parse':
+            self._apply_parse_result(result)
+        elif kind == 'html':
+            self._html_pending = False
+            if self._display_mode() == 'text':
+                self.display_area.render_html(result)
+                # 生成HTML期间样式发生变化的节点
+                self._request_render()
+
+    def _on_worker_failed(self, kind, generation, message):
+        if not self.worker.is_current(kind, generation):
+            return
+        if kind == 'parse':
+            # 退回到在界面线程中解析
+            self._parse_request = None
+            self._parse_input()
+            self._structure_dirty = True
+        elif kind == 'html':
+            # 生成期间节点被修改（例如集合在遍历时改变大小），重新生成
+            self._html_pending = False
+            self._structure_dirty = True
+        self._request_render()
+
+    def is_busy(self) -> bool:
+        """是否还有进行中的后台解析、HTML生成、文件导入导出或尚未执行的渲染。"""
+        return (self._parse_request is not None or self._html_pending or self._file_job is not None
+                or self.render_scheduler.is_pending())
+
+    def wait_until_idle(self):
+        """等待后台任务和渲染全部完成，用于基准测试等不经过事件循环的场合。"""
+        while self.is_busy():
+            self.worker.wait()
+            self.file_worker.wait()
+            QApplication.processEvents()
+
+    #
+    # 文件任务：导入、导出在后台进行，显示进度、可以取消，成功完成后才更新界面
+    #
+    def _start_file_job(self, kind, label, func, on_finished, error_message):
+        """在后台执行 func(is_cancelled, report)，完成后在界面线程中调用 on_finished(结果)。"""
+        if self._file_job is not None:
+            return
+        # 窗口模态：进行期间不能编辑地图，后台读取的模型保持不变
+        progress_dialog = QProgressDialog(label, "取消", 0, 100, self)
+        progress_dialog.setWindowTitle("请稍候")
+        progress_dialog.setWindowModality(Qt.WindowModal)
+        progress_dialog.setMinimumDuration(0)
+        progress_dialog.setAutoClose(False)
+        progress_dialog.setAutoReset(False)
+        progress_dialog.canceled.connect(self._cancel_file_job)
+        generation = self.file_worker.submit(kind, func, with_progress=True)
+        self._file_job = (kind, generation, progress_dialog, on_finished, error_message)
+        progress_dialog.setValue(0)
+
+    def _take_file_job(self, kind, generation):
+        """结果属于进行中的文件任务时关闭进度对话框并返回该任务，否则返回 None（已取消、过期）。"""
+        job = self._file_job
+        if job is None or job[:2] != (kind, generation) or not self.file_worker.is_current(kind, generation):
+            return None
+        self._file_job = None
+        # 关闭对话框时发出的 canceled 不再有对应的任务
+        job[2].close()
+        job[2].deleteLater()
+        return job
+
+    def _cancel_file_job(self):
+        """取消进行中的文件任务：当前地图和目标文件保持原样（已写入的临时文件由任务自己删除）。"""
+        if self._file_job is None:
+            return
+        kind, _, progress_dialog = self._file_job[:3]
+        self._file_job = None
+        self.file_worker.cancel(kind)
+        progress_dialog.close()
+        progress_dialog.deleteLater()
+
+    def _on_file_job_progress(self, kind, generation, percent):
+        if self._file_job is not None and self._file_job[:2] == (kind, generation):
+            self._file_job[2].setValue(percent)
+
+    def _on_file_job_finished(self, kind, generation, result):
+        job = self._take_file_job(kind, generation)
+        if job is not None:
+            job[3](result)
+
+    def _on_file_job_failed(self, kind, generation, message):
+        job = self._take_file_job(kind, generation)
+        if job is not None:
+            QMessageBox.critical(self, "错误", f"{job[4]}: {message}")
 
     #
     # 构建带锚点和样式的HTML，内容居中
     #
+    @profiler.timed("build_html")
     def _build_html(self) -> str:
         lines_html = []
-        for line_entries in self.nodes_by_line:
+        for line_entries in self.model.nodes_by_line:
             line_parts = []
             for entry in line_entries:
                 if entry[0] == 'text':
@@ -219,16 +617,9 @@ class MainWindow(QMainWindow):
                 elif entry[0] in ('city', 'relay'):
                     node = entry[1]
                     display_text = node.name if isinstance(node, CityNode) else '◇'
-                    # 添加悬浮提示信息
-                    tooltip = (f"名称: {node.name}\n"
-                               f"全名: {node.full_name}\n"
-                               f"经济: {node.economy}\n"
-                               f"防御: {node.guard}\n"
-                               f"相邻: {', '.join(n.name for n in node.connections)}")
                     anchor = f'<a name="node_{node.node_id}"></a>'
                     style = [
                         "color: black",
-                        "font-family: 'MS Gothic'",
                         "text-decoration: none",
                         "padding: 0",
                         "margin: 0"
@@ -236,19 +627,22 @@ class MainWindow(QMainWindow):
                     # 选中节点高亮绿色显示
                     if node == self.selected_node:
                         style.append("background: lightgreen")
+                    # 批量选择的节点浅蓝色显示
+                    elif node in self.marked_nodes:
+                        style.append("background: lightskyblue")
                     # 相邻节点高亮粉色显示
                     elif node in self.highlighted_nodes:
                         style.append("background: pink")
-                    link = f'<a title="{tooltip}" href="node_{node.node_id}" style="{";".join(style)}">{display_text}</a>'
+                    link = f'<a href="node_{node.node_id}" style="{";".join(style)}">{display_text}</a>'
                     line_parts.append(anchor + link)
             lines_html.append(f'<div style="white-space: pre-wrap;">{"".join(line_parts)}</div>')
 
-        return f'''
+        html = f'''
         <html>
         <head>
         <style>
             body {{
-                font-family: 'MS Gothic';
+                font-family: '{self.map_font_family}';
                 color: black;
                 background-color: white;
                 margin: 0;
@@ -266,35 +660,89 @@ class MainWindow(QMainWindow):
         </body>
         </html>
         '''
+        profiler.set_counter("html_bytes", len(html.encode("utf-8")))
+        return html
+
+    def _hover_info(self, node_id) -> str | None:
+        """文本模式下鼠标停留在节点上时才生成悬浮提示。"""
+        node = self.model.node_index.get_by_id(node_id)
+        return node.tooltip_text() if node else None
 
     #
-    # 更新显示和输入框状态
+    # 更新显示和输入框状态：修改后只提出请求，回到事件循环后合并为一次渲染
     #
-    def _update_display_and_fields(self):
-        html = self._build_html()
-        self.display_area.setHtml(html)
-        if self.selected_node:
-            self.full_name_edit.setText(self.selected_node.full_name)
-            self.economy_edit.setText(str(self.selected_node.economy))
-            self.guard_edit.setText(str(self.selected_node.guard))
-        else:
-            self.full_name_edit.clear()
-            self.economy_edit.clear()
-            self.guard_edit.clear()
-            self.full_name_edit.setReadOnly(False)
+    def _request_render(self):
+        self.render_scheduler.request()
+
+    @profiler.timed("render")
+    def _render(self) -> bool:
+        """渲染自上次渲染以来的全部变化，没有可见变化时直接返回 False。"""
+        if not (self._structure_dirty or self._dirty_nodes or self._fields_dirty):
+            return False
+        profiler.count("renders")
+        if self._structure_dirty:
+            profiler.set_counter("nodes", len(self.model.all_nodes))
+        mode = self._display_mode()
+        if mode == 'scene':
+            # 场景模式：结构未变时只重绘样式可能变化的节点（图元只能在界面线程中创建）
+            if self._structure_dirty:
+                self.map_view.build(self.model.nodes_by_line)
+                self._dirty_nodes = set(self.model.all_nodes)
+            self.map_view.restyle_nodes(self._dirty_nodes, self.selected_node, self.highlighted_nodes,
+                                        self.marked_nodes)
+            self._dirty_nodes = set()
+        elif mode == 'virtual':
+            # 虚拟模式：只记录地图内容，绘制时才为可见的行排版
+            if self._structure_dirty:
+                self.virtual_view.set_lines(self.model.nodes_by_line, self.model.lines)
+            self.virtual_view.restyle_nodes(self._dirty_nodes, self.selected_node, self.highlighted_nodes,
+                                            self.marked_nodes)
+            self._dirty_nodes = set()
+        elif self._structure_dirty:
+            # 文本模式：在后台生成HTML，完成后整体替换，再改写期间样式变化的节点
+            self.worker.submit('html', lambda is_cancelled: self._build_html())
+            self._html_pending = True
+        elif not self._html_pending:
+            # 文本模式：结构未变时只改写样式变化节点的字符格式
+            self.display_area.restyle_nodes(self._dirty_nodes, self.selected_node, self.highlighted_nodes,
+                                            self.marked_nodes)
+            self._dirty_nodes = set()
+        self._structure_dirty = False
+        # 只在选中节点变化后重新填写输入框，输入过程中不改写正在编辑的内容
+        if self._fields_dirty:
+            self._fields_dirty = False
+            if self.selected_node:
+                self.full_name_edit.setText(self.selected_node.full_name)
+                self.economy_edit.setText(str(self.selected_node.economy))
+                self.guard_edit.setText(str(self.selected_node.guard))
+            else:
+                self.full_name_edit.clear()
+                self.economy_edit.clear()
+                self.guard_edit.clear()
+                self.full_name_edit.setReadOnly(False)
+        if self.diagnostics_dock is not None and self.diagnostics_dock.isVisible():
+            self.diagnostics_dock.schedule_refresh(self.model.validator)
+        return True
 
     #
     # 右键点击事件：取消选中节点
     #
     def on_right_click(self):
+        self._dirty_nodes |= self.highlighted_nodes
         self.selected_node = None
         self.highlighted_nodes = set()
-        self._update_display_and_fields()
+        self._fields_dirty = True
+        self._request_render()
 
     #
     # 处理地图锚点点击事件，绑定状态保持
     #
+    @profiler.timed("click")
     def on_map_anchor_clicked(self, node: MapNode):
+        self._dirty_nodes |= self.highlighted_nodes
+        self._dirty_nodes.add(node)
+        # 选中状态或中继的自动名称都可能变化，输入框随之重新填写
+        self._fields_dirty = True
         # 点击节点时，如果当前没有选中节点，则选中当前节点并高亮相邻节点
         if self.selected_node is None:
             self.selected_node = node
@@ -306,54 +754,237 @@ class MainWindow(QMainWindow):
             self.highlighted_nodes = set()
         else:
             # 点击其他节点时建立或取消连接，但保持当前选中状态
-            if node in self.selected_node.connections:
-                self.selected_node.connections.remove(node)
-                node.connections.remove(self.selected_node)
-            else:
-                self.selected_node.connections.add(node)
-                node.connections.add(self.selected_node)
-                if isinstance(self.selected_node, RelayNode):
-                    self.selected_node.update_full_name_if_two_cities()
-                if isinstance(node, RelayNode):
-                    node.update_full_name_if_two_cities()
+            self._push_undo(connection_command(self.model, self.selected_node, node))
             self.highlighted_nodes = self.selected_node.connections.copy()
             self.highlighted_nodes.add(self.selected_node)
 
-        self._update_display_and_fields()
+        self._dirty_nodes |= self.highlighted_nodes
+        self._request_render()
+
+    #
+    # 批量选择：框选、ctrl+点击、按条件选择的节点浅蓝色显示，供批量修改使用
+    #
+    def _set_marked_nodes(self, nodes: set):
+        self._dirty_nodes |= self.marked_nodes ^ nodes
+        self.marked_nodes = nodes
+        self.marked_label.setText(f"已选择 {len(nodes)} 个节点" if nodes else "")
+        self._request_render()
+
+    def on_nodes_box_selected(self, nodes, add: bool):
+        self._set_marked_nodes(self.marked_nodes | set(nodes) if add else set(nodes))
+
+    def on_map_anchor_marked(self, node: MapNode):
+        self._set_marked_nodes(self.marked_nodes ^ {node})
+
+    def on_select_nodes(self):
+        from bulk_dialog import NodeSelectionDialog
+        from bulk_edit import select_nodes
+
+        if self._parse_input():
+            self._on_structure_changed()
+        dialog = NodeSelectionDialog(len(self.model.lines), self)
+        if dialog.exec() != QDialog.Accepted:
+            return
+        self.on_nodes_box_selected(select_nodes(self.model, **dialog.criteria()), dialog.add_to_selection())
 
     #
     # 更新节点属性 全名 经济 防卫
     #
     def on_full_name_changed(self, txt):
         if isinstance(self.selected_node, MapNode):
-            self.selected_node.full_name = txt
-            self._update_display_and_fields()
+            old_full_name = self.selected_node.full_name
+            self.model.set_full_name(self.selected_node, txt)
+            self._push_undo(AttributeCommand(self.selected_node, 'full_name', old_full_name, txt))
+            self._dirty_nodes.add(self.selected_node)
+            self._request_render()
 
     def on_economy_changed(self, txt):
         if self.selected_node and txt.isdigit():
+            self._push_undo(AttributeCommand(self.selected_node, 'economy', self.selected_node.economy, int(txt)))
             self.selected_node.economy = int(txt)
-        self._update_display_and_fields()
+            self._dirty_nodes.add(self.selected_node)
+            self._request_render()
 
     def on_guard_changed(self, txt):
         if self.selected_node and txt.isdigit():
+            self._push_undo(AttributeCommand(self.selected_node, 'guard', self.selected_node.guard, int(txt)))
             self.selected_node.guard = int(txt)
-        self._update_display_and_fields()
+            self._dirty_nodes.add(self.selected_node)
+            self._request_render()
+
+    #
+    # 撤销、重做：尚未解析的输入先作为一次修改并入模型
+    #
+    def _push_undo(self, command):
+        self.undo_stack.push(command)
+        self._update_undo_actions()
+
+    def _update_undo_actions(self):
+        self.undo_action.setEnabled(self.undo_stack.can_undo())
+        self.redo_action.setEnabled(self.undo_stack.can_redo())
+
+    def on_undo(self):
+        self._step_history(self.undo_stack.undo)
+
+    def on_redo(self):
+        self._step_history(self.undo_stack.redo)
+
+    def _step_history(self, step):
+        parsed = self._parse_input()
+        command = step(self.model)
+        self._update_undo_actions()
+        if command is None:
+            if parsed:
+                self._on_structure_changed()
+            return
+        if isinstance(command, ParseCommand):
+            # command.edit 现在记录的是被换下的行，即输入框中对应的文本
+            edit = command.edit
+            self._replace_input_lines(edit.first, len(edit.lines),
+                                      self.model.lines[edit.first:edit.first + edit.line_count])
+            self._on_structure_changed()
+            return
+        self._on_nodes_changed(command.nodes())
+
+    def _on_nodes_changed(self, nodes):
+        """nodes 的连接或属性被修改（撤销、重做、批量建立连接）后，重绘它们并刷新选中节点的高亮和输入框。"""
+        self._dirty_nodes.update(nodes)
+        if self.selected_node is not None:
+            self._dirty_nodes |= self.highlighted_nodes
+            self.highlighted_nodes = self.selected_node.connections.copy()
+            self.highlighted_nodes.add(self.selected_node)
+            self._dirty_nodes |= self.highlighted_nodes
+        self._fields_dirty = True
+        self._request_render()
+
+    #
+    # 从地图上画出的路线推断连接，确认后作为一次修改建立
+    #
+    def on_infer_routes(self):
+        from route_dialog import RouteInferenceDialog
+        from route_inference import infer_routes
+
+        if self._parse_input():
+            self._on_structure_changed()
+        try:
+            inference = infer_routes(self.model.lines, self.model.nodes_by_line, self.model.tokenizer)
+        except ValueError as e:
+            QMessageBox.critical(self, "错误", str(e))
+            return
+        dialog = RouteInferenceDialog(inference, self)
+        if dialog.exec() != QDialog.Accepted:
+            return
+        pairs = dialog.checked_pairs()
+        if not pairs:
+            return
+        command = CompoundCommand([connection_command(self.model, a, b) for a, b in pairs])
+        self._push_undo(command)
+        self._on_nodes_changed(command.nodes())
+
+    #
+    # 批量修改：修改先收集到事务中，一次应用，作为一条撤销记录，只渲染一次
+    #
+    def _marked_nodes_for_edit(self) -> list[MapNode]:
+        """应用输入框中尚未解析的修改后，批量选择的节点（按ID排列）；没有时给出提示。"""
+        if self._parse_input():
+            self._on_structure_changed()
+        if not self.marked_nodes:
+            QMessageBox.information(self, "批量修改", "请先选择节点（shift+拖动框选、ctrl+点击或编辑-选择节点）。")
+            return []
+        return sorted(self.marked_nodes, key=lambda node: node.node_id)
+
+    def _commit_transaction(self, transaction) -> int:
+        """提交事务，返回修改的项数（没有变化时为 0）。"""
+        with profiler.stage("bulk"):
+            command = transaction.commit()
+        if command is None:
+            return 0
+        self._push_undo(command)
+        self._on_nodes_changed(command.nodes())
+        return len(command.commands)
+
+    def on_bulk_edit(self):
+        from bulk_dialog import BulkEditDialog
+        from bulk_edit import Transaction
+
+        nodes = self._marked_nodes_for_edit()
+        if not nodes:
+            return
+        dialog = BulkEditDialog(len(nodes), self)
+        if dialog.exec() != QDialog.Accepted:
+            return
+        transaction = Transaction(self.model)
+        for attribute, value in dialog.changes():
+            transaction.set_attribute(nodes, attribute, value)
+        self._commit_transaction(transaction)
+
+    def on_connect_marked(self, connected: bool):
+        """把批量选择的节点全部连接到（或断开与）当前选中的节点。"""
+        from bulk_edit import Transaction
+
+        nodes = self._marked_nodes_for_edit()
+        if not nodes:
+            return
+        if self.selected_node is None:
+            QMessageBox.information(self, "批量修改", "请先左键点击选中一个节点。")
+            return
+        transaction = Transaction(self.model)
+        for node in nodes:
+            if connected:
+                transaction.connect(self.selected_node, node)
+            else:
+                transaction.disconnect(self.selected_node, node)
+        self._commit_transaction(transaction)
+
+    def on_disconnect_marked_between(self):
+        from bulk_edit import Transaction
+
+        nodes = self._marked_nodes_for_edit()
+        transaction = Transaction(self.model)
+        for node in nodes:
+            for other in node.connections & self.marked_nodes:
+                transaction.disconnect(node, other)
+        self._commit_transaction(transaction)
+
+    def _replace_input_lines(self, first, count, lines):
+        """把输入框中从第 first 行开始的 count 行换成 lines，只改动这几行；文本与模型保持一致，不需要重新解析。"""
+        doc = self.input_area.document()
+        cursor = QTextCursor(doc)
+        cursor.beginEditBlock()
+        text = "\n".join(lines)
+        if count:
+            last_block = doc.findBlockByNumber(first + count - 1)
+            start = doc.findBlockByNumber(first).position()
+            end = last_block.position() + last_block.length() - 1
+            if not lines:
+                # 连同一个换行符一起删除
+                if last_block.next().isValid():
+                    end = last_block.next().position()
+                else:
+                    start -= 1
+            cursor.setPosition(start)
+            cursor.setPosition(end, QTextCursor.KeepAnchor)
+            cursor.insertText(text)
+        else:
+            block = doc.findBlockByNumber(first)
+            if block.isValid():
+                cursor.setPosition(block.position())
+                cursor.insertText(text + "\n")
+            else:
+                cursor.movePosition(QTextCursor.End)
+                cursor.insertText("\n" + text)
+        cursor.endEditBlock()
+        self._dirty_head = None
+        self._dirty_tail = None
+        self.live_preview_timer.stop()
 
     #
     # 导出数据：先弹出输入框获取MAPID（默认为NEW MAP），
     # 后续输出中将所有MAPID替换为用户输入的内容
     #
     def export_check_relay(self)->bool:
-        # 预先检查每个中继点，如果其名称仍为菱形，则触发警告
-        warnings = []
-        for line_index, line_entries in enumerate(self.nodes_by_line):
-            relay_index = 0  # 用于记录当前行中第几个中继点
-            for entry in line_entries:
-                if entry[0] == 'relay':
-                    relay_index += 1
-                    relay_node = entry[1]
-                    if relay_node.full_name == "◇":
-                            warnings.append(f"位于第 {line_index+1} 行第 {relay_index} 个中继点仍然为默认名称")
+        # 读取增量维护的检查结果：中继仍为默认名称、全名重复、单向连接时触发警告
+        warnings = self.model.validator.messages(EXPORT_CHECKS)
         if warnings:
             # 最多显示10行
             display_warnings = warnings[:10]
@@ -369,103 +1000,34 @@ class MainWindow(QMainWindow):
         mapid, ok = QInputDialog.getText(self, "输入MAPID", "请输入MAPID:", text="NEWMAP")
         if not ok:
             return
+        # 先应用输入框中尚未解析的修改（同时取消进行中的后台解析），导出期间模型不再变化
+        if self._parse_input():
+            self._on_structure_changed()
         keep_gen = self.export_check_relay()
         if not keep_gen:
             return
-        # 生成导出内容
-        output_lines = []
-        output_lines.append(";==== Export Start ====")
-        output_lines.append(f"@DRAWMAP_{mapid}(ARG:0 = 0, ARG:1 = 0)")
-        output_lines.append("""CALL DRAWMAP_INIT(ARG:0, 0)
-    ;MAP_SHOW_TYPE
-    IF DRAWMAP_MENUBARTYPE != 0
-        CALL DRAWMAP_PRINT_MENU(DRAWMAP_MENUBARTYPE, DRAWMAP_LINECOUNT)
-        DRAWMAP_LINECOUNT++
-        CALL DRAW_MAP_SHOW_CONFIG_BUTTON()
-    ELSE
-        MAP_SHOW_CONFIG = 0
-    ENDIF""")
-        for i, line_text in enumerate(self.lines):
-            line_entries = self.nodes_by_line[i]
-            ids_in_line = [str(entry[1].node_id) for entry in line_entries if entry[0] in ('city', 'relay')]
-            joined_ids = ",".join(ids_in_line)
-            safe_line_text = line_text.replace('"', '\\"')
-            output_lines.append(f'CALL DRAWMAP_LINE("{safe_line_text}", {joined_ids})')
-        output_lines.append("CALL DRAWMAP_END()")
-        output_lines.append("")
-        output_lines.append(f"@SET_CITY_NUM_{mapid}()")
-        output_lines.append(f"CITY_NUM = {self.max_city_id}")
-        output_lines.append("")
-        output_lines.append(f"@SET_SHORTCITYNAME_{mapid}()")
-        for node in self.all_nodes:
-            if isinstance(node, CityNode):
-                output_lines.append(f"CITY_NAME_SHORT:{node.node_id} = {node.name}")
-        output_lines.append("""FOR LOCAL:0, 0, MAX_CITY
-        SIF CITY_TYPE:(LOCAL:0) == 1
-            CITY_NAME_SHORT:(LOCAL:0) = ●
-    NEXT
-    """)
-        output_lines.append("")
-        output_lines.append(f"@SET_CITYNAME_{mapid}()")
-        output_lines.append("VARSET CITY_NAME,\"無名\"")
-        for node in self.all_nodes:
-            if isinstance(node, CityNode):
-                output_lines.append(f"CITY_NAME:{node.node_id} = {node.full_name}")
-        for node in self.all_nodes:
-            if isinstance(node, RelayNode):
-                output_lines.append(f"CITY_NAME:{node.node_id} = {node.full_name}")
-
-        output_lines.append(f"@SET_CITY_TYPE_{mapid}")
-        output_lines.append("""
-    FOR LOCAL:0, GET_CITY_NUM() + 1, MAX_CITY
-        CITY_TYPE:(LOCAL:0) = 1
-    NEXT
-    """)
-        output_lines.append("")
-        output_lines.append(f"@SET_MAP_ROUTE_{mapid}")
-        for node in self.all_nodes:
-            sorted_conns = sorted(node.connections, key=lambda x: x.node_id)
-            if sorted_conns:
-                names = [c.full_name for c in sorted_conns]
-                all_args = '", "'.join(names)
-                output_lines.append(f'CALL REGISTER_ROUTE_S("{node.full_name}", "{all_args}")')
-            else:
-                output_lines.append(f'CALL REGISTER_ROUTE_S("{node.full_name}")')
-        output_lines.append("")
-        output_lines.append(f"@MAP_INIT_{mapid}")
-        for node in self.all_nodes:
-            if isinstance(node, CityNode):
-                output_lines.append(f'CITY_ECONOMY:GET_CITYNUMBER("{node.full_name}") = {node.economy}')
-        output_lines.append("""
-    FOR LOCAL:0, 1, MAX_CITY
-        CITY_ECONOMY_LIMIT:(LOCAL:0) = MIN(CITY_ECONOMY:(LOCAL:0) * 2, 300000)
-    NEXT
-    """)
-        for node in self.all_nodes:
-            if isinstance(node, CityNode):
-                output_lines.append(f'CITY_GUARD:GET_CITYNUMBER("{node.full_name}") = {node.guard}')
-        output_lines.append(";==== Export End ====")
-        self.export_data_2_file(output_lines, mapid)
-
-    def export_data_2_file(self, output_lines, mapid):
-        # 查找可用的文件名
-        file_index = 1
-        while True:
-            file_name = f"MAP_{mapid}_{file_index}.erb"
-            if not os.path.exists(file_name):
-                break
-            file_index += 1
-
-        # 将内容写入文件
-        try:
-            with open(file_name, "w", encoding="utf-8") as f:
-                for line in output_lines:
-                    f.write(line + "\n")
-        except Exception as e:
-            QMessageBox.critical(self, "错误", f"写入文件时出错: {e}")
-            return
+        self.export_data_2_file(mapid)
+
+    def export_data_2_file(self, mapid):
+        # 在后台写入下一个可用的文件名（或覆盖上次导出的文件），只重新生成有变化的段；
+        # 先写入临时文件，完成后才替换，取消或出错时不留下写了一半的文件
+        from export_cache import export_map
+
+        model = self.model
+        overwrite = self.overwrite_export_action.isChecked()
+
+        def export(is_cancelled, report):
+            with profiler.stage("export"):
+                return export_map(model, mapid, overwrite=overwrite, is_cancelled=is_cancelled, report=report)
 
+        self._start_file_job('export', "正在导出...", export, self._on_export_finished, "写入文件时出错")
+
+    def _on_export_finished(self, result):
+        file_name, regenerated = result
         # 导出成功后提示用户
+        if not regenerated:
+            QMessageBox.information(self, "导出完成", f"地图数据与上次导出的 {file_name} 相同，没有重新导出。")
+            return
         QMessageBox.information(self, "导出完成", f"地图数据已成功导出到 {file_name} 文件中。")
 
     #
@@ -477,120 +1039,215 @@ class MainWindow(QMainWindow):
         if not file_name:
             return
 
+        from erb_import import load_erb
+
+        # 在后台读取、解析，全部成功后才打开新地图；取消或出错时当前地图不受影响
+        def import_erb(is_cancelled, report):
+            with profiler.stage("import"):
+                return load_erb(file_name, is_cancelled=is_cancelled, report=report)
+
+        def on_finished(imported):
+            self.open_map(imported, os.path.basename(file_name))
+            QMessageBox.information(self, "导入完成", f"地图数据已成功从 {file_name} 导入。")
+
+        self._start_file_job('import', "正在导入...", import_erb, on_finished, "读取文件时出错")
+
+    #
+    # 属性表：每个节点一行的 CSV（ID、名称、全名、经济、防御、位置、相邻节点），可以在表格软件中编辑后导入
+    #
+    def export_attribute_table(self):
+        from bulk_edit import write_attribute_csv
+
+        file_name, _ = QFileDialog.getSaveFileName(self, "导出属性表", "", "CSV 文件 (*.csv)")
+        if not file_name:
+            return
+        if not file_name.lower().endswith(".csv"):
+            file_name += ".csv"
+        if self._parse_input():
+            self._on_structure_changed()
+        try:
+            write_attribute_csv(self.model, file_name)
+        except Exception as e:
+            QMessageBox.critical(self, "错误", f"写入文件时出错: {e}")
+            return
+        QMessageBox.information(self, "导出完成", f"{len(self.model.all_nodes)} 个节点的属性已导出到 {file_name}。")
+
+    def import_attribute_table(self):
+        from bulk_edit import read_attribute_csv
+
+        file_name, _ = QFileDialog.getOpenFileName(self, "导入属性表", "", "CSV 文件 (*.csv);;所有文件 (*)")
+        if not file_name:
+            return
+        if self._parse_input():
+            self._on_structure_changed()
+        try:
+            transaction, problems = read_attribute_csv(self.model, file_name)
+        except Exception as e:
+            QMessageBox.critical(self, "错误", f"读取文件时出错: {e}")
+            return
+        changed = self._commit_transaction(transaction)
+        message = f"从 {file_name} 修改了 {changed} 项（作为一次修改，可以整体撤销）。"
+        if problems:
+            # 最多显示10行
+            message += "\n" + "\n".join(problems[:10]) + ("\n..." if len(problems) > 10 else "")
+            QMessageBox.warning(self, "导入完成", message)
+            return
+        QMessageBox.information(self, "导入完成", message)
+
+    #
+    # 项目文件：无损保存地图文本、节点属性和连接，打开时不需要重新解析
+    #
+    def open_project(self):
+        from project_file import PROJECT_SUFFIX, load_project
+
+        file_name, _ = QFileDialog.getOpenFileName(self, "打开项目", "", f"地图项目 (*{PROJECT_SUFFIX});;所有文件 (*)")
+        if not file_name:
+            return
+
         try:
-            with open(file_name, "r", encoding="utf-8") as file:
-                lines = file.readlines()
+            # 界面中需要编辑、重新解析，解码为普通节点
+            model = load_project(file_name)
         except Exception as e:
             QMessageBox.critical(self, "错误", f"读取文件时出错: {e}")
             return
 
-        # 初始化存储数据的变量
-        map_lines = []       # 存放每行地图文本和对应节点 ID 列表的元组 [(text, [node_id, ...]), ...]
-        city_names = {}      # 从 CITY_NAME_SHORT: 行中解析到的数据 {node_id: short_name}
-        city_full_names = {} # 从 CITY_NAME: 行中解析到的数据 {node_id: full_name}
-        city_economy = {}    # 从 CITY_ECONOMY: 行中解析到的数据 {full_name: economy}
-        city_guard = {}      # 从 CITY_GUARD: 行中解析到的数据 {full_name: guard}
-        connections = {}     # 从 CALL REGISTER_ROUTE_S 行中解析到的数据 {full_name: [connected_full_name, ...]}
-
-        # 遍历每一行进行解析
-        for line in lines:
-            line = line.strip()
-            if line.startswith('CALL DRAWMAP_LINE'):
-                # 解析地图行，提取文本和节点 ID 列表
-                match = re.match(r'CALL DRAWMAP_LINE\("(.+?)",\s*(.*?)\)', line)
-                if match:
-                    text, ids = match.groups()
-                    text = text.replace('\\"', '"')  # 恢复转义的引号
-                    id_list = [int(id_) for id_ in ids.split(',') if id_]
-                    map_lines.append((text, id_list))
-            elif line.startswith('CITY_NAME_SHORT:'):
-                # 解析简短名称（节点名称）
-                match = re.match(r'CITY_NAME_SHORT:(\d+)\s*=\s*(.+)', line)
-                if match:
-                    node_id, name = match.groups()
-                    city_names[int(node_id)] = name.strip()
-            elif line.startswith('CITY_NAME:'):
-                # 解析全名
-                match = re.match(r'CITY_NAME:(\d+)\s*=\s*(.+)', line)
-                if match:
-                    node_id, full_name = match.groups()
-                    city_full_names[int(node_id)] = full_name.strip()
-            elif line.startswith('CITY_ECONOMY:'):
-                # 解析经济值
-                match = re.match(r'CITY_ECONOMY:GET_CITYNUMBER\("(.+?)"\)\s*=\s*(\d+)', line)
-                if match:
-                    full_name, economy = match.groups()
-                    city_economy[full_name] = int(economy)
-            elif line.startswith('CITY_GUARD:'):
-                # 解析防御值
-                match = re.match(r'CITY_GUARD:GET_CITYNUMBER\("(.+?)"\)\s*=\s*(\d+)', line)
-                if match:
-                    full_name, guard = match.groups()
-                    city_guard[full_name] = int(guard)
-            elif line.startswith('CALL REGISTER_ROUTE_S'):
-                # 解析连接关系，提取所有双引号内的内容
-                names = re.findall(r'"([^"]+)"', line)
-                if names:
-                    node_full_name = names[0]  # 第一个为当前节点的全名
-                    connections[node_full_name] = names[1:]  # 后续为相连节点的全名
-
-        # 根据 full_name 和短名称构建节点对象
-        self.all_nodes.clear()
-        node_map = {}
-        # 所有节点 ID 的并集（key 均为节点的 id）
-        all_node_ids = set(city_full_names.keys()).union(set(city_names.keys()))
-        for node_id in sorted(all_node_ids):
-            short_name = city_names.get(node_id)   # 可能为 None
-            # 优先从 CITY_NAME 中获取 full_name，若不存在则使用 short_name
-            full_name = city_full_names.get(node_id, short_name)
-            # 根据要求：以 full_name 为基础，如果 short_name 不存在或为默认中继符号 "◇"，则认为该节点为中继节点
-            if not short_name or short_name == "◇":
-                node = RelayNode("◇", position=None)
+        self.open_map(model, os.path.basename(file_name))
+
+    def save_project(self):
+        from project_file import PROJECT_SUFFIX, save_project
+
+        file_name, _ = QFileDialog.getSaveFileName(self, "保存项目", "", f"地图项目 (*{PROJECT_SUFFIX})")
+        if not file_name:
+            return
+        if not file_name.lower().endswith(PROJECT_SUFFIX):
+            file_name += PROJECT_SUFFIX
+
+        # 先应用输入框中尚未解析的修改
+        if self._parse_input():
+            self._on_structure_changed()
+        try:
+            save_project(self.model, file_name)
+        except Exception as e:
+            QMessageBox.critical(self, "错误", f"写入文件时出错: {e}")
+            return
+
+        QMessageBox.information(self, "保存完成", f"地图项目已保存到 {file_name}。")
+
+    def closeEvent(self, event):
+        # 关闭前作废并等待后台任务，避免其在窗口销毁后仍访问模型
+        self.worker.cancel('parse')
+        self.worker.cancel('html')
+        self._cancel_file_job()
+        self.worker.wait()
+        self.file_worker.wait()
+        self.workspace.close()
+        super().closeEvent(event)
+
+    def set_model(self, model: MapModel):
+        """整体替换当前地图（例如导入后），输入框文本随之更新，不再重新解析。"""
+        self.workspace.active.model = model
+        self.undo_stack.clear()
+        self._show_model(model, None, ())
+        self._structure_dirty = True
+        self._request_render()
+
+    def _show_model(self, model: MapModel, selected_node_id, marked_node_ids):
+        """显示 model：填入输入框文本，恢复选中的节点和批量选择；显示区域由调用方处理。"""
+        self.model = model
+
+        # 文本与节点已经一致，清除变动记录，进行中的后台解析作废
+        self.input_area.setPlainText("\n".join(model.lines))
+        self._dirty_head = None
+        self._dirty_tail = None
+        self._pending_head = None
+        self._pending_tail = None
+        self.worker.cancel('parse')
+        self._parse_request = None
+        self.live_preview_timer.stop()
+
+        self.selected_node = model.node_index.get_by_id(selected_node_id) if selected_node_id is not None else None
+        self.highlighted_nodes = (self.selected_node.connections | {self.selected_node}
+                                  if self.selected_node is not None else set())
+        self.marked_nodes = {node for node in map(model.node_index.get_by_id, marked_node_ids) if node is not None}
+        self.marked_label.setText(f"已选择 {len(self.marked_nodes)} 个节点" if self.marked_nodes else "")
+        self._dirty_nodes = set()
+        self._fields_dirty = True
+        self._update_undo_actions()
+
+    #
+    # 多张地图：标签页切换、新建、关闭
+    #
+    def _next_untitled_title(self) -> str:
+        self._untitled_count += 1
+        return f"未命名{self._untitled_count}"
+
+    def new_map(self):
+        self._add_document(MapDocument(self._next_untitled_title()))
+
+    def open_map(self, model: MapModel, title):
+        """在新标签页中打开 model；当前地图是空白的未修改地图时直接替换它。"""
+        if self.input_area.document().isEmpty() and not self.undo_stack.can_undo() and not self.model.all_nodes:
+            self.workspace.active.title = title
+            self.tab_bar.setTabText(self.tab_bar.currentIndex(), title)
+            self.set_model(model)
+            return
+        self._add_document(MapDocument(title, model))
+
+    def _add_document(self, document: MapDocument):
+        self.workspace.add(document)
+        # 切换到新标签页（on_tab_changed）
+        self.tab_bar.setCurrentIndex(self.tab_bar.addTab(document.title))
+
+    def on_tab_changed(self, index):
+        if index < 0:
+            return
+        document = self.workspace.documents[index]
+        if document is self.workspace.active:
+            return
+        if self.workspace.active is not None:
+            self._store_document_state(self.workspace.active)
+        with profiler.stage("switch"):
+            model = self.workspace.activate(document)
+            self.undo_stack = document.undo_stack
+            self._show_model(model, document.selected_node_id, document.marked_node_ids)
+            rendered = document.rendered
+            document.rendered = None
+            if rendered is not None and self._display_mode() == 'text':
+                # 换回切换走时的渲染结果，不需要重新生成HTML
+                self.display_area.restore_rendered(rendered)
+                self._structure_dirty = False
+                self._dirty_nodes = self.highlighted_nodes | self.marked_nodes
             else:
-                node = CityNode(short_name)
-            node.node_id = node_id
-            node.full_name = full_name
-            node.economy = city_economy.get(full_name, 0)
-            node.guard = city_guard.get(full_name, 0)
-            node_map[full_name] = node
-            self.all_nodes.append(node)
-
-        # 恢复连接关系（使用 full_name 作为标识，要求导出时 full_name 唯一）
-        for node_full_name, conn_full_names in connections.items():
-            node = node_map.get(node_full_name)
-            if node:
-                for conn_full_name in conn_full_names:
-                    conn_node = node_map.get(conn_full_name)
-                    if conn_node:
-                        node.connections.add(conn_node)
-                        conn_node.connections.add(node)
-
-        # 更新输入区域文本为导入的地图文本
-        imported_text = "\n".join([item[0] for item in map_lines])
-        self.input_area.setPlainText(imported_text)
-
-        # 为每个节点添加坐标，确保 _parse_input 中可以正确复用原有节点
-        # 这里使用与 _parse_input 中相同的正则表达式（匹配城市名称和中继符号 "◇"）
-        node_pattern = re.compile(r'([a-zA-Z0-9\u4e00-\u9fa5]+)|(◇)')
-        lines_in_text = imported_text.splitlines()
-        for line_index, line in enumerate(lines_in_text):
-            matches = list(node_pattern.finditer(line))
-            # 根据 map_lines 中保存的节点 ID 顺序，为本行中每个节点分配坐标
-            if line_index < len(map_lines):
-                ids_in_line = map_lines[line_index][1]
-                for token_index, match in enumerate(matches):
-                    if token_index < len(ids_in_line):
-                        node_id = ids_in_line[token_index]
-                        # 在 self.all_nodes 中找到对应节点，并记录其位置（行号, 列起始位置）
-                        for node in self.all_nodes:
-                            if node.node_id == node_id:
-                                node.position = (line_index, match.start())
-                                break
-
-        # 调用更新方法，重新解析输入文本，构建节点数据结构
-        self.on_update_pressed()
-
-        QMessageBox.information(self, "导入完成", f"地图数据已成功从 {file_name} 导入。")
+                if rendered is not None:
+                    rendered.release()
+                self._structure_dirty = True
+        self._request_render()
+
+    def _store_document_state(self, document: MapDocument):
+        """切换走之前：应用输入框中尚未解析的修改，记下选中的节点，显示是最新的时保留渲染结果。"""
+        if self._parse_input():
+            self._on_structure_changed()
+        document.selected_node_id = self.selected_node.node_id if self.selected_node is not None else None
+        document.marked_node_ids = [node.node_id for node in self.marked_nodes]
+        if self._display_mode() == 'text' and not self._structure_dirty and not self._html_pending:
+            # 先把尚未执行的局部渲染（样式变化的节点）应用到文档
+            self.render_scheduler.flush()
+            document.rendered = self.display_area.take_rendered()
+        self.worker.cancel('html')
+        self._html_pending = False
+
+    def on_tab_close_requested(self, index):
+        if index < 0:
+            return
+        document = self.workspace.documents[index]
+        if self.workspace.documents == [document]:
+            # 只剩一张地图时换成空白地图
+            self.new_map()
+        elif document is self.workspace.active:
+            self.tab_bar.setCurrentIndex(index + 1 if index + 1 < len(self.workspace.documents) else index - 1)
+        # 先从工作区中移除，removeTab 引起的 currentChanged 按移除后的顺序找到当前地图
+        self.workspace.remove(document)
+        self.tab_bar.removeTab(index)
 
 #
 # ------------------------------------------------------------------
@@ -599,10 +1256,27 @@ class MainWindow(QMainWindow):
 #
 
 def main():
-    app = QApplication(sys.argv)
+    # --profile 文件：记录整个会话（见 profiling.py），其余参数交给 Qt
+    # （不使用 argparse：只有这一个参数，省去启动时的导入）
+    qt_args = sys.argv[1:]
+    profile_file = None
+    for i, arg in enumerate(qt_args):
+        if arg.startswith("--profile="):
+            profile_file = arg.partition("=")[2]
+            del qt_args[i]
+            break
+        if arg == "--profile" and i + 1 < len(qt_args):
+            profile_file = qt_args[i + 1]
+            del qt_args[i:i + 2]
+            break
+    profiler.start_session_from_env(profile_file)
+
+    app = QApplication(sys.argv[:1] + qt_args)
     w = MainWindow()
     w.show()
-    sys.exit(app.exec())
+    exit_code = app.exec()
+    profiler.stop_session()
+    sys.exit(exit_code)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,294 @@
+from node import MapNode, CityNode, RelayNode
+from node_index import NodeIndex
+from node_store import NodeStore
+from tokenizer import DEFAULT_TOKENIZER, Tokenizer
+from validation import MapValidator, DEFAULT_RELAY
+#
+# ------------------------------------------------------------------
+#  地图模型：不依赖 Qt，图形界面与命令行共用
+# ------------------------------------------------------------------
+#
+
+class SpanEdit:
+    """
+    一段连续行的内容：从 first 开始的 line_count 行将被换成 lines（及对应的节点、每行城市和中继数量、节点坐标）。
+    节点以对象本身保存，撤销后重新出现的节点与原来是同一个对象。
+    """
+    __slots__ = ('first', 'line_count', 'lines', 'entries', 'city_counts', 'relay_counts', 'positions')
+
+    def __init__(self, first, line_count, lines, entries, city_counts, relay_counts, positions):
+        self.first = first
+        self.line_count = line_count
+        self.lines = lines
+        self.entries = entries
+        self.city_counts = city_counts
+        self.relay_counts = relay_counts
+        self.positions = positions
+
+
+class MapModel:
+    def __init__(self, tokenizer: Tokenizer = DEFAULT_TOKENIZER):
+        # 分词规则（城市名称字符、中继符号），解析与导入使用同一个
+        self.tokenizer = tokenizer
+
+        # 数据结构（与空输入框对应：一个空行）
+        self.lines = [""]           # 原始文本行
+        self.nodes_by_line = [[]]   # 每行中的节点（城市或中继）
+        self.all_nodes = []         # 当前使用的所有节点
+        self.max_city_id = 0
+        self.node_index = NodeIndex()  # 按ID、全名、坐标查找节点
+        self.line_city_counts = [0]    # 每行中的城市数量
+        self.line_relay_counts = [0]   # 每行中的中继数量
+        self.validator = MapValidator(self)  # 导出前检查，连接、全名变化时增量更新
+
+    #
+    # 解析文本，构建节点数据结构
+    #
+    def parse_text(self, text: str):
+        self.parse_lines(text.split('\n'))
+
+    def dirty_span(self, new_lines, dirty_head=0, dirty_tail=0):
+        """parse_lines 需要重新分词的行范围 [first, new_end)，以及对应的旧行范围结束位置 old_end。"""
+        first = min(dirty_head, len(self.lines), len(new_lines))
+        tail = min(dirty_tail, len(self.lines) - first, len(new_lines) - first)
+        return first, len(self.lines) - tail, len(new_lines) - tail
+
+    def parse_lines(self, new_lines, dirty_head=0, dirty_tail=0, span_tokens=None):
+        """
+        解析文本行，并重用已有节点（城市按名称，中继按位置）。
+        dirty_head、dirty_tail 为自上次解析以来开头、末尾未变动的行数，
+        只重新分词中间变动过的行，未变动行中的节点原样保留。
+        span_tokens 为已经（例如在后台线程中）对 dirty_span 范围内各行分词的结果，省略时在此分词。
+        返回撤销本次解析用的 SpanEdit（见 apply_span_edit）。
+        同时严格按规则分配ID：
+          - 城市从左到右、从上到下依次编号（1,2,3...）
+          - 中继从城市最大ID+1开始编号
+        """
+        first, old_end, new_end = self.dirty_span(new_lines, dirty_head, dirty_tail)
+        if span_tokens is None:
+            span_tokens = self.tokenizer.tokenize_lines(new_lines[first:new_end])
+        old_nodes = self._span_nodes(first, old_end)
+        undo_edit = self._span_edit(first, old_end, new_end, old_nodes)
+
+        # 变动范围内的旧节点先移出索引，解析完成后再按新的ID、坐标加入
+        for node in old_nodes:
+            self.node_index.remove(node)
+
+        # 构造变动范围内旧节点的映射以便复用
+        old_city_mapping = {}
+        old_relay_mapping = {}
+        for node in old_nodes:
+            if isinstance(node, CityNode):
+                old_city_mapping.setdefault(node.name, []).append(node)
+            elif isinstance(node, RelayNode) and getattr(node, 'position', None) is not None:
+                old_relay_mapping[node.position] = node
+
+        # 只处理变动范围内的行
+        span_entries = []
+        span_cities: list[MapNode] = []
+        span_relays: list[MapNode] = []
+        span_city_counts = []
+        span_relay_counts = []
+        for line_index, line_tokens in zip(range(first, new_end), span_tokens):
+            line = new_lines[line_index]
+            line_entries = []
+            city_count = len(span_cities)
+            relay_count = len(span_relays)
+            last_end = 0
+            for is_city, start_index, end_index in self.tokenizer.iter_tokens(line, line_tokens):
+                if start_index > last_end:
+                    # 文本部分
+                    text_part = line[last_end:start_index]
+                    line_entries.append(('text', text_part))
+                token = line[start_index:end_index]
+                if is_city:  # 城市
+                    # 尝试复用同名城市节点
+                    if token in old_city_mapping and old_city_mapping[token]:
+                        node_obj = old_city_mapping[token].pop(0)
+                    else:
+                        node_obj = CityNode(token)
+                    node_obj.name = token.strip()
+                    if not node_obj.full_name:
+                        node_obj.full_name = node_obj.name
+                    node_obj.position = (line_index, start_index)
+                    line_entries.append(('city', node_obj))
+                    span_cities.append(node_obj)
+                else:  # 中继
+                    pos_key = (line_index, start_index)
+                    if pos_key in old_relay_mapping:
+                        node_obj = old_relay_mapping[pos_key]
+                    else:
+                        # 各种中继符号的节点都以 ◇ 为名称（默认名称、导出均按 ◇ 处理）
+                        node_obj = RelayNode("◇", position=pos_key)
+                    line_entries.append(('relay', node_obj))
+                    span_relays.append(node_obj)
+                last_end = end_index
+            if last_end < len(line):
+                line_entries.append(('text', line[last_end:]))
+            span_entries.append(line_entries)
+            span_city_counts.append(len(span_cities) - city_count)
+            span_relay_counts.append(len(span_relays) - relay_count)
+
+        self._replace_span(first, old_end, new_end, new_lines, span_entries,
+                           span_city_counts, span_relay_counts, span_cities, span_relays, old_nodes)
+        return undo_edit
+
+    def _span_nodes(self, first, end) -> list[MapNode]:
+        return [entry[1] for line_entries in self.nodes_by_line[first:end]
+                for entry in line_entries if entry[0] != 'text']
+
+    def _span_edit(self, first, old_end, new_end, old_nodes) -> 'SpanEdit':
+        """把 [first, new_end) 行恢复为当前 [first, old_end) 行的内容所需的数据（在替换之前调用）。"""
+        return SpanEdit(first, new_end - first, self.lines[first:old_end], self.nodes_by_line[first:old_end],
+                        self.line_city_counts[first:old_end], self.line_relay_counts[first:old_end],
+                        [node.position for node in old_nodes])
+
+    def apply_span_edit(self, edit: 'SpanEdit') -> 'SpanEdit':
+        """
+        把一段行整体换成 edit 中记录的行和节点（用于撤销、重做解析），返回反向的 SpanEdit。
+        耗时与这段行中的节点数、其后需要重新编号和平移的节点数成正比，与 parse_lines 相同。
+        """
+        first = edit.first
+        old_end = first + edit.line_count
+        new_end = first + len(edit.lines)
+        old_nodes = self._span_nodes(first, old_end)
+        undo_edit = self._span_edit(first, old_end, new_end, old_nodes)
+        for node in old_nodes:
+            self.node_index.remove(node)
+
+        span_nodes = [entry[1] for line_entries in edit.entries for entry in line_entries if entry[0] != 'text']
+        for node, position in zip(span_nodes, edit.positions):
+            node.position = position
+        span_cities = [node for node in span_nodes if isinstance(node, CityNode)]
+        span_relays = [node for node in span_nodes if not isinstance(node, CityNode)]
+        new_lines = self.lines[:first] + edit.lines + self.lines[old_end:]
+        self._replace_span(first, old_end, new_end, new_lines, edit.entries,
+                           edit.city_counts, edit.relay_counts, span_cities, span_relays, old_nodes)
+        return undo_edit
+
+    def _replace_span(self, first, old_end, new_end, new_lines, span_entries,
+                      span_city_counts, span_relay_counts, span_cities, span_relays, old_nodes):
+        """
+        用新的一段行替换 [first, old_end) 行：旧节点已移出索引，新节点的坐标已经确定。
+        维护 all_nodes 的顺序和ID、其后各行节点的坐标、索引，以及被删除、恢复的节点的连接。
+        """
+        # all_nodes 中城市在前、中继在后，均按从上到下的顺序排列，因此第 i 个节点的ID恒为 i+1。
+        # 变动范围内的节点在 all_nodes 中各占一段连续区间，直接替换即可。
+        cities_before = sum(self.line_city_counts[:first])
+        relays_before = sum(self.line_relay_counts[:first])
+        old_span_cities = sum(self.line_city_counts[first:old_end])
+        old_span_relays = sum(self.line_relay_counts[first:old_end])
+
+        self.all_nodes[cities_before:cities_before + old_span_cities] = span_cities
+        city_total = self.max_city_id - old_span_cities + len(span_cities)
+        relay_start = city_total + relays_before
+        self.all_nodes[relay_start:relay_start + old_span_relays] = span_relays
+
+        # 重新分配ID：只有城市或中继数量变化时才需要为其后的节点重新编号
+        if len(span_cities) != old_span_cities:
+            self._renumber_nodes(cities_before, len(self.all_nodes))
+        elif len(span_relays) != old_span_relays:
+            self._renumber_nodes(cities_before, cities_before + len(span_cities))
+            self._renumber_nodes(relay_start, len(self.all_nodes))
+        else:
+            self._renumber_nodes(cities_before, cities_before + len(span_cities))
+            self._renumber_nodes(relay_start, relay_start + len(span_relays))
+
+        # 变动范围之后的行整体平移时，其中的节点随行移动，更新其坐标
+        line_delta = new_end - old_end
+        if line_delta:
+            shifted_nodes = (self.all_nodes[cities_before + len(span_cities):city_total]
+                             + self.all_nodes[relay_start + len(span_relays):])
+            for node in shifted_nodes:
+                old_position = node.position
+                node.position = (old_position[0] + line_delta, old_position[1])
+                self.node_index.update_position(node, old_position)
+
+        for node in span_cities:
+            self.node_index.add(node)
+        for node in span_relays:
+            self.node_index.add(node)
+
+        # 未被复用的旧节点已被删除，从其相邻节点的 connections 中移除；
+        # 撤销时重新出现的节点仍保留自己的 connections，把它加回相邻节点中
+        kept = set(span_cities)
+        kept.update(span_relays)
+        for node in old_nodes:
+            if node not in kept:
+                for conn in node.connections:
+                    conn.connections.discard(node)
+        old_node_set = set(old_nodes)
+        for node in kept:
+            if node not in old_node_set:
+                for conn in node.connections:
+                    conn.connections.add(node)
+
+        # 更新数据结构
+        self.lines = new_lines
+        self.nodes_by_line[first:old_end] = span_entries
+        self.line_city_counts[first:old_end] = span_city_counts
+        self.line_relay_counts[first:old_end] = span_relay_counts
+        self.max_city_id = city_total
+        self.validator.invalidate()
+
+    def _renumber_nodes(self, start, stop):
+        for index in range(start, stop):
+            node = self.all_nodes[index]
+            if node.node_id != index + 1:
+                old_id = node.node_id
+                node.node_id = index + 1
+                self.node_index.update_id(node, old_id)
+
+    #
+    # 修改节点：连接关系、全名
+    #
+    def toggle_connection(self, node: MapNode, other: MapNode) -> bool:
+        """建立或取消两个节点之间的连接，返回切换后是否相连。"""
+        if other in node.connections:
+            node.connections.remove(other)
+            other.connections.remove(node)
+            self.validator.connection_toggled(node, other, False)
+            return False
+        node.connections.add(other)
+        other.connections.add(node)
+        # 中继点的默认名称在首次有两个相邻城市时自动变化
+        for relay_node in (node, other):
+            if isinstance(relay_node, RelayNode):
+                old_full_name = relay_node.full_name
+                relay_node.update_full_name_if_two_cities()
+                self.node_index.update_full_name(relay_node, old_full_name)
+                if relay_node.full_name != old_full_name:
+                    self.validator.full_name_changed(relay_node, old_full_name)
+        self.validator.connection_toggled(node, other, True)
+        return True
+
+    def set_full_name(self, node: MapNode, full_name: str):
+        old_full_name = node.full_name
+        node.full_name = full_name
+        self.node_index.update_full_name(node, old_full_name)
+        self.validator.full_name_changed(node, old_full_name)
+
+    #
+    # 紧凑存储
+    #
+    def compact(self):
+        """
+        把 all_nodes 换成列式存储 NodeStore，nodes_by_line 和索引中的节点换成对应的视图，
+        释放原节点对象及其 connections 集合。用于导出、统计等只读取地图结构的批量处理，
+        压缩后仍可修改节点属性和连接关系，但不能再调用 parse_lines。
+        """
+        store = NodeStore.from_nodes(self.all_nodes)
+        views = {node: store[index] for index, node in enumerate(self.all_nodes)}
+        self.nodes_by_line = [[entry if entry[0] == 'text' else (entry[0], views[entry[1]])
+                               for entry in line_entries]
+                              for line_entries in self.nodes_by_line]
+        self.all_nodes = store
+        self.node_index.rebuild(store)
+        self.validator.invalidate()
+
+    #
+    # 导出前检查
+    #
+    def default_relay_warnings(self) -> list[str]:
+        """名称仍为菱形（默认名称）的中继点。"""
+        return self.validator.messages((DEFAULT_RELAY,))
@@ -6,6 +6,9 @@
 
 class MapNode:
     """任意节点（城市或中继）的基类。"""
+    # 大地图上节点数以万计，不为每个节点分配 __dict__
+    __slots__ = ('name', 'full_name', 'economy', 'guard', 'node_id', 'connections', 'position')
+
     def __init__(self, name: str, position=None):
         self.name = name.strip()
         self.full_name = self.name
@@ -14,13 +17,22 @@ class MapNode:
         self.node_id = 0
         self.connections = set()
         self.position = position  # (行号, 列号)
+
+    def tooltip_text(self) -> str:
+        """地图上悬浮提示的文本。"""
+        return (f"名称: {self.name}\n"
+                f"全名: {self.full_name}\n"
+                f"经济: {self.economy}\n"
+                f"防御: {self.guard}\n"
+                f"相邻: {', '.join(n.name for n in self.connections)}")
+
     def __repr__(self):
         return f"{self.__class__.__name__}(id={self.node_id}, name='{self.name}')"
 
 
 class CityNode(MapNode):
     """城市节点。"""
-    pass
+    __slots__ = ()
 
 
 class RelayNode(MapNode):
@@ -28,6 +40,8 @@ class RelayNode(MapNode):
     中继节点，用于存储中继序号，并显示特殊的符号（例如 '◇'）。
     增加了 position 属性，用于记录所在行和起始列。
     """
+    __slots__ = ()
+
     def __init__(self, name: str, position=None):
         super().__init__(name,position)
 
@@ -0,0 +1,80 @@
+#
+# ------------------------------------------------------------------
+#  节点索引：按 ID、全名、坐标 O(1) 查找节点
+# ------------------------------------------------------------------
+#
+
+class NodeIndex:
+    """
+    node_id -> 节点、full_name -> 节点、position -> 节点 三个映射。
+    全名允许重复（导出前才要求唯一），因此全名映射到按加入顺序排列的节点字典 {节点: None}，
+    默认名称的中继数量很多，增删时不需要在列表中查找。
+    """
+    def __init__(self):
+        self.by_id = {}
+        self.by_full_name = {}
+        self.by_position = {}
+
+    def clear(self):
+        self.by_id.clear()
+        self.by_full_name.clear()
+        self.by_position.clear()
+
+    def rebuild(self, nodes):
+        self.clear()
+        for node in nodes:
+            self.add(node)
+
+    def add(self, node):
+        self.by_id[node.node_id] = node
+        self.by_full_name.setdefault(node.full_name, {})[node] = None
+        if node.position is not None:
+            self.by_position[node.position] = node
+
+    def remove(self, node):
+        if self.by_id.get(node.node_id) is node:
+            del self.by_id[node.node_id]
+        self._remove_full_name(node, node.full_name)
+        if node.position is not None and self.by_position.get(node.position) is node:
+            del self.by_position[node.position]
+
+    #
+    # 节点属性变化后调用，参数为变化前的值
+    #
+    def update_id(self, node, old_id):
+        if self.by_id.get(old_id) is node:
+            del self.by_id[old_id]
+        self.by_id[node.node_id] = node
+
+    def update_full_name(self, node, old_full_name):
+        if old_full_name == node.full_name:
+            return
+        self._remove_full_name(node, old_full_name)
+        self.by_full_name.setdefault(node.full_name, {})[node] = None
+
+    def update_position(self, node, old_position):
+        if old_position is not None and self.by_position.get(old_position) is node:
+            del self.by_position[old_position]
+        if node.position is not None:
+            self.by_position[node.position] = node
+
+    def _remove_full_name(self, node, full_name):
+        same_name = self.by_full_name.get(full_name)
+        if same_name and node in same_name:
+            del same_name[node]
+            if not same_name:
+                del self.by_full_name[full_name]
+
+    #
+    # 查找
+    #
+    def get_by_id(self, node_id):
+        return self.by_id.get(node_id)
+
+    def get_by_full_name(self, full_name):
+        # 重名时返回最后加入的节点，与按ID顺序导入时后者覆盖前者一致
+        same_name = self.by_full_name.get(full_name)
+        return next(reversed(same_name)) if same_name else None
+
+    def get_by_position(self, position):
+        return self.by_position.get(position)
@@ -0,0 +1,211 @@
+from array import array
+from collections.abc import MutableSet
+
+from node import CityNode, RelayNode
+#
+# ------------------------------------------------------------------
+#  列式节点存储：节点属性存放在平行数组中，相邻关系用 CSR 表示
+#  节点由轻量视图代替，视图与 CityNode/RelayNode 接口相同，现有代码无需修改
+# ------------------------------------------------------------------
+#
+
+NO_POSITION = -1  # lines/columns 中表示 position 为 None
+
+
+class NodeStore:
+    """
+    第 i 个节点的属性分别存放在各列的第 i 项；
+    节点 i 的相邻节点为 targets[offsets[i]:offsets[i+1]]（按下标升序）。
+    增删连接需要移动其后的全部数据，适合导出、统计等连接关系基本不变的批量处理。
+    """
+    def __init__(self):
+        self.is_city = array('b')
+        self.node_ids = array('l')
+        self.economies = array('q')
+        self.guards = array('q')
+        self.lines = array('l')
+        self.columns = array('l')
+        self.names = []
+        self.full_names = []
+        self.offsets = array('l', [0])
+        self.targets = array('l')
+        self._views = []
+
+    @classmethod
+    def from_nodes(cls, nodes) -> "NodeStore":
+        store = cls()
+        nodes = list(nodes)
+        node_indices = {node: index for index, node in enumerate(nodes)}
+        for node in nodes:
+            store.is_city.append(isinstance(node, CityNode))
+            store.node_ids.append(node.node_id)
+            store.economies.append(node.economy)
+            store.guards.append(node.guard)
+            line, column = node.position if node.position is not None else (NO_POSITION, NO_POSITION)
+            store.lines.append(line)
+            store.columns.append(column)
+            store.names.append(node.name)
+            store.full_names.append(node.full_name)
+            # 只保留同在 nodes 中的相邻节点
+            store.targets.extend(sorted(node_indices[c] for c in node.connections if c in node_indices))
+            store.offsets.append(len(store.targets))
+        store._views = [None] * len(nodes)
+        return store
+
+    def __len__(self):
+        return len(self.node_ids)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        # 同一节点始终返回同一个视图对象，索引中基于 is 的比较因此仍然成立
+        view = self._views[index]
+        if view is None:
+            view_class = CityNodeView if self.is_city[index] else RelayNodeView
+            view = self._views[index] = view_class(self, index)
+        return view
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    #
+    # 相邻关系
+    #
+    def neighbors(self, index):
+        return self.targets[self.offsets[index]:self.offsets[index + 1]]
+
+    def _find_edge(self, index, other_index):
+        for k in range(self.offsets[index], self.offsets[index + 1]):
+            if self.targets[k] == other_index:
+                return k
+        return -1
+
+    def add_edge(self, index, other_index):
+        """添加一条 index -> other_index 的连接（与 MapNode.connections 相同，只记录单向）。"""
+        if self._find_edge(index, other_index) >= 0:
+            return
+        k = self.offsets[index]
+        while k < self.offsets[index + 1] and self.targets[k] < other_index:
+            k += 1
+        self.targets.insert(k, other_index)
+        for i in range(index + 1, len(self.offsets)):
+            self.offsets[i] += 1
+
+    def remove_edge(self, index, other_index) -> bool:
+        k = self._find_edge(index, other_index)
+        if k < 0:
+            return False
+        del self.targets[k]
+        for i in range(index + 1, len(self.offsets)):
+            self.offsets[i] -= 1
+        return True
+
+
+class ConnectionsView(MutableSet):
+    """NodeStore 中某个节点的相邻节点集合，行为与 MapNode.connections（set）相同。"""
+    __slots__ = ('store', 'index')
+
+    def __init__(self, store: NodeStore, index):
+        self.store = store
+        self.index = index
+
+    def _index_of(self, node):
+        if isinstance(node, NodeView) and node.store is self.store:
+            return node.index
+        return -1
+
+    def __contains__(self, node):
+        other_index = self._index_of(node)
+        return other_index >= 0 and self.store._find_edge(self.index, other_index) >= 0
+
+    def __iter__(self):
+        store = self.store
+        for other_index in store.neighbors(self.index):
+            yield store[other_index]
+
+    def __len__(self):
+        return self.store.offsets[self.index + 1] - self.store.offsets[self.index]
+
+    def add(self, node):
+        other_index = self._index_of(node)
+        if other_index < 0:
+            raise ValueError(f"{node!r} 不在同一个 NodeStore 中")
+        self.store.add_edge(self.index, other_index)
+
+    def discard(self, node):
+        other_index = self._index_of(node)
+        if other_index >= 0:
+            self.store.remove_edge(self.index, other_index)
+
+    def copy(self) -> set:
+        return set(self)
+
+    def __repr__(self):
+        return f"{{{', '.join(repr(node) for node in self)}}}"
+
+
+def _column_property(column_name):
+    def fget(self):
+        return getattr(self.store, column_name)[self.index]
+
+    def fset(self, value):
+        getattr(self.store, column_name)[self.index] = value
+    return property(fget, fset)
+
+
+class NodeView:
+    """
+    NodeStore 中一个节点的视图：读写属性即读写对应的列。
+    视图按 (store, 下标) 判断相等，可以放入集合、用作字典键。
+    """
+    __slots__ = ()
+
+    name = _column_property('names')
+    full_name = _column_property('full_names')
+    economy = _column_property('economies')
+    guard = _column_property('guards')
+    node_id = _column_property('node_ids')
+
+    @property
+    def position(self):
+        line = self.store.lines[self.index]
+        return None if line == NO_POSITION else (line, self.store.columns[self.index])
+
+    @position.setter
+    def position(self, value):
+        line, column = value if value is not None else (NO_POSITION, NO_POSITION)
+        self.store.lines[self.index] = line
+        self.store.columns[self.index] = column
+
+    @property
+    def connections(self) -> ConnectionsView:
+        return ConnectionsView(self.store, self.index)
+
+    def __eq__(self, other):
+        if isinstance(other, NodeView):
+            return other.store is self.store and other.index == self.index
+        return NotImplemented
+
+    def __hash__(self):
+        return hash((id(self.store), self.index))
+
+
+# 同时继承 CityNode/RelayNode，isinstance 判断和 tooltip_text 等方法照常可用；
+# 父类中的数据槽位不再使用，属性由 NodeView 中的同名 property 代替
+class CityNodeView(NodeView, CityNode):
+    __slots__ = ('store', 'index')
+
+    def __init__(self, store: NodeStore, index):
+        self.store = store
+        self.index = index
+
+
+class RelayNodeView(NodeView, RelayNode):
+    __slots__ = ('store', 'index')
+
+    def __init__(self, store: NodeStore, index):
+        self.store = store
+        self.index = index
@@ -0,0 +1,75 @@
+from PySide6.QtCore import QObject, QRunnable, QThreadPool, Signal
+#
+# ------------------------------------------------------------------
+#  后台任务：在工作线程中分词、生成HTML、导入导出文件，结果和进度通过信号回到界面线程
+#  每种任务有一个代号，新的请求使同种类的旧任务失效，旧任务的结果被丢弃
+# ------------------------------------------------------------------
+#
+
+class _Job(QRunnable):
+    def __init__(self, worker, kind, generation, func, with_progress):
+        super().__init__()
+        self.worker = worker
+        self.kind = kind
+        self.generation = generation
+        self.func = func
+        self.with_progress = with_progress
+        self.percent = -1
+
+    def run(self):
+        def is_cancelled():
+            return not self.worker.is_current(self.kind, self.generation)
+
+        def report(done, total):
+            # 百分比变化时才发出信号
+            percent = min(100, done * 100 // total) if total > 0 else 0
+            if percent != self.percent:
+                self.percent = percent
+                self.worker.progress.emit(self.kind, self.generation, percent)
+
+        if is_cancelled():
+            return
+        try:
+            result = self.func(is_cancelled, report) if self.with_progress else self.func(is_cancelled)
+        except Exception as e:
+            self.worker.failed.emit(self.kind, self.generation, f"{type(e).__name__}: {e}")
+            return
+        if result is not None and not is_cancelled():
+            self.worker.finished.emit(self.kind, self.generation, result)
+
+
+class BackgroundWorker(QObject):
+    """
+    submit(kind, func) 在工作线程中执行 func(is_cancelled)，返回本次任务的代号。
+    func 返回 None 表示已中止；完成后发出 finished(kind, 代号, 结果)，出错时发出 failed(kind, 代号, 错误信息)。
+    with_progress 时执行 func(is_cancelled, report)，report(已完成, 总数) 在百分比变化时发出 progress(kind, 代号, 百分比)。
+    接收方应再用 is_current 确认结果没有过期：任务完成到信号送达之间可能又有新的请求。
+    """
+    finished = Signal(str, int, object)
+    failed = Signal(str, int, str)
+    progress = Signal(str, int, int)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._generations = {}
+        # 单个工作线程：任务按提交顺序执行，过期的任务开始前即被跳过
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(1)
+
+    def submit(self, kind, func, with_progress=False) -> int:
+        generation = self.cancel(kind)
+        self.pool.start(_Job(self, kind, generation, func, with_progress))
+        return generation
+
+    def cancel(self, kind) -> int:
+        """使 kind 类的任务全部失效，返回新的代号。"""
+        generation = self._generations.get(kind, 0) + 1
+        self._generations[kind] = generation
+        return generation
+
+    def is_current(self, kind, generation) -> bool:
+        return self._generations.get(kind) == generation
+
+    def wait(self, msecs=-1) -> bool:
+        """等待已提交的任务全部结束（不处理其结果信号）。"""
+        return self.pool.waitForDone(msecs)
@@ -0,0 +1,155 @@
+import functools
+import os
+import threading
+import time
+#
+# ------------------------------------------------------------------
+#  性能记录：关键操作各阶段的耗时和计数，常驻开启（每次记录只有两次计时和几次字典操作）
+#  设置环境变量 TK_MAP_PROFILE=文件（或启动参数 --profile 文件）时，另外把整个会话记录到文件：
+#  以 .json 结尾时写出 Chrome trace（chrome://tracing、Perfetto 可打开），否则写出 cProfile 统计
+# ------------------------------------------------------------------
+#
+
+PROFILE_ENV = "TK_MAP_PROFILE"
+
+# 阶段名 -> 状态栏中显示的名称，按显示顺序排列
+STAGE_LABELS = {
+    "parse": "解析",
+    "render": "渲染",
+    "build_html": "生成HTML",
+    "set_html": "setHtml",
+    "click": "点击",
+    "import": "导入",
+    "export": "导出",
+    "switch": "切换地图",
+    "bulk": "批量修改",
+}
+
+# 计数器名 -> 显示名称
+COUNTER_LABELS = {
+    "nodes": "节点",
+    "html_bytes": "HTML",
+    "renders": "渲染次数",
+}
+
+
+class _Stage:
+    __slots__ = ('profiler', 'name', 'start')
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.profiler.record(self.name, self.start, time.perf_counter_ns())
+
+
+class Profiler:
+    """
+    with profiler.stage(名称): ... 记录一次耗时；count / set_counter 修改计数器。
+    可以在后台线程中记录（修改记录时加锁）。revision 在有新记录时递增，显示方据此判断是否需要刷新。
+    """
+    def __init__(self):
+        self.last = {}       # 阶段名 -> 最近一次耗时（纳秒）
+        self.totals = {}     # 阶段名 -> [次数, 总耗时（纳秒）]
+        self.counters = {}
+        self.revision = 0
+        self.trace_events = None  # 记录 Chrome trace 时为事件列表
+        self._cprofile = None
+        self._output_file = None
+        self._lock = threading.Lock()  # 界面线程与后台线程同时记录时保护累加
+
+    def stage(self, name) -> _Stage:
+        return _Stage(self, name)
+
+    def timed(self, name):
+        """把整个函数（方法）作为一个阶段计时的装饰器。"""
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.stage(name):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def record(self, name, start_ns, end_ns):
+        duration = end_ns - start_ns
+        with self._lock:
+            self.last[name] = duration
+            total = self.totals.get(name)
+            if total is None:
+                self.totals[name] = [1, duration]
+            else:
+                total[0] += 1
+                total[1] += duration
+            self.revision += 1
+            if self.trace_events is not None:
+                self.trace_events.append({"name": name, "ph": "X", "ts": start_ns / 1000, "dur": duration / 1000,
+                                          "pid": os.getpid(), "tid": threading.get_ident()})
+
+    def count(self, name, amount=1):
+        with self._lock:
+            self._set_counter(name, self.counters.get(name, 0) + amount)
+
+    def set_counter(self, name, value):
+        with self._lock:
+            self._set_counter(name, value)
+
+    def _set_counter(self, name, value):
+        self.counters[name] = value
+        self.revision += 1
+        if self.trace_events is not None:
+            self.trace_events.append({"name": name, "ph": "C", "ts": time.perf_counter_ns() / 1000,
+                                      "pid": os.getpid(), "args": {name: value}})
+
+    def summary(self) -> str:
+        """状态栏中的一行：各阶段最近一次的耗时和计数器。"""
+        parts = [f"{label} {self.last[name] / 1e6:.1f} ms" for name, label in STAGE_LABELS.items()
+                 if name in self.last]
+        for name, label in COUNTER_LABELS.items():
+            if name in self.counters:
+                value = self.counters[name]
+                parts.append(f"{label} {value / 1024:.0f} KiB" if name == "html_bytes" else f"{label} {value}")
+        return " | ".join(parts)
+
+    #
+    # 会话记录
+    #
+    def start_session(self, output_file):
+        self._output_file = output_file
+        if output_file.lower().endswith(".json"):
+            self.trace_events = []
+        else:
+            # cProfile 只统计调用 enable 的线程（界面线程）；只在记录会话时才导入
+            import cProfile
+            self._cprofile = cProfile.Profile()
+            self._cprofile.enable()
+
+    def stop_session(self):
+        """写出会话记录；没有开始记录时什么也不做。"""
+        if self._output_file is None:
+            return
+        if self._cprofile is not None:
+            self._cprofile.disable()
+            self._cprofile.dump_stats(self._output_file)
+            self._cprofile = None
+        else:
+            import json
+            with self._lock:
+                trace_events, self.trace_events = self.trace_events, None
+            with open(self._output_file, "w", encoding="utf-8") as f:
+                json.dump({"traceEvents": trace_events, "displayTimeUnit": "ms"}, f)
+        self._output_file = None
+
+    def start_session_from_env(self, output_file=None):
+        """output_file 省略时使用环境变量 TK_MAP_PROFILE，两者都没有时不记录。"""
+        output_file = output_file or os.environ.get(PROFILE_ENV)
+        if output_file:
+            self.start_session(output_file)
+
+
+profiler = Profiler()
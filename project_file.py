@@ -0,0 +1,349 @@
+import mmap
+import struct
+from array import array
+from collections.abc import Sequence
+
+from atomic_file import AtomicWriter
+from model import MapModel
+from node import CityNode, RelayNode
+from node_index import NodeIndex
+from node_store import NodeStore
+#
+# ------------------------------------------------------------------
+#  地图项目文件（.tkmap）：按列存放的二进制格式，无损保存地图文本、节点属性、坐标和连接
+#  打开时用 mmap 映射文件，数值列直接指向文件内容，字符串在读取时才解码
+# ------------------------------------------------------------------
+#
+#  文件结构（小端）：
+#    文件头      MAGIC, 版本, 行数, 节点数, 城市数, 段数
+#    段表        每段 (偏移, 长度)，顺序与 SECTIONS 相同
+#    各段内容    按 8 字节对齐
+#  节点按 all_nodes 的顺序（城市在前、中继在后）存放，第 i 个节点的ID为 i+1；
+#  连接以 CSR 形式存放：节点 i 的相邻节点为 edge_targets[edge_offsets[i]:edge_offsets[i+1]]。
+#
+
+PROJECT_SUFFIX = ".tkmap"
+MAGIC = b"TKMAP\0\0\0"
+VERSION = 1
+
+HEADER = struct.Struct("<8sIIIII")  # MAGIC, 版本, 行数, 节点数, 城市数, 段数
+SECTION = struct.Struct("<QQ")      # 偏移, 长度
+ALIGNMENT = 8
+
+# 段名 -> array 类型码（None 为 UTF-8 字节串）
+SECTIONS = {
+    'text': None,                  # 地图文本，各行以换行符连接
+    'line_city_counts': 'q',       # 每行中的城市数量
+    'line_relay_counts': 'q',      # 每行中的中继数量
+    'line_node_offsets': 'q',      # 第 l 行的节点为 line_nodes[line_node_offsets[l]:line_node_offsets[l+1]]
+    'line_nodes': 'q',             # 按行、从左到右排列的节点下标
+    'is_city': 'b',
+    'economies': 'q',
+    'guards': 'q',
+    'lines': 'q',                  # 节点所在行
+    'columns': 'q',                # 节点起始列
+    'name_offsets': 'q',           # 第 i 个名称为 names[name_offsets[i]:name_offsets[i+1]]
+    'names': None,
+    'full_name_offsets': 'q',
+    'full_names': None,
+    'edge_offsets': 'q',
+    'edge_targets': 'q',
+}
+
+
+class ProjectFileError(ValueError):
+    """不是地图项目文件，或版本不受支持。"""
+
+
+#
+# 保存
+#
+def _encode_strings(strings):
+    encoded = [string.encode("utf-8") for string in strings]
+    offsets = array('q', [0])
+    total = 0
+    for data in encoded:
+        total += len(data)
+        offsets.append(total)
+    return offsets.tobytes(), b"".join(encoded)
+
+
+def project_sections(model: MapModel) -> dict[str, bytes]:
+    """模型各段的字节内容。"""
+    nodes = list(model.all_nodes)
+    index_of = {node: index for index, node in enumerate(nodes)}
+
+    line_node_offsets = array('q', [0])
+    line_nodes = array('q')
+    for line_entries in model.nodes_by_line:
+        line_nodes.extend(index_of[entry[1]] for entry in line_entries if entry[0] != 'text')
+        line_node_offsets.append(len(line_nodes))
+
+    edge_offsets = array('q', [0])
+    edge_targets = array('q')
+    for node in nodes:
+        edge_targets.extend(sorted(index_of[conn] for conn in node.connections if conn in index_of))
+        edge_offsets.append(len(edge_targets))
+
+    name_offsets, names = _encode_strings(node.name for node in nodes)
+    full_name_offsets, full_names = _encode_strings(node.full_name for node in nodes)
+    return {
+        'text': "\n".join(model.lines).encode("utf-8"),
+        'line_city_counts': array('q', model.line_city_counts).tobytes(),
+        'line_relay_counts': array('q', model.line_relay_counts).tobytes(),
+        'line_node_offsets': line_node_offsets.tobytes(),
+        'line_nodes': line_nodes.tobytes(),
+        'is_city': array('b', (isinstance(node, CityNode) for node in nodes)).tobytes(),
+        'economies': array('q', (node.economy for node in nodes)).tobytes(),
+        'guards': array('q', (node.guard for node in nodes)).tobytes(),
+        'lines': array('q', (node.position[0] for node in nodes)).tobytes(),
+        'columns': array('q', (node.position[1] for node in nodes)).tobytes(),
+        'name_offsets': name_offsets,
+        'names': names,
+        'full_name_offsets': full_name_offsets,
+        'full_names': full_names,
+        'edge_offsets': edge_offsets.tobytes(),
+        'edge_targets': edge_targets.tobytes(),
+    }
+
+
+def save_project(model: MapModel, file_name):
+    sections = project_sections(model)
+    offset = HEADER.size + SECTION.size * len(SECTIONS)
+    table = []
+    for name in SECTIONS:
+        offset += -offset % ALIGNMENT
+        table.append((offset, len(sections[name])))
+        offset += len(sections[name])
+
+    # 先写入临时文件再替换：正在以 mmap 打开的同一个项目文件不会被截断
+    with AtomicWriter(file_name, "wb") as file:
+        file.write(HEADER.pack(MAGIC, VERSION, len(model.lines), len(model.all_nodes),
+                               model.max_city_id, len(SECTIONS)))
+        for section_offset, length in table:
+            file.write(SECTION.pack(section_offset, length))
+        for name, (section_offset, _) in zip(SECTIONS, table):
+            file.write(b"\0" * (section_offset - file.tell()))
+            file.write(sections[name])
+
+
+#
+# 打开
+#
+class ProjectFile:
+    """
+    用 mmap 打开的项目文件。sections 中的数值段为直接指向文件内容的 memoryview（写时复制，修改不影响文件），
+    name(i) / full_name(i) 只解码需要的一个字符串。关闭前，由 to_model(lazy=True) 得到的模型仍在使用本文件。
+    """
+    def __init__(self, file_name):
+        with open(file_name, "rb") as file:
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_COPY)
+        view = memoryview(self._mmap)
+        self._views = [view]
+        if len(view) < HEADER.size:
+            self.close()
+            raise ProjectFileError(f"{file_name} 不是地图项目文件")
+        magic, version, self.line_count, self.node_count, self.city_count, section_count = HEADER.unpack_from(view)
+        if magic != MAGIC or version != VERSION or section_count != len(SECTIONS):
+            self.close()
+            raise ProjectFileError(f"{file_name} 不是地图项目文件，或版本不受支持")
+
+        self.sections = {}
+        for index, (name, typecode) in enumerate(SECTIONS.items()):
+            offset, length = SECTION.unpack_from(view, HEADER.size + SECTION.size * index)
+            section = view[offset:offset + length]
+            if typecode is not None:
+                section = section.cast(typecode)
+            self._views.append(section)
+            self.sections[name] = section
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        # mmap 关闭前必须先释放指向它的 memoryview
+        for view in reversed(self._views):
+            view.release()
+        self._views = []
+        self._mmap.close()
+
+    def _string(self, offsets_name, blob_name, index) -> str:
+        offsets = self.sections[offsets_name]
+        return bytes(self.sections[blob_name][offsets[index]:offsets[index + 1]]).decode("utf-8")
+
+    def name(self, index) -> str:
+        return self._string('name_offsets', 'names', index)
+
+    def full_name(self, index) -> str:
+        return self._string('full_name_offsets', 'full_names', index)
+
+    def _strings(self, offsets_name, blob_name) -> list[str]:
+        offsets = self.sections[offsets_name].tolist()
+        blob = bytes(self.sections[blob_name])
+        return [blob[start:end].decode("utf-8") for start, end in zip(offsets, offsets[1:])]
+
+    def map_lines(self) -> list[str]:
+        return bytes(self.sections['text']).decode("utf-8").split("\n")
+
+    def to_model(self, lazy=False) -> MapModel:
+        """
+        lazy=False：解码为普通节点，之后可以照常编辑、重新解析（图形界面打开项目）。
+        lazy=True：节点为 NodeStore 视图，数值列直接使用映射的文件内容，名称、每行的节点在读取时才解码，
+                   与 MapModel.compact() 之后相同，不能再调用 parse_lines（命令行导出、统计）。
+        """
+        return self._store_model() if lazy else self._node_model()
+
+    def _node_model(self) -> MapModel:
+        s = self.sections
+        lines = self.map_lines()
+        names = self._strings('name_offsets', 'names')
+        full_names = self._strings('full_name_offsets', 'full_names')
+        nodes = []
+        for is_city, name, full_name, economy, guard, line, column in zip(
+                s['is_city'].tolist(), names, full_names, s['economies'].tolist(), s['guards'].tolist(),
+                s['lines'].tolist(), s['columns'].tolist()):
+            node = (CityNode if is_city else RelayNode)(name, (line, column))
+            node.full_name = full_name
+            node.economy = economy
+            node.guard = guard
+            nodes.append(node)
+        edge_offsets = s['edge_offsets'].tolist()
+        edge_targets = s['edge_targets'].tolist()
+        for index, node in enumerate(nodes):
+            node.node_id = index + 1
+            node.connections = {nodes[target] for target in edge_targets[edge_offsets[index]:edge_offsets[index + 1]]}
+
+        model = MapModel()
+        model.lines = lines
+        model.nodes_by_line = _line_entries(lines, nodes, s['line_node_offsets'].tolist(), s['line_nodes'].tolist())
+        model.line_city_counts = s['line_city_counts'].tolist()
+        model.line_relay_counts = s['line_relay_counts'].tolist()
+        model.all_nodes = nodes
+        model.max_city_id = self.city_count
+        model.node_index.rebuild(nodes)
+        return model
+
+    def _store_model(self) -> MapModel:
+        s = self.sections
+        store = NodeStore()
+        store.is_city = s['is_city']
+        store.node_ids = array('q', range(1, self.node_count + 1))
+        store.economies = s['economies']
+        store.guards = s['guards']
+        store.lines = s['lines']
+        store.columns = s['columns']
+        store.names = _StringColumn(self, 'name_offsets', 'names', self.node_count)
+        store.full_names = _StringColumn(self, 'full_name_offsets', 'full_names', self.node_count)
+        # 增删连接时需要插入、移动，复制为可变的数组
+        store.offsets = array('q', s['edge_offsets'])
+        store.targets = array('q', s['edge_targets'])
+        store._views = [None] * self.node_count
+
+        model = MapModel()
+        model.lines = self.map_lines()
+        model.nodes_by_line = _LazyNodesByLine(model.lines, store, s['line_node_offsets'], s['line_nodes'])
+        model.line_city_counts = s['line_city_counts'].tolist()
+        model.line_relay_counts = s['line_relay_counts'].tolist()
+        model.all_nodes = store
+        model.max_city_id = self.city_count
+        model.node_index = _LazyNodeIndex(store)
+        return model
+
+
+def _line_items(line, line_nodes):
+    """一行的 nodes_by_line 项：节点之间的文字，以及按起始列排列的节点。"""
+    entries = []
+    last_end = 0
+    for node in line_nodes:
+        start = node.position[1]
+        if start > last_end:
+            entries.append(('text', line[last_end:start]))
+        entries.append(('city' if isinstance(node, CityNode) else 'relay', node))
+        last_end = start + len(node.name)
+    if last_end < len(line):
+        entries.append(('text', line[last_end:]))
+    return entries
+
+
+def _line_entries(lines, nodes, line_node_offsets, line_nodes):
+    return [_line_items(line, [nodes[index] for index in line_nodes[start:end]])
+            for line, start, end in zip(lines, line_node_offsets, line_node_offsets[1:])]
+
+
+class _StringColumn:
+    """NodeStore 的名称列：读取时才从文件中解码，修改过的值单独保存。"""
+    def __init__(self, project: ProjectFile, offsets_name, blob_name, count):
+        self.project = project
+        self.offsets_name = offsets_name
+        self.blob_name = blob_name
+        self.count = count
+        self.changed = {}
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        if index in self.changed:
+            return self.changed[index]
+        return self.project._string(self.offsets_name, self.blob_name, index)
+
+    def __setitem__(self, index, value):
+        self.changed[index] = value
+
+
+class _LazyNodesByLine(Sequence):
+    """只读的 nodes_by_line：某一行第一次被读取时才生成其中的项。"""
+    def __init__(self, lines, store: NodeStore, line_node_offsets, line_nodes):
+        self.lines = lines
+        self.store = store
+        self.line_node_offsets = line_node_offsets
+        self.line_nodes = line_nodes
+        self._cache = {}
+
+    def __len__(self):
+        return len(self.lines)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        entries = self._cache.get(index)
+        if entries is None:
+            start, end = self.line_node_offsets[index], self.line_node_offsets[index + 1]
+            entries = _line_items(self.lines[index], [self.store[i] for i in self.line_nodes[start:end]])
+            self._cache[index] = entries
+        return entries
+
+
+class _LazyNodeIndex(NodeIndex):
+    """按ID查找直接取 NodeStore 中的第 id-1 个节点；第一次按全名、坐标查找时才遍历全部节点建立映射。"""
+    def __init__(self, store: NodeStore):
+        self.store = store
+
+    def __getattr__(self, name):
+        # by_id / by_full_name / by_position 尚未建立
+        if name not in ('by_id', 'by_full_name', 'by_position'):
+            raise AttributeError(name)
+        NodeIndex.__init__(self)
+        self.rebuild(self.store)
+        return getattr(self, name)
+
+    def get_by_id(self, node_id):
+        if 'by_id' in self.__dict__:
+            return super().get_by_id(node_id)
+        return self.store[node_id - 1] if 0 < node_id <= len(self.store) else None
+
+
+def load_project(file_name, lazy=False) -> MapModel:
+    """打开项目文件。lazy=True 时模型使用映射的文件，文件在模型不再使用后随之关闭。"""
+    project = ProjectFile(file_name)
+    if lazy:
+        return project.to_model(lazy=True)
+    try:
+        return project.to_model()
+    finally:
+        project.close()
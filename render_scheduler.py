@@ -0,0 +1,49 @@
+from PySide6.QtCore import QObject, QTimer
+#
+# ------------------------------------------------------------------
+#  渲染调度：合并同一轮事件循环中的多次渲染请求
+# ------------------------------------------------------------------
+#
+
+class RenderScheduler(QObject):
+    """
+    request() 只做标记，回到事件循环后最多调用一次 render_func。
+    render_func 返回 False 表示没有可见的变化、跳过了渲染。
+    requested / performed / skipped 分别为请求次数、实际渲染次数、跳过次数。
+    """
+    def __init__(self, render_func, parent=None):
+        super().__init__(parent)
+        self.render_func = render_func
+        self.requested = 0
+        self.performed = 0
+        self.skipped = 0
+        self._pending = False
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(0)
+        self._timer.timeout.connect(self.flush)
+
+    def request(self):
+        self.requested += 1
+        if not self._pending:
+            self._pending = True
+            self._timer.start()
+
+    def flush(self):
+        """立即执行尚未执行的渲染（例如需要马上读取显示结果时）。"""
+        if not self._pending:
+            return
+        self._pending = False
+        self._timer.stop()
+        if self.render_func():
+            self.performed += 1
+        else:
+            self.skipped += 1
+
+    def is_pending(self) -> bool:
+        return self._pending
+
+    def reset_counters(self):
+        self.requested = 0
+        self.performed = 0
+        self.skipped = 0
@@ -0,0 +1,100 @@
+from PySide6.QtCore import QAbstractListModel, QModelIndex, Qt
+from PySide6.QtWidgets import QDialog, QDialogButtonBox, QHBoxLayout, QLabel, QListView, QPushButton, QVBoxLayout
+
+from route_inference import RouteInference
+#
+# ------------------------------------------------------------------
+#  推断连接对话框：列出从路线字符推断出的新连接，勾选确认后再建立
+# ------------------------------------------------------------------
+#
+
+
+def _node_text(node) -> str:
+    return f"{node.full_name}（第 {node.position[0] + 1} 行）"
+
+
+class RouteListModel(QAbstractListModel):
+    """可勾选的新连接，其后为没有推断的路线（不可勾选）。"""
+    def __init__(self, pairs, ambiguous, parent=None):
+        super().__init__(parent)
+        self.pairs = pairs
+        self.ambiguous = ambiguous
+        self.checked = [True] * len(pairs)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.pairs) + len(self.ambiguous)
+
+    def flags(self, index):
+        if index.row() < len(self.pairs):
+            return Qt.ItemIsEnabled | Qt.ItemIsSelectable | Qt.ItemIsUserCheckable
+        return Qt.ItemIsEnabled
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        row = index.row()
+        if row < len(self.pairs):
+            if role == Qt.DisplayRole:
+                a, b = self.pairs[row]
+                return f"{_node_text(a)} — {_node_text(b)}"
+            if role == Qt.CheckStateRole:
+                return Qt.Checked if self.checked[row] else Qt.Unchecked
+            return None
+        if role == Qt.DisplayRole:
+            (line_index, column), nodes = self.ambiguous[row - len(self.pairs)]
+            return f"未推断：第 {line_index + 1} 行第 {column + 1} 个字符处的路线连接了 {len(nodes)} 个节点"
+        return None
+
+    def setData(self, index, value, role=Qt.EditRole):
+        if role != Qt.CheckStateRole or not index.isValid() or index.row() >= len(self.pairs):
+            return False
+        self.checked[index.row()] = Qt.CheckState(value) == Qt.Checked
+        self.dataChanged.emit(index, index, [Qt.CheckStateRole])
+        return True
+
+    def set_all_checked(self, checked: bool):
+        self.checked = [checked] * len(self.pairs)
+        if self.pairs:
+            self.dataChanged.emit(self.index(0), self.index(len(self.pairs) - 1), [Qt.CheckStateRole])
+
+    def checked_pairs(self):
+        return [pair for pair, checked in zip(self.pairs, self.checked) if checked]
+
+
+class RouteInferenceDialog(QDialog):
+    """确定后由 checked_pairs() 取得勾选的连接。"""
+    def __init__(self, inference: RouteInference, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("从路线推断连接")
+        self.resize(520, 480)
+        new_pairs = inference.new_pairs()
+        self.list_model = RouteListModel(new_pairs, inference.ambiguous, self)
+
+        summary = f"地图上画出的路线共 {len(inference.pairs)} 条，其中 {len(new_pairs)} 条尚未连接。"
+        if inference.ambiguous:
+            summary += f"\n另有 {len(inference.ambiguous)} 处路线连接的节点过多，没有推断。"
+        list_view = QListView()
+        list_view.setUniformItemSizes(True)
+        list_view.setModel(self.list_model)
+
+        check_all_button = QPushButton("全选")
+        check_all_button.clicked.connect(lambda: self.list_model.set_all_checked(True))
+        check_none_button = QPushButton("全不选")
+        check_none_button.clicked.connect(lambda: self.list_model.set_all_checked(False))
+        button_box = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
+        button_box.accepted.connect(self.accept)
+        button_box.rejected.connect(self.reject)
+        button_box.button(QDialogButtonBox.Ok).setEnabled(bool(new_pairs))
+
+        buttons = QHBoxLayout()
+        buttons.addWidget(check_all_button)
+        buttons.addWidget(check_none_button)
+        buttons.addStretch()
+        buttons.addWidget(button_box)
+        layout = QVBoxLayout(self)
+        layout.addWidget(QLabel(summary))
+        layout.addWidget(list_view)
+        layout.addLayout(buttons)
+
+    def checked_pairs(self):
+        return self.list_model.checked_pairs()
@@ -0,0 +1,213 @@
+import re
+import unicodedata
+from bisect import bisect_right
+from itertools import accumulate
+
+from node import MapNode
+from tokenizer import DEFAULT_TOKENIZER, Tokenizer
+#
+# ------------------------------------------------------------------
+#  路线推断：按地图文本中画出的路线字符（─│┼／＼ 等）推断节点之间的连接
+#  先按显示宽度把各行排成字符网格，再用并查集把相互衔接的路线字符合并为一条路线，
+#  每个字符只检查周围固定的几个位置，总耗时与地图字符数成正比
+# ------------------------------------------------------------------
+#
+
+# 方向：(行偏移, 列方向)；列方向 -1/0/1 表示左侧、正上下、右侧
+N, S, E, W = (-1, 0), (1, 0), (0, 1), (0, -1)
+NE, NW, SE, SW = (-1, 1), (-1, -1), (1, 1), (1, -1)
+OPPOSITE = {N: S, S: N, E: W, W: E, NE: SW, SW: NE, NW: SE, SE: NW}
+FORWARD = frozenset((E, S, SE, SW))
+
+# 路线字符 -> 可以衔接的方向；交叉处（┼ 等）视为路口，各方向相互连通
+ROUTE_GLYPHS = {}
+for _glyphs, _directions in (
+        ("─━-－―ー", (E, W)),
+        ("│┃|｜", (N, S)),
+        ("┼╋+＋", (N, S, E, W)),
+        ("┌┏", (E, S)), ("┐┓", (W, S)), ("└┗", (N, E)), ("┘┛", (N, W)),
+        ("├┣", (N, S, E)), ("┤┫", (N, S, W)), ("┬┳", (E, W, S)), ("┴┻", (E, W, N)),
+        ("／/╱", (NE, SW)), ("＼\\╲", (NW, SE)), ("╳ｘ", (NE, SW, NW, SE))):
+    for _glyph in _glyphs:
+        ROUTE_GLYPHS[_glyph] = frozenset(_directions)
+ROUTE_GLYPH_PATTERN = re.compile("[" + re.escape("".join(ROUTE_GLYPHS)) + "]")
+
+# 一条路线连接的节点超过这个数量时不推断（多半是画法有歧义），留给人工处理
+JUNCTION_NODE_LIMIT = 4
+
+# 宽度不明确的字符（─│◇ 等）按全角计：游戏和编辑器使用的中日文等宽字体中它们占两个半角宽度
+AMBIGUOUS_WIDTH = 2
+
+_widths = {}  # 字符 -> 显示宽度
+
+
+def char_width(char) -> int:
+    """字符的显示宽度（半角为 1，全角为 2）。"""
+    width = _widths.get(char)
+    if width is None:
+        east_asian_width = unicodedata.east_asian_width(char)
+        if east_asian_width in ('F', 'W'):
+            width = 2
+        elif east_asian_width == 'A':
+            width = AMBIGUOUS_WIDTH
+        else:
+            width = 1
+        _widths[char] = width
+    return width
+
+
+def line_starts(line) -> list[int]:
+    """各字符的起始格，末尾另有一项为行宽。"""
+    for char in set(line).difference(_widths):
+        char_width(char)
+    return [0, *accumulate(map(_widths.__getitem__, line))]
+
+
+class RouteGrid:
+    """
+    地图文本按显示宽度排成的字符网格：字符 (行, 下标) 占据第 starts[行][下标] 格到第 starts[行][下标+1] 格之前，
+    owners[行][下标] 为该字符所属的节点（不是节点时为 None）。
+    """
+    def __init__(self, lines, nodes_by_line):
+        self.lines = lines
+        self.starts = [line_starts(line) for line in lines]
+        self.owners = []
+        for line, line_entries in zip(lines, nodes_by_line):
+            owners = [None] * len(line)
+            for entry in line_entries:
+                if entry[0] != 'text':
+                    node = entry[1]
+                    column = node.position[1]
+                    owners[column:column + len(node.name)] = [node] * len(node.name)
+            self.owners.append(owners)
+
+    def index_at(self, line_index, cell) -> int:
+        """占据该格的字符下标，超出地图范围时返回 -1。"""
+        if not 0 <= line_index < len(self.lines):
+            return -1
+        starts = self.starts[line_index]
+        if not 0 <= cell < starts[-1]:
+            return -1
+        return bisect_right(starts, cell) - 1
+
+    def neighbors(self, line_index, index, direction) -> list[tuple[int, int]]:
+        """(行, 下标) 处字符在 direction 方向上紧邻的字符，正上下方向上全角字符可能对着两个半角字符。"""
+        row_offset, column_direction = direction
+        if row_offset == 0:
+            neighbor = index + column_direction
+            return [(line_index, neighbor)] if 0 <= neighbor < len(self.lines[line_index]) else []
+        other_line = line_index + row_offset
+        start = self.starts[line_index][index]
+        end = self.starts[line_index][index + 1]
+        if column_direction == 0:
+            cells = (start, end - 1)
+        elif column_direction > 0:
+            cells = (end,)
+        else:
+            cells = (start - 1,)
+        result = []
+        for cell in cells:
+            neighbor = self.index_at(other_line, cell)
+            if neighbor >= 0 and (not result or result[-1][1] != neighbor):
+                result.append((other_line, neighbor))
+        return result
+
+
+class RouteInference:
+    """
+    推断结果。pairs 为路线两端（或路口各方向）的节点对，按ID排列；
+    ambiguous 为连接节点过多、没有推断的路线 [(路线上第一个字符的位置, 节点列表), ...]。
+    """
+    def __init__(self, pairs, ambiguous):
+        self.pairs = pairs
+        self.ambiguous = ambiguous
+
+    def new_pairs(self) -> list[tuple[MapNode, MapNode]]:
+        """尚未连接（两个方向都没有）的节点对。"""
+        return [(a, b) for a, b in self.pairs if b not in a.connections and a not in b.connections]
+
+
+def _find(parent, item):
+    root = item
+    while parent[root] != root:
+        root = parent[root]
+    while parent[item] != root:
+        parent[item], item = root, parent[item]
+    return root
+
+
+def check_tokenizer(tokenizer: Tokenizer):
+    """
+    路线字符不能同时是城市名称（或中继）的字符，否则画出的路线会被解析为节点；重叠时抛出 ValueError。
+    ー 只在假名后算作名称，单独时仍是路线。
+    """
+    overlap = "".join(glyph for glyph in ROUTE_GLYPHS if tokenizer.pattern.fullmatch(glyph))
+    if overlap:
+        raise ValueError(f"路线字符与城市名称字符重叠: {overlap}")
+
+
+def infer_routes(lines, nodes_by_line, tokenizer: Tokenizer = DEFAULT_TOKENIZER) -> RouteInference:
+    check_tokenizer(tokenizer)
+    grid = RouteGrid(lines, nodes_by_line)
+
+    # 路线字符编号为 行首编号 + 下标
+    line_offsets = []
+    total = 0
+    for line in lines:
+        line_offsets.append(total)
+        total += len(line)
+    parent = list(range(total))
+    touch_items = []  # 与节点相邻的路线字符编号
+    touch_nodes = []  # 对应的节点
+
+    def visit(item, direction, other_line, other_index):
+        node = grid.owners[other_line][other_index]
+        if node is not None:
+            touch_items.append(item)
+            touch_nodes.append(node)
+        elif direction in FORWARD:
+            other_directions = ROUTE_GLYPHS.get(lines[other_line][other_index])
+            if other_directions is not None and OPPOSITE[direction] in other_directions:
+                root = _find(parent, item)
+                other_root = _find(parent, line_offsets[other_line] + other_index)
+                if root != other_root:
+                    parent[other_root] = root
+
+    # 只向右、向下（含斜下）合并，每对相邻字符只检查一次；节点则四周都要检查
+    for line_index, line in enumerate(lines):
+        offset = line_offsets[line_index]
+        owners = grid.owners[line_index]
+        for match in ROUTE_GLYPH_PATTERN.finditer(line):
+            index = match.start()
+            if owners[index] is not None:
+                continue
+            item = offset + index
+            for direction in ROUTE_GLYPHS[match.group()]:
+                if direction[0] == 0:
+                    # 同一行的左右两侧，最常见的情况
+                    other_index = index + direction[1]
+                    if 0 <= other_index < len(line):
+                        visit(item, direction, line_index, other_index)
+                else:
+                    for other_line, other_index in grid.neighbors(line_index, index, direction):
+                        visit(item, direction, other_line, other_index)
+
+    # 每条路线（并查集的根）连接的节点，保持首次出现的顺序
+    route_nodes = {}
+    for item, node in zip(touch_items, touch_nodes):
+        route_nodes.setdefault(_find(parent, item), {})[node] = None
+
+    pairs = {}
+    ambiguous = []
+    for root, nodes in route_nodes.items():
+        nodes = list(nodes)
+        if len(nodes) > JUNCTION_NODE_LIMIT:
+            line_index = bisect_right(line_offsets, root) - 1
+            ambiguous.append(((line_index, root - line_offsets[line_index]), nodes))
+            continue
+        for i, a in enumerate(nodes):
+            for b in nodes[i + 1:]:
+                if a.node_id > b.node_id:
+                    a, b = b, a
+                pairs[(a, b)] = None
+    return RouteInference(sorted(pairs, key=lambda pair: (pair[0].node_id, pair[1].node_id)), ambiguous)
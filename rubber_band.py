@@ -0,0 +1,59 @@
+from PySide6.QtCore import QRect, QSize, Qt
+from PySide6.QtWidgets import QRubberBand
+#
+# ------------------------------------------------------------------
+#  框选：在地图视图中按住 Shift 拖动画出矩形，松开时选择矩形内的节点（Ctrl+Shift 为加入已有的选择）
+#  三种显示模式共用，视图需要提供 nodes_in_rect(视口矩形) -> 节点列表
+# ------------------------------------------------------------------
+#
+
+
+def find_window(widget, handler: str):
+    """沿父控件向上找到有 handler 方法的窗口。"""
+    parent_window = widget.parent()
+    while parent_window and not hasattr(parent_window, handler):
+        parent_window = parent_window.parent()
+    return parent_window
+
+
+class RubberBandSelector:
+    """由视图的鼠标事件调用，各方法返回是否已处理该事件。"""
+    def __init__(self, view):
+        self.view = view
+        self.band = None
+        self.origin = None
+        self.add = False
+
+    def press(self, event) -> bool:
+        if event.button() != Qt.LeftButton or not event.modifiers() & Qt.ShiftModifier:
+            return False
+        self.origin = event.position().toPoint()
+        self.add = bool(event.modifiers() & Qt.ControlModifier)
+        if self.band is None:
+            self.band = QRubberBand(QRubberBand.Rectangle, self.view.viewport())
+        self.band.setGeometry(QRect(self.origin, QSize()))
+        self.band.show()
+        return True
+
+    def move(self, event) -> bool:
+        if self.origin is None:
+            return False
+        self.band.setGeometry(QRect(self.origin, event.position().toPoint()).normalized())
+        return True
+
+    def cancel(self):
+        """放弃进行中的框选，松开时不选择。"""
+        if self.origin is not None:
+            self.origin = None
+            self.band.hide()
+
+    def release(self, event) -> bool:
+        if self.origin is None:
+            return False
+        rect = QRect(self.origin, event.position().toPoint()).normalized()
+        self.origin = None
+        self.band.hide()
+        parent_window = find_window(self.view, 'on_nodes_box_selected')
+        if parent_window:
+            parent_window.on_nodes_box_selected(self.view.nodes_in_rect(rect), self.add)
+        return True
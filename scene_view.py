@@ -0,0 +1,147 @@
+from PySide6.QtCore import QEvent, Qt
+from PySide6.QtGui import QColor, QFont, QFontMetricsF, QMouseEvent, QPainter
+from PySide6.QtWidgets import QGraphicsScene, QGraphicsSimpleTextItem, QGraphicsView, QToolTip
+
+from fonts import map_font
+from node import CityNode
+from rubber_band import RubberBandSelector, find_window
+#
+# ------------------------------------------------------------------
+#  场景地图视图：每个节点对应一个常驻图元，状态变化时只重绘受影响的图元
+# ------------------------------------------------------------------
+#
+
+SELECTED_COLOR = QColor("lightgreen")
+HIGHLIGHTED_COLOR = QColor("pink")
+MARKED_COLOR = QColor("lightskyblue")
+
+
+class NodeItem(QGraphicsSimpleTextItem):
+    """地图上的一个节点（城市或中继）。"""
+    def __init__(self, node, font: QFont):
+        super().__init__(node.name if isinstance(node, CityNode) else '◇')
+        self.node = node
+        self.background = None
+        self.setFont(font)
+
+    def set_background(self, color):
+        if color is not self.background:
+            self.background = color
+            self.update()
+
+    def paint(self, painter: QPainter, option, widget=None):
+        if self.background is not None:
+            painter.fillRect(self.boundingRect(), self.background)
+        super().paint(painter, option, widget)
+
+
+class MapSceneView(QGraphicsView):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setScene(QGraphicsScene(self))
+        self.setAlignment(Qt.AlignLeft | Qt.AlignTop)
+        self.setBackgroundBrush(Qt.white)
+        self.map_font = map_font()
+        self.node_items = {}  # 节点 -> NodeItem
+        self.rubber_band = RubberBandSelector(self)
+
+    #
+    # 根据 nodes_by_line 重新生成全部图元，只在地图结构变化（更新、导入）后调用
+    #
+    def build(self, nodes_by_line):
+        scene = self.scene()
+        scene.clear()
+        self.node_items = {}
+        metrics = QFontMetricsF(self.map_font)
+        line_height = metrics.lineSpacing()
+        for line_index, line_entries in enumerate(nodes_by_line):
+            x = 0.0
+            y = line_index * line_height
+            for entry in line_entries:
+                if entry[0] == 'text':
+                    item = scene.addSimpleText(entry[1], self.map_font)
+                else:
+                    item = NodeItem(entry[1], self.map_font)
+                    scene.addItem(item)
+                    self.node_items[entry[1]] = item
+                item.setPos(x, y)
+                x += metrics.horizontalAdvance(item.text())
+        scene.setSceneRect(scene.itemsBoundingRect())
+
+    #
+    # 只更新给定节点的背景色；marked_nodes 为批量选择的节点
+    #
+    def restyle_nodes(self, nodes, selected_node, highlighted_nodes, marked_nodes=frozenset()):
+        for node in nodes:
+            item = self.node_items.get(node)
+            if item is None:
+                continue
+            if node == selected_node:
+                item.set_background(SELECTED_COLOR)
+            elif node in marked_nodes:
+                item.set_background(MARKED_COLOR)
+            elif node in highlighted_nodes:
+                item.set_background(HIGHLIGHTED_COLOR)
+            else:
+                item.set_background(None)
+
+    def nodes_in_rect(self, rect) -> list:
+        """视口矩形 rect 内的节点（框选）。"""
+        return [item.node for item in self.items(rect) if isinstance(item, NodeItem)]
+
+    def viewportEvent(self, event):
+        # 悬浮提示在鼠标停留时才生成
+        if event.type() == QEvent.ToolTip:
+            item = self.itemAt(event.pos())
+            if isinstance(item, NodeItem):
+                QToolTip.showText(event.globalPos(), item.node.tooltip_text(), self.viewport())
+            else:
+                QToolTip.hideText()
+                event.ignore()
+            return True
+        return super().viewportEvent(event)
+
+    def mouseDoubleClickEvent(self, ev):
+        ev.accept()
+
+    def mouseMoveEvent(self, event):
+        if not self.rubber_band.move(event):
+            super().mouseMoveEvent(event)
+
+    def mouseReleaseEvent(self, ev):
+        self.rubber_band.release(ev)
+        ev.accept()
+
+    def mousePressEvent(self, event: QMouseEvent):
+        if self.rubber_band.press(event):
+            event.accept()
+            return
+        if event.button() == Qt.RightButton:
+            parent_window = find_window(self, 'on_right_click')
+            if parent_window:
+                parent_window.on_right_click()
+            event.accept()
+            return
+
+        item = self.itemAt(event.position().toPoint())
+        if isinstance(item, NodeItem):
+            # ctrl+点击：加入或移出批量选择
+            handler = 'on_map_anchor_marked' if event.modifiers() & Qt.ControlModifier else 'on_map_anchor_clicked'
+            parent_window = find_window(self, handler)
+            if parent_window:
+                getattr(parent_window, handler)(item.node)
+            event.accept()
+        else:
+            super().mousePressEvent(event)
+
+    def wheelEvent(self, event):
+        # 与文本浏览器一致：ctrl+滚轮缩放
+        if event.modifiers() & Qt.ControlModifier:
+            factor = 1.1 if event.angleDelta().y() > 0 else 1 / 1.1
+            self.scale(factor, factor)
+            event.accept()
+        else:
+            super().wheelEvent(event)
+
+    def contextMenuEvent(self, event):
+        event.ignore()
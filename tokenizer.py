@@ -0,0 +1,73 @@
+import re
+from array import array
+from itertools import chain
+#
+# ------------------------------------------------------------------
+#  分词：从地图文本的一行中找出城市名称和中继符号，更新（解析）与导入共用
+#  每行只用一个预编译的正则扫描一次，结果为紧凑的 array [起始列, 结束列, 起始列, 结束列, ...]（每行一个对象，
+#  不为每个节点创建元组，也不被垃圾回收跟踪）；不创建节点，可以在任意线程中调用
+# ------------------------------------------------------------------
+#
+
+# 城市名称可以使用的字符（正则字符类的内容）
+NAME_CHAR_CLASSES = {
+    "latin": "a-zA-Z0-9",
+    "fullwidth_latin": "０-９Ａ-Ｚａ-ｗｙｚ",  # 不含 ｘ：地图中用作交叉路线（见 route_inference.ROUTE_GLYPHS）
+    "cjk": "㐀-䶿一-鿿豈-﫿\U00020000-\U0003134f々〆",  # 含扩展区、兼容汉字、々〆
+    "hiragana": "ぁ-ゖゝゞ",
+    "katakana": "ァ-ヺヽヾ",
+    "halfwidth_katakana": "ｦ-ｯｱ-ﾟ",
+}
+DEFAULT_NAME_CHARS = "".join(NAME_CHAR_CLASSES.values())
+
+# 其后可以接长音符号 ー 的字符（假名）：ー 与横向路线字符相同，跟在汉字等后面时仍视为路线
+PROLONGED_SOUND_MARKS = "ーｰ"
+DEFAULT_KANA_CHARS = "".join(NAME_CHAR_CLASSES[name] for name in ("hiragana", "katakana", "halfwidth_katakana"))
+
+DEFAULT_RELAY_GLYPHS = "◇"
+
+TOKENIZE_CHECK_LINES = 256  # 分词时每隔这么多行检查一次是否已被取消
+
+_span = re.Match.span
+_chain = chain.from_iterable
+
+
+class Tokenizer:
+    """
+    name_chars、kana_chars 为正则字符类的内容（例如 "a-z0-9"），relay_glyphs 为中继符号。
+    城市名称为连续的名称字符，假名后的长音符号算作名称的一部分；每个中继符号单独为一个中继。
+    """
+    def __init__(self, name_chars=DEFAULT_NAME_CHARS, relay_glyphs=DEFAULT_RELAY_GLYPHS,
+                 kana_chars=DEFAULT_KANA_CHARS):
+        self.relay_glyphs = frozenset(relay_glyphs)
+        name = f"[{name_chars}]+"
+        if kana_chars:
+            name += f"(?:(?<=[{kana_chars}])[{PROLONGED_SOUND_MARKS}]+[{name_chars}]*)*"
+        relays = "".join(map(re.escape, sorted(self.relay_glyphs)))
+        self.pattern = re.compile(f"{name}|[{relays}]" if relays else name)
+
+    def tokenize_line(self, line: str) -> array:
+        """一行中各节点的起止列 [起始列, 结束列, 起始列, 结束列, ...]。"""
+        return array('i', _chain(map(_span, self.pattern.finditer(line))))
+
+    def tokenize_lines(self, lines, is_cancelled=None):
+        """对多行分词；is_cancelled() 返回 True 时中止并返回 None。"""
+        finditer = self.pattern.finditer
+        tokens = []
+        for index, line in enumerate(lines):
+            if is_cancelled is not None and index % TOKENIZE_CHECK_LINES == 0 and is_cancelled():
+                return None
+            tokens.append(array('i', _chain(map(_span, finditer(line)))))
+        return tokens
+
+    def iter_tokens(self, line: str, spans):
+        """逐个取出 line 中的节点 (是否城市, 起始列, 结束列)，spans 为 tokenize_line 的结果。"""
+        relay_glyphs = self.relay_glyphs
+        for i in range(0, len(spans), 2):
+            start = spans[i]
+            yield line[start] not in relay_glyphs, start, spans[i + 1]
+
+
+DEFAULT_TOKENIZER = Tokenizer()
+tokenize_line = DEFAULT_TOKENIZER.tokenize_line
+tokenize_lines = DEFAULT_TOKENIZER.tokenize_lines
@@ -0,0 +1,199 @@
+from collections import deque
+
+from model import MapModel, SpanEdit
+from node import MapNode
+#
+# ------------------------------------------------------------------
+#  撤销、重做：只记录每次修改的差异（切换的连接、改变的属性、解析替换的行），
+#  撤销、重做的耗时与修改的规模成正比，总内存超过上限时丢弃最早的记录
+# ------------------------------------------------------------------
+#
+
+UNDO_MEMORY_LIMIT = 16 * 1024 * 1024  # 撤销记录的内存上限（估算值，字节）
+
+# 估算内存用的大致开销（64 位 CPython）
+ENTRY_BYTES = 120       # 一条记录本身
+NODE_BYTES = 400        # 一个节点对象及其 connections 集合
+LINE_BYTES = 160        # 一行的列表、计数等
+CHAR_BYTES = 2          # 行文本中的一个字符
+
+
+class ConnectionCommand:
+    """建立或取消一条连接；同时记录两端全名的前后值（中继的默认名称可能随之变化）。"""
+    __slots__ = ('node', 'other', 'full_names_before', 'full_names_after')
+
+    def __init__(self, node, other, full_names_before, full_names_after):
+        self.node = node
+        self.other = other
+        self.full_names_before = full_names_before
+        self.full_names_after = full_names_after
+
+    def _toggle(self, model: MapModel, full_names):
+        model.toggle_connection(self.node, self.other)
+        for node, full_name in zip((self.node, self.other), full_names):
+            if node.full_name != full_name:
+                model.set_full_name(node, full_name)
+
+    def undo(self, model: MapModel):
+        self._toggle(model, self.full_names_before)
+
+    def redo(self, model: MapModel):
+        self._toggle(model, self.full_names_after)
+
+    def nodes(self):
+        return (self.node, self.other)
+
+    def merge(self, command) -> bool:
+        return False
+
+    def size(self) -> int:
+        # 另有前后两组全名
+        return 2 * ENTRY_BYTES
+
+
+class AttributeCommand:
+    """修改节点的全名、经济或防御；连续修改同一节点的同一属性（逐字输入）合并为一条。"""
+    __slots__ = ('node', 'attribute', 'old_value', 'new_value')
+
+    def __init__(self, node, attribute, old_value, new_value):
+        self.node = node
+        self.attribute = attribute
+        self.old_value = old_value
+        self.new_value = new_value
+
+    def _set(self, model: MapModel, value):
+        if self.attribute == 'full_name':
+            model.set_full_name(self.node, value)
+        else:
+            setattr(self.node, self.attribute, value)
+
+    def undo(self, model: MapModel):
+        self._set(model, self.old_value)
+
+    def redo(self, model: MapModel):
+        self._set(model, self.new_value)
+
+    def nodes(self):
+        return (self.node,)
+
+    def merge(self, command) -> bool:
+        if (isinstance(command, AttributeCommand) and command.node is self.node
+                and command.attribute == self.attribute):
+            self.new_value = command.new_value
+            return True
+        return False
+
+    def size(self) -> int:
+        return ENTRY_BYTES
+
+
+class ParseCommand:
+    """一次解析（更新）替换的行；撤销和重做都是把这段行换回另一侧的内容。"""
+    __slots__ = ('edit',)
+
+    def __init__(self, edit: SpanEdit):
+        self.edit = edit
+
+    def undo(self, model: MapModel):
+        self.edit = model.apply_span_edit(self.edit)
+
+    redo = undo
+
+    def nodes(self):
+        return ()
+
+    def merge(self, command) -> bool:
+        return False
+
+    def size(self) -> int:
+        edit = self.edit
+        return (ENTRY_BYTES + LINE_BYTES * len(edit.lines) + CHAR_BYTES * sum(map(len, edit.lines))
+                + NODE_BYTES * len(edit.positions))
+
+
+class CompoundCommand:
+    """多条记录作为一次修改撤销、重做（例如一次建立推断出的全部连接）。"""
+    __slots__ = ('commands',)
+
+    def __init__(self, commands):
+        self.commands = commands
+
+    def undo(self, model: MapModel):
+        for command in reversed(self.commands):
+            command.undo(model)
+
+    def redo(self, model: MapModel):
+        for command in self.commands:
+            command.redo(model)
+
+    def nodes(self):
+        return tuple({node: None for command in self.commands for node in command.nodes()})
+
+    def merge(self, command) -> bool:
+        return False
+
+    def size(self) -> int:
+        return ENTRY_BYTES + sum(command.size() for command in self.commands)
+
+
+class UndoStack:
+    """
+    push(command) 记录已经执行的修改，并清空重做记录。
+    undo(model) / redo(model) 返回执行的记录，没有可执行的记录时返回 None。
+    撤销、重做记录估算的总内存超过 memory_limit 时，丢弃最早的撤销记录。
+    """
+    def __init__(self, memory_limit=UNDO_MEMORY_LIMIT):
+        self.memory_limit = memory_limit
+        self.undo_commands = deque()
+        self.redo_commands = []
+        self.memory = 0
+
+    def push(self, command):
+        for redo_command in self.redo_commands:
+            self.memory -= redo_command.size()
+        self.redo_commands = []
+        if self.undo_commands and self.undo_commands[-1].merge(command):
+            return
+        self.undo_commands.append(command)
+        self.memory += command.size()
+        # 至少保留最近的一条
+        while self.memory > self.memory_limit and len(self.undo_commands) > 1:
+            self.memory -= self.undo_commands.popleft().size()
+
+    def undo(self, model: MapModel):
+        if not self.undo_commands:
+            return None
+        command = self.undo_commands.pop()
+        self.memory -= command.size()
+        command.undo(model)
+        self.redo_commands.append(command)
+        self.memory += command.size()
+        return command
+
+    def redo(self, model: MapModel):
+        if not self.redo_commands:
+            return None
+        command = self.redo_commands.pop()
+        self.memory -= command.size()
+        command.redo(model)
+        self.undo_commands.append(command)
+        self.memory += command.size()
+        return command
+
+    def can_undo(self) -> bool:
+        return bool(self.undo_commands)
+
+    def can_redo(self) -> bool:
+        return bool(self.redo_commands)
+
+    def clear(self):
+        self.undo_commands.clear()
+        self.redo_commands = []
+        self.memory = 0
+
+
+def connection_command(model: MapModel, node: MapNode, other: MapNode) -> ConnectionCommand:
+    """切换 node 与 other 之间的连接，返回对应的记录。"""
+    before = (node.full_name, other.full_name)
+    model.toggle_connection(node, other)
+    return ConnectionCommand(node, other, before, (node.full_name, other.full_name))
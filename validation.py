@@ -0,0 +1,209 @@
+from collections import deque
+
+from node import CityNode, RelayNode
+#
+# ------------------------------------------------------------------
+#  地图检查：维护导出前需要提示的问题，连接、全名变化时增量更新
+# ------------------------------------------------------------------
+#
+
+DEFAULT_RELAY = "default_relay"                  # 中继仍为默认名称
+DUPLICATE_FULL_NAME = "duplicate_full_name"      # 全名重复（导入时以全名识别节点）
+ASYMMETRIC_CONNECTION = "asymmetric_connection"  # 单向连接
+ISOLATED_CITY = "isolated_city"                  # 没有任何路线的城市
+DISCONNECTED = "disconnected"                    # 与地图主体不连通的部分
+
+# 显示顺序；导出前只提示会影响导出、导入结果的几类
+DIAGNOSTIC_KINDS = (DEFAULT_RELAY, DUPLICATE_FULL_NAME, ASYMMETRIC_CONNECTION, ISOLATED_CITY, DISCONNECTED)
+EXPORT_CHECKS = (DEFAULT_RELAY, DUPLICATE_FULL_NAME, ASYMMETRIC_CONNECTION)
+
+
+class MapValidator:
+    """
+    rebuild() 全量检查一次，之后由模型在 toggle_connection / set_full_name 中调用
+    connection_toggled / full_name_changed 增量维护；重新解析后 invalidate()，下次读取时再全量检查。
+    连通部分按大小合并；断开连接时从两端交替搜索，只遍历较小的一边。
+    revision 在结果可能变化时递增，供显示方判断是否需要刷新。
+    """
+    def __init__(self, model):
+        self.model = model
+        self.stale = True
+        self.revision = 0
+        self.default_relays = set()
+        self.duplicate_names = set()
+        self.asymmetric = set()     # (a, b)：a 连向 b，b 没有连回 a
+        self.isolated_cities = set()
+        self.component_of = {}      # 节点 -> 连通部分编号
+        self.components = {}        # 连通部分编号 -> 节点集合
+        self._next_component = 0
+
+    def invalidate(self):
+        self.stale = True
+        self.revision += 1
+
+    def ensure(self):
+        if self.stale:
+            self.rebuild()
+
+    def rebuild(self):
+        nodes = self.model.all_nodes
+        self.default_relays = {node for node in nodes if isinstance(node, RelayNode) and node.full_name == "◇"}
+        self.duplicate_names = {full_name for full_name in self.model.node_index.by_full_name
+                                if self._is_duplicate(full_name)}
+        self.asymmetric = {(node, conn) for node in nodes for conn in node.connections
+                           if node not in conn.connections}
+        self.isolated_cities = {node for node in nodes if isinstance(node, CityNode) and not node.connections}
+
+        self.component_of = {}
+        self.components = {}
+        for node in nodes:
+            if node in self.component_of:
+                continue
+            part = {node}
+            queue = deque([node])
+            while queue:
+                for conn in queue.popleft().connections:
+                    if conn not in part:
+                        part.add(conn)
+                        queue.append(conn)
+            self._add_component(part)
+        self.stale = False
+        self.revision += 1
+
+    def _add_component(self, part):
+        component = self._next_component
+        self._next_component += 1
+        self.components[component] = part
+        for node in part:
+            self.component_of[node] = component
+
+    #
+    # 增量更新（全量结果已过期时不需要维护）
+    #
+    def connection_toggled(self, node, other, connected: bool):
+        if self.stale:
+            return
+        self.revision += 1
+        for a, b in ((node, other), (other, node)):
+            if b in a.connections and a not in b.connections:
+                self.asymmetric.add((a, b))
+            else:
+                self.asymmetric.discard((a, b))
+            if isinstance(a, CityNode):
+                if a.connections:
+                    self.isolated_cities.discard(a)
+                else:
+                    self.isolated_cities.add(a)
+        if connected:
+            self._merge(node, other)
+        else:
+            self._split(node, other)
+
+    def full_name_changed(self, node, old_full_name):
+        """在节点索引更新之后调用。"""
+        if self.stale:
+            return
+        self.revision += 1
+        if isinstance(node, RelayNode) and node.full_name == "◇":
+            self.default_relays.add(node)
+        else:
+            self.default_relays.discard(node)
+        for full_name in (old_full_name, node.full_name):
+            if self._is_duplicate(full_name):
+                self.duplicate_names.add(full_name)
+            else:
+                self.duplicate_names.discard(full_name)
+
+    def _is_duplicate(self, full_name) -> bool:
+        # 默认名称的中继已单独提示
+        return full_name != "◇" and len(self.model.node_index.by_full_name.get(full_name, ())) > 1
+
+    def _merge(self, a, b):
+        small, large = self.component_of[a], self.component_of[b]
+        if small == large:
+            return
+        if len(self.components[small]) > len(self.components[large]):
+            small, large = large, small
+        part = self.components.pop(small)
+        for node in part:
+            self.component_of[node] = large
+        self.components[large] |= part
+
+    def _split(self, a, b):
+        # 两边相遇说明仍然连通；先搜索完的一边即为分离出去的部分
+        searches = [({a}, deque([a])), ({b}, deque([b]))]
+        while all(queue for _, queue in searches):
+            for side, (seen, queue) in enumerate(searches):
+                other_seen = searches[1 - side][0]
+                for conn in queue.popleft().connections:
+                    if conn in other_seen:
+                        return
+                    if conn not in seen:
+                        seen.add(conn)
+                        queue.append(conn)
+                if not queue:
+                    break
+        part = searches[0][0] if not searches[0][1] else searches[1][0]
+        self.components[self.component_of[a]] -= part
+        self._add_component(part)
+
+    #
+    # 读取结果
+    #
+    def diagnostics(self, kinds=DIAGNOSTIC_KINDS) -> list[tuple[str, object, str]]:
+        """[(类别, 相关节点, 说明), ...]，按类别、位置排列。"""
+        self.ensure()
+        result = []
+        for kind in kinds:
+            result.extend(getattr(self, f"_{kind}_diagnostics")())
+        return result
+
+    def messages(self, kinds=DIAGNOSTIC_KINDS) -> list[str]:
+        return [message for _, _, message in self.diagnostics(kinds)]
+
+    def _default_relay_diagnostics(self):
+        result = []
+        for relay_node in sorted(self.default_relays, key=lambda node: node.position):
+            line_index, column = relay_node.position
+            # 当前行中第几个中继点
+            relay_index = sum(1 for entry in self.model.nodes_by_line[line_index]
+                              if entry[0] == 'relay' and entry[1].position[1] <= column)
+            result.append((DEFAULT_RELAY, relay_node,
+                           f"位于第 {line_index+1} 行第 {relay_index} 个中继点仍然为默认名称"))
+        return result
+
+    def _duplicate_full_name_diagnostics(self):
+        result = []
+        for full_name in sorted(self.duplicate_names):
+            same_name = sorted(self.model.node_index.by_full_name[full_name], key=lambda node: node.node_id)
+            ids = ", ".join(str(node.node_id) for node in same_name)
+            result.append((DUPLICATE_FULL_NAME, same_name[0], f"全名 {full_name} 重复（ID: {ids}）"))
+        return result
+
+    def _asymmetric_connection_diagnostics(self):
+        return [(ASYMMETRIC_CONNECTION, a, f"{a.full_name} 连接到 {b.full_name}，但反向没有连接")
+                for a, b in sorted(self.asymmetric, key=lambda pair: (pair[0].node_id, pair[1].node_id))]
+
+    def _isolated_city_diagnostics(self):
+        return [(ISOLATED_CITY, node, f"城市 {node.full_name} 没有任何路线")
+                for node in sorted(self.isolated_cities, key=lambda node: node.node_id)]
+
+    def _disconnected_diagnostics(self):
+        if len(self.components) < 2:
+            return []
+        # 同样大小时取含最小ID的部分为主体，结果不依赖增量更新后各部分的存放顺序
+        main = max(self.components.values(), key=lambda part: (len(part), -min(node.node_id for node in part)))
+        result = []
+        for part in self.components.values():
+            if part is main:
+                continue
+            first = min(part, key=lambda node: node.node_id)
+            if len(part) == 1 and isinstance(first, CityNode):
+                continue  # 已作为没有路线的城市提示
+            if len(part) == 1:
+                message = f"{first.full_name} 与地图主体不连通"
+            else:
+                message = f"{first.full_name} 等 {len(part)} 个节点与地图主体不连通"
+            result.append((DISCONNECTED, first, message))
+        result.sort(key=lambda item: item[1].node_id)
+        return result
@@ -0,0 +1,257 @@
+from bisect import bisect_right
+
+from PySide6.QtCore import QEvent, QPointF, QRectF, Qt
+from PySide6.QtGui import QColor, QFont, QFontMetricsF, QMouseEvent, QPainter
+from PySide6.QtWidgets import QAbstractScrollArea, QToolTip
+
+from fonts import map_font
+from node import CityNode
+from rubber_band import RubberBandSelector, find_window
+#
+# ------------------------------------------------------------------
+#  虚拟地图视图：直接按 nodes_by_line 绘制，只为可见的行（及上下少量余量）计算排版，
+#  内存和排版开销只与窗口大小有关，与地图大小无关
+# ------------------------------------------------------------------
+#
+
+SELECTED_COLOR = QColor("lightgreen")
+HIGHLIGHTED_COLOR = QColor("pink")
+MARKED_COLOR = QColor("lightskyblue")
+MARGIN_LINES = 20  # 可见范围上下额外保留排版结果的行数
+
+
+def _node_style(node, selected_node, highlighted_nodes, marked_nodes):
+    if node == selected_node:
+        return SELECTED_COLOR
+    if node in marked_nodes:
+        return MARKED_COLOR
+    if node in highlighted_nodes:
+        return HIGHLIGHTED_COLOR
+    return None
+
+
+class VirtualMapView(QAbstractScrollArea):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.nodes_by_line = []
+        self.lines = []
+        self.selected_node = None
+        self.highlighted_nodes = set()
+        self.marked_nodes = frozenset()
+        # 已排版的行 {行号: ([起始x, ...], [(起始x, 宽度, 文字, 节点或None), ...])}
+        self.line_layouts = {}
+        self._content_width = 0.0
+        self._set_font(map_font())
+        self.rubber_band = RubberBandSelector(self)
+
+    def _set_font(self, font: QFont):
+        self.map_font = font
+        self.metrics = QFontMetricsF(font)
+        self.line_height = self.metrics.lineSpacing()
+        self.line_layouts = {}
+
+    #
+    # 设置地图内容，只在地图结构变化（更新、导入）后调用，不进行排版
+    #
+    def set_lines(self, nodes_by_line, lines):
+        self.nodes_by_line = nodes_by_line
+        self.lines = lines
+        self.line_layouts = {}
+        # 字符最多的一行决定初始的水平滚动范围，只测量这一行；全角字符较多的行可能更宽，
+        # 排版时发现更宽的行再扩大范围（见 _line_layout），可见的行总能滚动到右端
+        longest = max(lines, key=len, default="")
+        self._content_width = self.metrics.horizontalAdvance(longest)
+        self._update_scroll_ranges()
+        self.viewport().update()
+
+    def _update_scroll_ranges(self):
+        viewport = self.viewport()
+        content_height = len(self.nodes_by_line) * self.line_height
+        self.verticalScrollBar().setPageStep(viewport.height())
+        self.verticalScrollBar().setSingleStep(int(self.line_height))
+        self.verticalScrollBar().setRange(0, max(0, int(content_height - viewport.height())))
+        self.horizontalScrollBar().setPageStep(viewport.width())
+        self.horizontalScrollBar().setRange(0, max(0, int(self._content_width - viewport.width())))
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self._update_scroll_ranges()
+
+    #
+    # 记录选中、高亮状态，只重绘可见范围内样式实际变化的节点
+    #
+    def restyle_nodes(self, nodes, selected_node, highlighted_nodes, marked_nodes=frozenset()):
+        old_style = (self.selected_node, self.highlighted_nodes, self.marked_nodes)
+        new_style = (selected_node, highlighted_nodes, marked_nodes)
+        self.selected_node, self.highlighted_nodes, self.marked_nodes = new_style
+        first, last = self._visible_range()
+        for node in nodes:
+            if node.position is None or not first <= node.position[0] < last:
+                continue
+            if _node_style(node, *old_style) == _node_style(node, *new_style):
+                continue
+            rect = self._node_rect(node)
+            if rect is not None:
+                self.viewport().update(rect.toAlignedRect())
+
+    def _node_rect(self, node):
+        line_index = node.position[0]
+        for x, width, _, segment_node in self._line_layout(line_index)[1]:
+            if segment_node is node:
+                return QRectF(x - self.horizontalScrollBar().value(),
+                              line_index * self.line_height - self.verticalScrollBar().value(),
+                              width, self.line_height)
+        return None
+
+    #
+    # 排版
+    #
+    def _visible_range(self):
+        top = self.verticalScrollBar().value()
+        first = int(top // self.line_height)
+        last = int((top + self.viewport().height()) // self.line_height) + 1
+        return max(0, first), min(len(self.nodes_by_line), last)
+
+    def _line_layout(self, line_index):
+        layout = self.line_layouts.get(line_index)
+        if layout is None:
+            starts = []
+            segments = []
+            x = 0.0
+            for entry in self.nodes_by_line[line_index]:
+                if entry[0] == 'text':
+                    text, node = entry[1], None
+                else:
+                    node = entry[1]
+                    text = node.name if isinstance(node, CityNode) else '◇'
+                width = self.metrics.horizontalAdvance(text)
+                starts.append(x)
+                segments.append((x, width, text, node))
+                x += width
+            layout = self.line_layouts[line_index] = (starts, segments)
+            if x > self._content_width:
+                self._content_width = x
+                self._update_scroll_ranges()
+        return layout
+
+    def _evict_layouts(self, first, last):
+        # 丢弃离开可见范围（含余量）的行的排版结果
+        keep_first, keep_last = first - MARGIN_LINES, last + MARGIN_LINES
+        if len(self.line_layouts) > (last - first) + 4 * MARGIN_LINES:
+            self.line_layouts = {line_index: layout for line_index, layout in self.line_layouts.items()
+                                 if keep_first <= line_index < keep_last}
+
+    def node_at(self, pos) -> object:
+        """视口坐标 pos 处的节点，没有时返回 None。"""
+        line_index = int((pos.y() + self.verticalScrollBar().value()) // self.line_height)
+        if not 0 <= line_index < len(self.nodes_by_line):
+            return None
+        x = pos.x() + self.horizontalScrollBar().value()
+        starts, segments = self._line_layout(line_index)
+        index = bisect_right(starts, x) - 1
+        if index < 0:
+            return None
+        start, width, _, node = segments[index]
+        return node if x < start + width else None
+
+    def nodes_in_rect(self, rect) -> list:
+        """视口矩形 rect 内（与之相交）的节点（框选）。"""
+        dx = self.horizontalScrollBar().value()
+        dy = self.verticalScrollBar().value()
+        first = max(0, int((rect.top() + dy) // self.line_height))
+        last = min(len(self.nodes_by_line), int((rect.bottom() + dy) // self.line_height) + 1)
+        left, right = rect.left() + dx, rect.right() + dx
+        return [node for line_index in range(first, last)
+                for x, width, _, node in self._line_layout(line_index)[1]
+                if node is not None and x < right and x + width > left]
+
+    #
+    # 绘制
+    #
+    def paintEvent(self, event):
+        painter = QPainter(self.viewport())
+        rect = event.rect()
+        painter.fillRect(rect, Qt.white)
+        painter.setFont(self.map_font)
+        painter.setPen(Qt.black)
+        first, last = self._visible_range()
+        self._evict_layouts(first, last)
+        dx = -self.horizontalScrollBar().value()
+        dy = -self.verticalScrollBar().value()
+        ascent = self.metrics.ascent()
+        # 只绘制与需要重绘的区域相交的行和片段
+        first = max(first, int((rect.top() - dy) // self.line_height))
+        last = min(last, int((rect.bottom() - dy) // self.line_height) + 1)
+        for line_index in range(first, last):
+            y = line_index * self.line_height + dy
+            for x, width, text, node in self._line_layout(line_index)[1]:
+                if x + dx > rect.right() or x + width + dx < rect.left():
+                    continue
+                if node is not None:
+                    color = _node_style(node, self.selected_node, self.highlighted_nodes, self.marked_nodes)
+                    if color is not None:
+                        painter.fillRect(QRectF(x + dx, y, width, self.line_height), color)
+                painter.drawText(QPointF(x + dx, y + ascent), text)
+
+    def scrollContentsBy(self, dx, dy):
+        self.viewport().update()
+
+    #
+    # 交互：点击、右键、悬浮提示、ctrl+滚轮缩放
+    #
+    def viewportEvent(self, event):
+        if event.type() == QEvent.ToolTip:
+            node = self.node_at(event.pos())
+            if node is not None:
+                QToolTip.showText(event.globalPos(), node.tooltip_text(), self.viewport())
+            else:
+                QToolTip.hideText()
+                event.ignore()
+            return True
+        return super().viewportEvent(event)
+
+    def mouseDoubleClickEvent(self, ev):
+        ev.accept()
+
+    def mouseMoveEvent(self, event):
+        if not self.rubber_band.move(event):
+            super().mouseMoveEvent(event)
+
+    def mouseReleaseEvent(self, ev):
+        self.rubber_band.release(ev)
+        ev.accept()
+
+    def mousePressEvent(self, event: QMouseEvent):
+        if self.rubber_band.press(event):
+            event.accept()
+            return
+        if event.button() == Qt.RightButton:
+            parent_window = find_window(self, 'on_right_click')
+            if parent_window:
+                parent_window.on_right_click()
+            event.accept()
+            return
+
+        node = self.node_at(event.position())
+        if node is not None:
+            # ctrl+点击：加入或移出批量选择
+            handler = 'on_map_anchor_marked' if event.modifiers() & Qt.ControlModifier else 'on_map_anchor_clicked'
+            parent_window = find_window(self, handler)
+            if parent_window:
+                getattr(parent_window, handler)(node)
+        event.accept()
+
+    def wheelEvent(self, event):
+        # 与文本浏览器一致：ctrl+滚轮缩放
+        if event.modifiers() & Qt.ControlModifier:
+            font = QFont(self.map_font)
+            step = 1 if event.angleDelta().y() > 0 else -1
+            font.setPointSizeF(max(4.0, font.pointSizeF() + step))
+            self._set_font(font)
+            self.set_lines(self.nodes_by_line, self.lines)
+            event.accept()
+        else:
+            super().wheelEvent(event)
+
+    def contextMenuEvent(self, event):
+        event.ignore()
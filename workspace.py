@@ -0,0 +1,150 @@
+import os
+import shutil
+import tempfile
+
+from model import MapModel
+from undo import UndoStack
+#
+# ------------------------------------------------------------------
+#  工作区：同时打开的多张地图（每张一个标签页），只有当前地图处于显示状态
+#  不活动的地图按最近使用顺序（LRU）管理：最近的几张保留渲染好的文本模式文档，切换回来时不必重新排版；
+#  已加载地图的估算内存超过上限时，把最久未使用的地图写入临时目录中的项目文件（.tkmap）并释放，
+#  再次切换到该地图时从文件读回
+# ------------------------------------------------------------------
+#
+
+WORKSPACE_MEMORY_LIMIT = 256 * 1024 * 1024  # 已加载地图的内存上限（估算值，字节）
+RENDERED_MAP_LIMIT = 3  # 保留渲染结果的不活动地图数
+
+# 估算内存用的大致开销（64 位 CPython，bench_memory 测得每个节点连同索引、行条目约 1 KiB）
+NODE_BYTES = 1024
+LINE_BYTES = 160
+CHAR_BYTES = 2
+
+
+def estimate_model_memory(model: MapModel) -> int:
+    return (NODE_BYTES * len(model.all_nodes) + LINE_BYTES * len(model.lines)
+            + CHAR_BYTES * sum(map(len, model.lines)))
+
+
+class MapDocument:
+    """
+    工作区中的一张地图。换出后 model 为 None，内容保存在 swap_file 中；撤销记录引用的是节点对象，随之丢弃。
+    rendered 为切换走时保留的渲染结果（需要有 release() 方法），由界面负责存取。
+    """
+    def __init__(self, title, model=None):
+        self.title = title
+        self.model = model if model is not None else MapModel()
+        self.undo_stack = UndoStack()
+        self.selected_node_id = None
+        self.marked_node_ids = ()
+        self.rendered = None
+        self.swap_file = None
+
+    def is_loaded(self) -> bool:
+        return self.model is not None
+
+    def memory(self) -> int:
+        """已加载时模型和撤销记录的估算内存，换出后为 0。"""
+        if self.model is None:
+            return 0
+        return estimate_model_memory(self.model) + self.undo_stack.memory
+
+    def drop_rendered(self):
+        if self.rendered is not None:
+            self.rendered.release()
+            self.rendered = None
+
+
+class Workspace:
+    """
+    documents 按标签页顺序排列，active 为当前地图。activate(document) 切换当前地图：
+    需要时从文件读回，再按 LRU 释放其他地图的渲染结果、换出超出内存上限的地图。
+    """
+    def __init__(self, memory_limit=WORKSPACE_MEMORY_LIMIT, rendered_limit=RENDERED_MAP_LIMIT):
+        self.memory_limit = memory_limit
+        self.rendered_limit = rendered_limit
+        self.documents = []
+        self.active = None
+        self._recent = []  # 已加载的地图，最久未使用的在前
+        self._swap_dir = None
+        self.swapped_out = 0  # 换出、读回的次数
+        self.swapped_in = 0
+
+    def add(self, document: MapDocument) -> MapDocument:
+        self.documents.append(document)
+        if document.is_loaded():
+            self._recent.append(document)
+        return document
+
+    def remove(self, document: MapDocument):
+        self.documents.remove(document)
+        if document in self._recent:
+            self._recent.remove(document)
+        document.drop_rendered()
+        self._discard_swap_file(document)
+        if document is self.active:
+            self.active = None
+
+    def activate(self, document: MapDocument) -> MapModel:
+        if not document.is_loaded():
+            self._swap_in(document)
+        else:
+            self._recent.remove(document)
+        self._recent.append(document)
+        self.active = document
+        self.trim()
+        return document.model
+
+    def trim(self):
+        """释放多余的渲染结果，换出超出内存上限的地图（当前地图除外）。"""
+        inactive = [document for document in reversed(self._recent) if document is not self.active]
+        for document in inactive[self.rendered_limit:]:
+            document.drop_rendered()
+        memory = sum(document.memory() for document in self._recent)
+        for document in reversed(inactive):
+            if memory <= self.memory_limit:
+                break
+            memory -= document.memory()
+            self._swap_out(document)
+
+    def loaded_memory(self) -> int:
+        return sum(document.memory() for document in self._recent)
+
+    def _swap_out(self, document: MapDocument):
+        # 读写项目文件的模块只在需要换出时才导入
+        from project_file import PROJECT_SUFFIX, save_project
+
+        if self._swap_dir is None:
+            self._swap_dir = tempfile.mkdtemp(prefix="tk_map_workspace_")
+        document.drop_rendered()
+        fd, document.swap_file = tempfile.mkstemp(suffix=PROJECT_SUFFIX, dir=self._swap_dir)
+        os.close(fd)
+        save_project(document.model, document.swap_file)
+        document.model = None
+        document.undo_stack.clear()
+        self._recent.remove(document)
+        self.swapped_out += 1
+
+    def _swap_in(self, document: MapDocument):
+        from project_file import load_project
+
+        document.model = load_project(document.swap_file)
+        self._discard_swap_file(document)
+        self.swapped_in += 1
+
+    def _discard_swap_file(self, document: MapDocument):
+        if document.swap_file is not None:
+            try:
+                os.remove(document.swap_file)
+            except OSError:
+                pass
+            document.swap_file = None
+
+    def close(self):
+        """删除临时目录（关闭窗口时调用）。"""
+        for document in self.documents:
+            document.drop_rendered()
+        if self._swap_dir is not None:
+            shutil.rmtree(self._swap_dir, ignore_errors=True)
+            self._swap_dir = None